@@ -3,6 +3,12 @@ ASGI config for proyecto_finalMVC project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Perfil ASGI: las vistas de formularios (contacto, contacto_propiedad,
+solicitar_visita, suscribir_newsletter) son async y esperan al SMTP sin
+ocupar el worker, así que un solo proceso atiende muchos envíos a la vez.
+Se levanta con el proceso ``asgi`` del Procfile (requiere uvicorn; el envío
+asíncrono de emails, aiosmtplib).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 """
@@ -49,13 +49,18 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise, apto también para ASGI (ver sistema_inmobiliaria/middleware.py)
+    'sistema_inmobiliaria.middleware.EstaticosMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Antes de la caché de páginas, para contar también sus HIT
+    'sistema_inmobiliaria.middleware.ContadorVistasMiddleware',
+    # Último: usa el CSRF y los mensajes ya preparados (ver sistema_inmobiliaria/middleware.py)
+    'sistema_inmobiliaria.middleware.PaginaCompletaCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'proyecto_finalMVC.urls'
@@ -86,9 +91,42 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Consultas, visitas, newsletter y sesiones (ver sistema_inmobiliaria/routers.py).
+    # Recordar: python manage.py migrate --database=leads
+    'leads': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get("LEADS_DB_PATH", BASE_DIR / 'leads.sqlite3'),
+    },
+}
+
+DATABASE_ROUTERS = ['sistema_inmobiliaria.routers.LeadsRouter']
+
+
+# Caché compartida por todos los workers del nodo (ver sistema_inmobiliaria/cache.py).
+# CACHE_BACKEND: 'archivo' (por defecto), 'sqlite', 'redis' o 'memoria'.
+# CACHE_VERSION invalida toda la caché de una vez (p. ej. en cada deploy).
+CACHE_BACKENDS = {
+    'archivo': ('sistema_inmobiliaria.cache.ArchivoCache', BASE_DIR / 'cache'),
+    'sqlite': ('sistema_inmobiliaria.cache.SQLiteCache', BASE_DIR / 'cache.sqlite3'),
+    'redis': ('sistema_inmobiliaria.cache.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'memoria': ('sistema_inmobiliaria.cache.MemoriaCache', 'inmobiliaria'),
 }
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "archivo")
+_cache_backend, _cache_location = CACHE_BACKENDS[CACHE_BACKEND]
 
+CACHES = {
+    'default': {
+        'BACKEND': _cache_backend,
+        'LOCATION': os.environ.get("CACHE_LOCATION", _cache_location),
+        'KEY_PREFIX': os.environ.get("CACHE_KEY_PREFIX", "inmobiliaria"),
+        'VERSION': int(os.environ.get("CACHE_VERSION", 1)),
+        'TIMEOUT': int(os.environ.get("CACHE_TIMEOUT", 300)),
+    },
+}
+
+# Entorno de los tests (caché en memoria, staticfiles sin manifest)
+TEST_RUNNER = 'proyecto_finalMVC.test_runner.InmobiliariaTestRunner'
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -127,6 +165,30 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# collectstatic minifica los estáticos propios, les pone nombres con hash
+# (servidos como immutable por WhiteNoise) y genera variantes .gz/.br (ver
+# sistema_inmobiliaria/storage.py)
+STATICFILES_STORAGE = 'sistema_inmobiliaria.storage.MinificadoManifestStaticFilesStorage'
+
+# Estilos y scripts propios de los templates: se minifican en el lugar, con
+# el mismo nombre (el CSS crítico inline sale de manage.py css_critico)
+STATIC_MINIFICAR = [
+    'sistema_inmobiliaria/css/base.css',
+    'sistema_inmobiliaria/css/paginas/blog.css',
+    'sistema_inmobiliaria/css/paginas/contacto.css',
+    'sistema_inmobiliaria/css/paginas/entrada.css',
+    'sistema_inmobiliaria/css/paginas/nosotros.css',
+    'sistema_inmobiliaria/css/paginas/propiedad.css',
+    'sistema_inmobiliaria/css/paginas/propiedades.css',
+    'sistema_inmobiliaria/js/base.js',
+    'sistema_inmobiliaria/js/paginas/contacto.js',
+    'sistema_inmobiliaria/js/paginas/contacto_propiedad.js',
+    'sistema_inmobiliaria/js/paginas/home.js',
+    'sistema_inmobiliaria/js/paginas/propiedad.js',
+    'sistema_inmobiliaria/js/paginas/propiedades.js',
+    'sistema_inmobiliaria/js/paginas/solicitar_visita.js',
+]
+
 # Media files (User uploaded files)
 MEDIA_URL = "https://raw.githubusercontent.com/Repetto-A/Real_Estate_System/main/media/"
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -145,3 +207,38 @@ EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 EMAIL_HOST = os.environ.get("EMAIL_HOST")
 EMAIL_PORT = os.environ.get("EMAIL_PORT")
 ADMIN_EMAIL = os.environ.get("ADMIN_EMAIL")
+
+# Cola de tareas en segundo plano (emails). En False se ejecutan en línea.
+BACKGROUND_TASKS_ASYNC = os.environ.get("BACKGROUND_TASKS_ASYNC", "True") == "True"
+
+# Perfil de SQLite aplicado al abrir cada conexión (ver sistema_inmobiliaria/db.py).
+# WAL permite leer mientras otro proceso escribe; busy_timeout espera el lock
+# en lugar de fallar con "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,          # ms
+    'mmap_size': 134217728,        # 128 MB
+    'cache_size': -20000,          # ~20 MB (negativo = KiB)
+    'temp_store': 'MEMORY',
+} if os.environ.get("SQLITE_TUNING", "True") == "True" else {}
+
+# Archivo de leads (python manage.py archivar_leads): antigüedad en días a partir
+# de la cual las consultas respondidas y las visitas cerradas pasan al archivo
+ARCHIVO_LEADS_DIAS = int(os.environ.get("ARCHIVO_LEADS_DIAS", 180))
+
+# Tarjetas de propiedad cacheadas (templatetags/propiedades.py). La versión va
+# en la clave, así que el timeout solo limita cuánto ocupan las versiones viejas
+TARJETAS_CACHE_TIMEOUT = int(os.environ.get("TARJETAS_CACHE_TIMEOUT", 60 * 60 * 24))
+
+# Páginas completas para anónimos (sistema_inmobiliaria/middleware.py). Se
+# invalidan al editar catálogo o blog; el timeout acota lo demás
+PAGINA_CACHE_TIMEOUT = int(os.environ.get("PAGINA_CACHE_TIMEOUT", 300))
+
+# Visitas de propiedades y entradas (sistema_inmobiliaria/contador_vistas.py):
+# cada worker las suma en memoria y las vuelca cada tantos segundos
+CONTADOR_VISTAS_INTERVALO = int(os.environ.get("CONTADOR_VISTAS_INTERVALO", 5))
+
+# Sitemap y feeds (sistema_inmobiliaria/sindicacion.py). Van con la versión de
+# catálogo y blog en la clave: editar invalida, el timeout solo limita lo viejo
+SITEMAP_CACHE_TIMEOUT = int(os.environ.get("SITEMAP_CACHE_TIMEOUT", 60 * 60 * 24))
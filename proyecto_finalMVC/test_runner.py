@@ -0,0 +1,35 @@
+"""
+Runner de ``manage.py test`` (TEST_RUNNER en settings.py).
+
+Cambia solo el entorno de los tests, sin tocar la configuración de
+producción: caché en memoria (no leer lo que dejó en disco otra corrida),
+staticfiles sin manifest (no hace falta correr collectstatic) y contador de
+visitas sin hilo (los tests vuelcan con volcar_vistas()).
+
+La caché de páginas arranca apagada: la caché en memoria dura toda la corrida
+mientras cada TestCase deshace sus filas (y SQLite reutiliza los ids), y la
+invalidación corre en on_commit, que dentro de un TestCase solo se ejecuta con
+captureOnCommitCallbacks. Los tests que la prueban la activan con
+self.settings(PAGINA_CACHE_TIMEOUT=...) y limpian la caché.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class InmobiliariaTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        backend, location = settings.CACHE_BACKENDS['memoria']
+        self._entorno = override_settings(
+            CACHE_BACKEND='memoria',
+            CACHES={'default': {**settings.CACHES['default'], 'BACKEND': backend, 'LOCATION': location}},
+            STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+            PAGINA_CACHE_TIMEOUT=0,
+            CONTADOR_VISTAS_INTERVALO=0,
+        )
+        self._entorno.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._entorno.disable()
+        super().teardown_test_environment(**kwargs)
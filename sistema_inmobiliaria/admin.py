@@ -2,9 +2,18 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from django.db import models
+from django.utils import timezone
+from django.db import models, transaction
 
-from sistema_inmobiliaria.models import Propiedad, Vendedor, Categoria, Entrada, Consulta, SolicitudVisita, SuscriptorNewsletter
+from sistema_inmobiliaria.models import (
+    Propiedad, Vendedor, Categoria, Entrada, Consulta, SolicitudVisita, SuscriptorNewsletter,
+    ConsultaArchivada, SolicitudVisitaArchivada,
+)
+from sistema_inmobiliaria.services import cambiar_estado_visitas
+from sistema_inmobiliaria.blog import invalidar_sidebar_blog, recalcular_contadores
+from sistema_inmobiliaria.middleware import invalidar_paginas
+from sistema_inmobiliaria.relacionadas import recalcular_relacionadas
+from sistema_inmobiliaria.tasks import encolar
 
 # Register your models here.
 
@@ -88,7 +97,7 @@ class EntradaAdmin(admin.ModelAdmin):
             'fields': ('imagen', 'imagen_alt'),
         }),
         ('Configuración', {
-            'fields': ('estado', 'destacado', 'tiempo_lectura', 'fecha_publicacion'),
+            'fields': ('estado', 'destacado', 'tiempo_lectura', 'palabras', 'vistas', 'fecha_publicacion'),
             'classes': ('wide',)
         }),
         ('SEO', {
@@ -97,7 +106,8 @@ class EntradaAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
+    # Tiempo de lectura y palabras se calculan al guardar el contenido
+    readonly_fields = ['fecha_creacion', 'fecha_actualizacion', 'tiempo_lectura', 'palabras', 'vistas']
     
     # Forzar widget de archivo para el campo imagen
     formfield_overrides = {
@@ -107,6 +117,7 @@ class EntradaAdmin(admin.ModelAdmin):
     def estado_badge(self, obj):
         colors = {
             'borrador': '#6c757d',
+            'programado': '#17a2b8',
             'publicado': '#28a745', 
             'archivado': '#dc3545'
         }
@@ -151,18 +162,36 @@ class EntradaAdmin(admin.ModelAdmin):
     
     actions = ['marcar_como_publicado', 'marcar_como_borrador', 'marcar_como_destacado']
     
+    def _actualizar(self, queryset, **campos):
+        # update() no pasa por save ni por los signals: se actualiza la fecha
+        # (validadores del detalle), se recalculan los contadores y las
+        # relacionadas y se invalidan el sidebar y las páginas cacheadas a mano
+        ahora = timezone.now()
+        if 'estado' in campos:
+            ids = list(queryset.values_list('pk', flat=True))
+            transaction.on_commit(lambda: encolar(recalcular_relacionadas, ids))
+        if campos.get('estado') == 'publicado':
+            # Las de fecha futura quedan programadas, como al guardarlas
+            queryset.filter(fecha_publicacion__gt=ahora).update(fecha_actualizacion=ahora, estado='programado')
+            queryset = queryset.filter(fecha_publicacion__lte=ahora)
+        updated = queryset.update(fecha_actualizacion=ahora, **campos)
+        recalcular_contadores()
+        invalidar_sidebar_blog()
+        invalidar_paginas('blog')
+        return updated
+    
     def marcar_como_publicado(self, request, queryset):
-        updated = queryset.update(estado='publicado')
+        updated = self._actualizar(queryset, estado='publicado')
         self.message_user(request, f'{updated} entrada(s) marcada(s) como publicada(s).')
     marcar_como_publicado.short_description = "Marcar como publicado"
     
     def marcar_como_borrador(self, request, queryset):
-        updated = queryset.update(estado='borrador')
+        updated = self._actualizar(queryset, estado='borrador')
         self.message_user(request, f'{updated} entrada(s) marcada(s) como borrador.')
     marcar_como_borrador.short_description = "Marcar como borrador"
     
     def marcar_como_destacado(self, request, queryset):
-        updated = queryset.update(destacado=True)
+        updated = self._actualizar(queryset, destacado=True)
         self.message_user(request, f'{updated} entrada(s) marcada(s) como destacada(s).')
     marcar_como_destacado.short_description = "Marcar como destacado"
 
@@ -194,7 +223,6 @@ class ConsultaAdmin(admin.ModelAdmin):
         'email', 
         'mensaje', 
         'asunto',
-        'propiedad__titulo'
     ]
     
     readonly_fields = ['fecha_consulta']
@@ -276,6 +304,19 @@ class ConsultaAdmin(admin.ModelAdmin):
             return format_html('<a href="{}">{}</a>', url, obj.propiedad.titulo[:30])
         return '-'
     propiedad_link.short_description = 'Propiedad'
+    
+    def get_queryset(self, request):
+        # La propiedad vive en otra base: prefetch en lugar de JOIN
+        return super().get_queryset(request).prefetch_related('propiedad')
+    
+    def get_search_results(self, request, queryset, search_term):
+        filtrado = queryset
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            # Búsqueda por título de la propiedad en dos pasos (no hay JOIN entre bases)
+            propiedad_ids = Propiedad.objects.filter(titulo__icontains=search_term).values_list('id', flat=True)
+            queryset |= filtrado.filter(propiedad_id__in=list(propiedad_ids))
+        return queryset, may_have_duplicates
 
 
 @admin.register(SolicitudVisita)
@@ -285,6 +326,8 @@ class SolicitudVisitaAdmin(admin.ModelAdmin):
     search_fields = ['nombre', 'email', 'mensaje']
     readonly_fields = ['fecha_solicitud']
     ordering = ['-fecha_solicitud']
+    # Sin select_related automático: la propiedad vive en otra base
+    list_select_related = ()
     
     fieldsets = (
         ('Información del Cliente', {
@@ -301,9 +344,27 @@ class SolicitudVisitaAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
-
-
-
+    
+    actions = ['confirmar_visitas', 'rechazar_visitas', 'completar_visitas']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('propiedad')
+    
+    def _cambiar_estado(self, request, queryset, estado, descripcion):
+        updated = cambiar_estado_visitas(queryset, estado)
+        self.message_user(request, f'{updated} solicitud(es) marcada(s) como {descripcion}.')
+    
+    def confirmar_visitas(self, request, queryset):
+        self._cambiar_estado(request, queryset, 'confirmada', 'confirmada(s)')
+    confirmar_visitas.short_description = "Confirmar visitas seleccionadas"
+    
+    def rechazar_visitas(self, request, queryset):
+        self._cambiar_estado(request, queryset, 'rechazada', 'rechazada(s)')
+    rechazar_visitas.short_description = "Rechazar visitas seleccionadas"
+    
+    def completar_visitas(self, request, queryset):
+        self._cambiar_estado(request, queryset, 'completada', 'completada(s)')
+    completar_visitas.short_description = "Marcar visitas como completadas"
 
 
 @admin.register(SuscriptorNewsletter)
@@ -315,6 +376,45 @@ class SuscriptorNewsletterAdmin(admin.ModelAdmin):
     ordering = ['-fecha_suscripcion']
 
 
+
+class ArchivoAdmin(admin.ModelAdmin):
+    """
+    Admin de solo lectura para el archivo de leads.
+
+    El archivo crece sin límite, así que no se lista nada hasta que se busca
+    algo y tampoco se cuenta el total de filas.
+    """
+    show_full_result_count = False
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset.none(), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+@admin.register(ConsultaArchivada)
+class ConsultaArchivadaAdmin(ArchivoAdmin):
+    list_display = ['nombre', 'email', 'tipo', 'propiedad_titulo', 'fecha_consulta', 'fecha_archivado']
+    search_fields = ['nombre', 'email', 'mensaje', 'propiedad_titulo']
+    ordering = ['-fecha_consulta']
+
+
+@admin.register(SolicitudVisitaArchivada)
+class SolicitudVisitaArchivadaAdmin(ArchivoAdmin):
+    list_display = ['nombre', 'email', 'propiedad_titulo', 'fecha_preferida', 'estado', 'fecha_archivado']
+    search_fields = ['nombre', 'email', 'mensaje', 'propiedad_titulo']
+    ordering = ['-fecha_preferida']
+
 # Personalización del admin
 admin.site.site_header = "Sistema Inmobiliaria - Administración"
 admin.site.site_title = "Admin Sistema Inmobiliaria"
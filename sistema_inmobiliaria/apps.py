@@ -7,3 +7,4 @@ class SistemaInmobiliariaConfig(AppConfig):
     
     def ready(self):
         import sistema_inmobiliaria.signals
+        import sistema_inmobiliaria.db
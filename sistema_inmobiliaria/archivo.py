@@ -0,0 +1,114 @@
+"""
+Archivo de leads: mueve consultas y visitas cerradas antiguas a tablas frías.
+
+Las tablas calientes (Consulta, SolicitudVisita) quedan chicas, así los
+listados del admin, sus list_filter y los índices no se degradan con el
+tiempo. Cada lote se copia y se borra dentro de una misma transacción en
+la base de leads, de modo que un corte a mitad de camino no duplica ni
+pierde filas.
+"""
+from datetime import timedelta
+
+from django.db import router, transaction
+from django.utils import timezone
+
+from .models import (
+    Consulta,
+    ConsultaArchivada,
+    Propiedad,
+    SolicitudVisita,
+    SolicitudVisitaArchivada,
+)
+
+
+ESTADOS_VISITA_ARCHIVABLES = ('completada', 'rechazada')
+
+
+def consultas_archivables(limite):
+    return Consulta.objects.filter(respondida=True, fecha_consulta__lt=limite)
+
+
+def visitas_archivables(limite):
+    return SolicitudVisita.objects.filter(
+        estado__in=ESTADOS_VISITA_ARCHIVABLES, fecha_preferida__lt=limite.date()
+    )
+
+
+def _titulos(propiedad_ids):
+    ids = {pk for pk in propiedad_ids if pk}
+    if not ids:
+        return {}
+    return dict(Propiedad.objects.filter(id__in=ids).values_list('id', 'titulo'))
+
+
+def _copiar_consulta(consulta, titulos):
+    return ConsultaArchivada(
+        consulta_id=consulta.pk,
+        nombre=consulta.nombre,
+        email=consulta.email,
+        telefono=consulta.telefono,
+        mensaje=consulta.mensaje,
+        origen=consulta.origen,
+        tipo=consulta.tipo,
+        propiedad_id=consulta.propiedad_id,
+        propiedad_titulo=titulos.get(consulta.propiedad_id, ''),
+        asunto=consulta.asunto,
+        presupuesto=consulta.presupuesto,
+        fecha_consulta=consulta.fecha_consulta,
+        respondida=consulta.respondida,
+        respuesta=consulta.respuesta,
+        fecha_respuesta=consulta.fecha_respuesta,
+        prioridad=consulta.prioridad,
+        notas_internas=consulta.notas_internas,
+    )
+
+
+def _copiar_visita(solicitud, titulos):
+    return SolicitudVisitaArchivada(
+        solicitud_id=solicitud.pk,
+        propiedad_id=solicitud.propiedad_id,
+        propiedad_titulo=titulos.get(solicitud.propiedad_id, ''),
+        nombre=solicitud.nombre,
+        email=solicitud.email,
+        telefono=solicitud.telefono,
+        fecha_preferida=solicitud.fecha_preferida,
+        hora_preferida=solicitud.hora_preferida,
+        mensaje=solicitud.mensaje,
+        fecha_solicitud=solicitud.fecha_solicitud,
+        estado=solicitud.estado,
+        respuesta_agente=solicitud.respuesta_agente,
+    )
+
+
+def _archivar(queryset, modelo_archivo, copiar, lote, simular=False):
+    """
+    Mueve las filas de ``queryset`` al archivo en lotes de ``lote`` filas.
+    Devuelve la cantidad de filas movidas (o que se moverían, si ``simular``).
+    """
+    if simular:
+        return queryset.count()
+
+    db = router.db_for_write(queryset.model)
+    movidas = 0
+    while True:
+        with transaction.atomic(using=db):
+            filas = list(queryset.order_by('pk')[:lote])
+            if not filas:
+                break
+            titulos = _titulos(fila.propiedad_id for fila in filas)
+            modelo_archivo.objects.bulk_create([copiar(fila, titulos) for fila in filas])
+            queryset.model.objects.filter(pk__in=[fila.pk for fila in filas]).delete()
+        movidas += len(filas)
+    return movidas
+
+
+def archivar_leads(dias, lote=500, simular=False):
+    """
+    Archiva las consultas respondidas y las visitas completadas/rechazadas
+    con más de ``dias`` de antigüedad. Devuelve (consultas, visitas).
+    """
+    limite = timezone.now() - timedelta(days=dias)
+    return (
+        _archivar(consultas_archivables(limite), ConsultaArchivada, _copiar_consulta, lote, simular),
+        _archivar(visitas_archivables(limite), SolicitudVisitaArchivada, _copiar_visita, lote, simular),
+    )
@@ -0,0 +1,189 @@
+"""
+Datos del sidebar del blog precalculados en un único objeto cacheado.
+
+Categorías con su conteo de entradas publicadas, entradas destacadas y
+autores solo cambian cuando un editor guarda o borra una Entrada o una
+Categoria; los signals de esos modelos invalidan el paquete (ver
+signals.invalidar_sidebar_blog) y las páginas del blog no repiten los
+agregados en cada request.
+
+También mantiene ContadorEntradas, que reemplaza los COUNT(*) de la
+paginación del blog cuando no hay búsqueda por texto.
+
+Una entrada con fecha futura se guarda como 'programado' y
+publicar_programadas la publica al llegar su fecha (comando
+publicar_programadas). Lo visible del blog depende solo de la columna estado:
+nada de lo que se cachea vence por el paso del tiempo, solo por los signals.
+"""
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Categoria, ContadorEntradas, Entrada
+
+
+CLAVE_SIDEBAR = 'blog:sidebar'
+SIDEBAR_TIMEOUT = None  # hasta que lo invaliden los signals
+
+
+def _construir_sidebar():
+    categorias = list(Categoria.objects.annotate(
+        entradas_count=Count('entrada', filter=Q(entrada__estado='publicado'))
+    ))
+    return {
+        'categorias': categorias,
+        'categorias_con_conteo': [c for c in categorias if c.entradas_count > 0],
+        'entradas_destacadas': list(Entrada.destacadas().select_related('categoria').defer(*Entrada.CAMPOS_CUERPO)[:3]),
+        'autores': list(Entrada.publicadas().values_list('autor', flat=True).distinct().order_by('autor')),
+    }
+
+
+def sidebar_blog():
+    """
+    Devuelve el dict con categorias, categorias_con_conteo,
+    entradas_destacadas y autores
+    """
+    sidebar = cache.get(CLAVE_SIDEBAR)
+    if sidebar is None:
+        sidebar = _construir_sidebar()
+        cache.set(CLAVE_SIDEBAR, sidebar, SIDEBAR_TIMEOUT)
+    return sidebar
+
+
+def invalidar_sidebar_blog():
+    cache.delete(CLAVE_SIDEBAR)
+
+
+# ============ CONTADORES DE ENTRADAS PUBLICADAS ============
+
+def _clave_contador(categoria_id, fecha_publicacion, destacado):
+    return (categoria_id or 0, timezone.localdate(fecha_publicacion), bool(destacado))
+
+
+def _ajustar_contador(clave, delta):
+    categoria_id, dia, destacado = clave
+    filtro = {'categoria_id': categoria_id, 'dia': dia, 'destacado': destacado}
+    ContadorEntradas.objects.get_or_create(**filtro)
+    ContadorEntradas.objects.filter(**filtro).update(cantidad=F('cantidad') + delta)
+
+
+def actualizar_contadores(entrada, creada=False, borrada=False):
+    """
+    Mueve la entrada entre contadores según sus valores anteriores (los
+    que conserva FieldTrackerMixin) y los actuales
+    """
+    anterior = nuevo = None
+    if not creada and entrada.previous('estado') == 'publicado':
+        anterior = _clave_contador(
+            entrada.previous('categoria_id'), entrada.previous('fecha_publicacion'), entrada.previous('destacado')
+        )
+    if not borrada and entrada.estado == 'publicado':
+        nuevo = _clave_contador(entrada.categoria_id, entrada.fecha_publicacion, entrada.destacado)
+    if anterior == nuevo:
+        return
+    with transaction.atomic():
+        if anterior:
+            _ajustar_contador(anterior, -1)
+        if nuevo:
+            _ajustar_contador(nuevo, 1)
+
+
+def mover_contadores_sin_categoria(categoria_id):
+    """
+    Al borrar una categoría sus entradas quedan sin categoría (SET_NULL, sin
+    signals de Entrada): sus contadores pasan a la categoría 0
+    """
+    with transaction.atomic():
+        for fila in ContadorEntradas.objects.filter(categoria_id=categoria_id):
+            _ajustar_contador((0, fila.dia, fila.destacado), fila.cantidad)
+            fila.delete()
+
+
+def recalcular_contadores():
+    """
+    Reconstruye todos los contadores con una sola consulta agrupada; para
+    después de un queryset.update() sobre Entrada, que no dispara signals
+    """
+    filas = (
+        Entrada.objects.filter(estado='publicado')
+        .annotate(dia=TruncDate('fecha_publicacion', tzinfo=timezone.get_current_timezone()))
+        .values('categoria_id', 'dia', 'destacado')
+        .annotate(cantidad=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        ContadorEntradas.objects.all().delete()
+        ContadorEntradas.objects.bulk_create([
+            ContadorEntradas(
+                categoria_id=fila['categoria_id'] or 0,
+                dia=fila['dia'],
+                destacado=fila['destacado'],
+                cantidad=fila['cantidad'],
+            )
+            for fila in filas
+        ])
+
+
+def contar_entradas(categoria=None, desde=None, destacadas=False):
+    """
+    Cantidad de Entrada.publicadas() con los filtros de categoría, fecha y
+    destacadas sin recorrerlas: sale toda de ContadorEntradas, que solo
+    cuenta entradas ya publicadas
+    """
+    contadores = ContadorEntradas.objects.all()
+    if categoria is not None:
+        contadores = contadores.filter(categoria_id=categoria.pk)
+    if desde is not None:
+        contadores = contadores.filter(dia__gte=desde)
+    if destacadas:
+        contadores = contadores.filter(destacado=True)
+    return contadores.aggregate(total=Sum('cantidad'))['total'] or 0
+
+
+# ============ PUBLICACIÓN PROGRAMADA ============
+
+def proxima_publicacion():
+    """
+    Fecha de la próxima entrada programada, o None
+    """
+    return (
+        Entrada.objects.filter(estado='programado')
+        .order_by('fecha_publicacion').values_list('fecha_publicacion', flat=True).first()
+    )
+
+
+def publicar_programadas():
+    """
+    Publica las entradas programadas cuya fecha ya llegó y devuelve cuántas.
+    Cada una se guarda con save(), así corren los mismos signals que al
+    publicarla a mano (contadores, sidebar, páginas cacheadas, búsqueda y
+    relacionadas)
+    """
+    publicadas = 0
+    pendientes = Entrada.objects.filter(
+        estado='programado', fecha_publicacion__lte=timezone.now()
+    ).order_by('fecha_publicacion')
+    for entrada in pendientes:
+        with transaction.atomic():
+            # Si corre más de un publicador, solo uno toma cada entrada
+            tomada = Entrada.objects.filter(pk=entrada.pk, estado='programado').update(estado='publicado')
+            if not tomada:
+                continue
+            # El tracker sigue viendo 'programado' como estado anterior
+            entrada.estado = 'publicado'
+            entrada.save()
+        publicadas += 1
+    return publicadas
+
+
+class PaginadorConTotal(Paginator):
+    """
+    Paginator que recibe el total ya calculado en lugar de hacer su COUNT
+    """
+
+    def __init__(self, object_list, per_page, total, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.__dict__['count'] = total
@@ -0,0 +1,109 @@
+"""
+Búsqueda de texto completo del blog sobre un índice FTS5 de SQLite.
+
+El índice (EntradaBusqueda, tabla virtual blog_busqueda) guarda el título,
+el resumen, el texto plano (Entrada.texto_plano) y el autor de cada
+entrada; se actualiza en los signals de Entrada. La búsqueda es un JOIN con las entradas, así que
+los filtros de estado, categoría y fecha van en la misma consulta, y el
+orden por relevancia sale de bm25().
+"""
+import html
+import re
+
+from django.db import connections, router
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from .models import Entrada, EntradaBusqueda
+
+
+TABLA = EntradaBusqueda._meta.db_table
+
+# Peso de cada columna en bm25 (titulo, resumen, contenido, autor)
+PESOS = (10.0, 4.0, 1.0, 2.0)
+
+# Palabras del fragmento de contexto en el listado
+PALABRAS_FRAGMENTO = 24
+
+# Marcas del fragmento: caracteres de control que no aparecen en el texto,
+# para escapar el fragmento antes de convertirlas en <mark>
+_INICIO_MARCA = '\x02'
+_FIN_MARCA = '\x03'
+
+_RE_PALABRA = re.compile(r'\w+')
+
+
+def texto_plano(contenido):
+    """
+    Texto del HTML de una entrada, sin etiquetas ni entidades
+    """
+    return ' '.join(html.unescape(strip_tags(contenido or '')).split())
+
+
+def _db():
+    return router.db_for_write(EntradaBusqueda)
+
+
+def indexar_entrada(entrada, using=None):
+    with connections[using or _db()].cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {TABLA} (rowid, titulo, resumen, contenido, autor) '
+            'VALUES (%s, %s, %s, %s, %s)',
+            [entrada.pk, entrada.titulo, texto_plano(entrada.resumen),
+             entrada.texto_plano, entrada.autor],
+        )
+
+
+def desindexar_entrada(entrada_id, using=None):
+    with connections[using or _db()].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA} WHERE rowid = %s', [entrada_id])
+
+
+def reindexar_busqueda():
+    """
+    Reconstruye el índice completo (la migración lo llena la primera vez)
+    """
+    with connections[_db()].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA}')
+    for entrada in Entrada.objects.only('titulo', 'resumen', 'texto_plano', 'autor').iterator():
+        indexar_entrada(entrada)
+
+
+def consulta_fts(termino):
+    """
+    Convierte lo que escribió el usuario en una consulta FTS5 segura: cada
+    palabra entre comillas (sin operadores) y como prefijo, todas requeridas.
+    Devuelve '' si no hay palabras.
+    """
+    return ' '.join(f'"{palabra}"*' for palabra in _RE_PALABRA.findall(termino))
+
+
+def buscar_entradas(entradas, termino):
+    """
+    Filtra el queryset de entradas por el término y agrega ``relevancia``
+    (bm25: menor es mejor) y ``fragmento`` (contexto con las coincidencias
+    marcadas, ver fragmento_html)
+    """
+    consulta = consulta_fts(termino)
+    pesos = ', '.join(str(peso) for peso in PESOS)
+    entradas = entradas.annotate(
+        relevancia=RawSQL(f'bm25("{TABLA}", {pesos})', ()),
+        fragmento=RawSQL(
+            f"snippet(\"{TABLA}\", -1, %s, %s, '…', {PALABRAS_FRAGMENTO})",
+            (_INICIO_MARCA, _FIN_MARCA),
+        ),
+    )
+    # Sin palabras no hay nada que buscar (y MATCH '' es un error de sintaxis)
+    if not consulta:
+        return entradas.none()
+    return entradas.filter(busqueda__documento__match=consulta)
+
+
+def fragmento_html(fragmento):
+    """
+    Fragmento escapado, con las coincidencias en <mark>
+    """
+    return mark_safe(
+        escape(fragmento).replace(_INICIO_MARCA, '<mark>').replace(_FIN_MARCA, '</mark>')
+    )
@@ -0,0 +1,271 @@
+"""
+Backends de caché compartidos entre los workers de un mismo nodo.
+
+Sin CACHES cada worker de gunicorn tenía su propio LocMemCache, así que lo
+que calentaba un proceso no lo aprovechaba otro. settings.CACHE_BACKEND
+elige uno de estos backends (ver settings.py):
+
+- 'archivo': FileBasedCache en un directorio local.
+- 'sqlite':  una tabla en un archivo SQLite propio (WAL), sin servidor.
+- 'redis':   cualquier servidor que hable el protocolo de Redis (requiere
+             el paquete ``redis``).
+- 'memoria': LocMemCache por proceso, para desarrollo.
+
+Todos cuentan aciertos y fallos de ``get``, ``get_many`` (uno por clave) y
+``has_key``. Los contadores se acumulan en
+memoria y se vuelcan a la propia caché cada VOLCAR_CADA lecturas, así el
+comando estadisticas_cache ve el total de todos los workers. El volcado usa
+``incr``, atómico entre procesos en 'redis' (INCRBY) y 'sqlite' (BEGIN
+IMMEDIATE). En 'archivo' es un get + set: dos workers que vuelcan a la vez
+pueden pisarse y perder una de las sumas, así que ahí las estadísticas son
+aproximadas.
+"""
+import contextlib
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache as _RedisCache
+
+
+CLAVE_ACIERTOS = 'estadisticas_cache:aciertos'
+CLAVE_FALLOS = 'estadisticas_cache:fallos'
+VOLCAR_CADA = 100
+
+_AUSENTE = object()
+
+
+class ContadoresMixin:
+    """
+    Cuenta aciertos/fallos de ``get``, ``get_many`` y ``has_key`` y los
+    acumula en la caché compartida
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._contadores_lock = threading.Lock()
+        self._pendientes = [0, 0]
+        self._sin_contar = threading.local()
+
+    @contextlib.contextmanager
+    def _no_contar(self):
+        """
+        Lo que el backend lee por dentro (get_many e incr que pasan por get,
+        add que pasa por has_key, el volcado) no se cuenta aparte
+        """
+        anterior = getattr(self._sin_contar, 'activo', False)
+        self._sin_contar.activo = True
+        try:
+            yield
+        finally:
+            self._sin_contar.activo = anterior
+
+    def get(self, key, default=None, version=None):
+        valor = super().get(key, _AUSENTE, version=version)
+        if valor is _AUSENTE:
+            self._contar(0, 1)
+            return default
+        self._contar(1, 0)
+        return valor
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with self._no_contar():
+            valores = super().get_many(keys, version=version)
+        self._contar(len(valores), len(keys) - len(valores))
+        return valores
+
+    def has_key(self, key, version=None):
+        with self._no_contar():
+            existe = super().has_key(key, version=version)
+        self._contar(int(existe), int(not existe))
+        return existe
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._no_contar():
+            return super().add(key, value, timeout=timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._no_contar():
+            return super().incr(key, delta, version=version)
+
+    def _contar(self, aciertos, fallos):
+        if getattr(self._sin_contar, 'activo', False):
+            return
+        with self._contadores_lock:
+            self._pendientes[0] += aciertos
+            self._pendientes[1] += fallos
+            if sum(self._pendientes) < VOLCAR_CADA:
+                return
+            aciertos, fallos = self._pendientes
+            self._pendientes = [0, 0]
+        self._volcar(aciertos, fallos)
+
+    def _volcar(self, aciertos, fallos):
+        with self._no_contar():
+            for clave, cantidad in ((CLAVE_ACIERTOS, aciertos), (CLAVE_FALLOS, fallos)):
+                if not cantidad:
+                    continue
+                # Sin expiración; add() crea el contador solo si no existe
+                super().add(clave, 0, timeout=None)
+                try:
+                    super().incr(clave, cantidad)
+                except ValueError:
+                    super().set(clave, cantidad, timeout=None)
+
+    def estadisticas(self):
+        """
+        Totales de todos los procesos, incluidas las lecturas de este
+        proceso que todavía no se volcaron
+        """
+        with self._contadores_lock:
+            aciertos, fallos = self._pendientes
+            self._pendientes = [0, 0]
+        self._volcar(aciertos, fallos)
+        with self._no_contar():
+            totales = super().get_many([CLAVE_ACIERTOS, CLAVE_FALLOS])
+        return {
+            'aciertos': totales.get(CLAVE_ACIERTOS, 0),
+            'fallos': totales.get(CLAVE_FALLOS, 0),
+        }
+
+    def reiniciar_estadisticas(self):
+        with self._contadores_lock:
+            self._pendientes = [0, 0]
+        super().delete_many([CLAVE_ACIERTOS, CLAVE_FALLOS])
+
+
+class MemoriaCache(ContadoresMixin, LocMemCache):
+    pass
+
+
+class ArchivoCache(ContadoresMixin, FileBasedCache):
+    pass
+
+
+class RedisCache(ContadoresMixin, _RedisCache):
+    pass
+
+
+class _SQLiteCacheBase(BaseCache):
+    """
+    Caché en un archivo SQLite: una fila por clave con el valor serializado
+    y la fecha de expiración. Cada hilo usa su propia conexión.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._ruta = str(location)
+        self._local = threading.local()
+        self._tabla_creada = False
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self._ruta, timeout=5, isolation_level=None)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            if not self._tabla_creada:
+                conexion.execute(
+                    'CREATE TABLE IF NOT EXISTS cache '
+                    '(clave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL)'
+                )
+                conexion.execute('CREATE INDEX IF NOT EXISTS cache_expira ON cache (expira)')
+                self._tabla_creada = True
+            self._local.conexion = conexion
+        return conexion
+
+    def _leer(self, clave):
+        fila = self._conexion().execute(
+            'SELECT valor FROM cache WHERE clave = ? AND (expira IS NULL OR expira > ?)',
+            (clave, time.time()),
+        ).fetchone()
+        return _AUSENTE if fila is None else pickle.loads(fila[0])
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        clave = self.make_and_validate_key(key, version=version)
+        conexion = self._conexion()
+        # Primero se descarta una fila vencida, para que add pueda reemplazarla
+        conexion.execute('DELETE FROM cache WHERE clave = ? AND expira <= ?', (clave, time.time()))
+        cursor = conexion.execute(
+            'INSERT OR IGNORE INTO cache (clave, valor, expira) VALUES (?, ?, ?)',
+            (clave, pickle.dumps(value, self.pickle_protocol), self.get_backend_timeout(timeout)),
+        )
+        return cursor.rowcount == 1
+
+    def get(self, key, default=None, version=None):
+        valor = self._leer(self.make_and_validate_key(key, version=version))
+        return default if valor is _AUSENTE else valor
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        clave = self.make_and_validate_key(key, version=version)
+        conexion = self._conexion()
+        conexion.execute(
+            'INSERT OR REPLACE INTO cache (clave, valor, expira) VALUES (?, ?, ?)',
+            (clave, pickle.dumps(value, self.pickle_protocol), self.get_backend_timeout(timeout)),
+        )
+        if self._cull_frequency and random.randrange(self._cull_frequency) == 0:
+            self._cull(conexion)
+
+    def incr(self, key, delta=1, version=None):
+        clave = self.make_and_validate_key(key, version=version)
+        conexion = self._conexion()
+        # Leer y escribir con el lock de escritura tomado: otro proceso no
+        # puede intercalar su incr
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            valor = self._leer(clave)
+            if valor is _AUSENTE:
+                raise ValueError(f"Key '{key}' not found")
+            nuevo = valor + delta
+            conexion.execute(
+                'UPDATE cache SET valor = ? WHERE clave = ?', (pickle.dumps(nuevo, self.pickle_protocol), clave)
+            )
+        except BaseException:
+            conexion.execute('ROLLBACK')
+            raise
+        conexion.execute('COMMIT')
+        return nuevo
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        clave = self.make_and_validate_key(key, version=version)
+        cursor = self._conexion().execute(
+            'UPDATE cache SET expira = ? WHERE clave = ? AND (expira IS NULL OR expira > ?)',
+            (self.get_backend_timeout(timeout), clave, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        clave = self.make_and_validate_key(key, version=version)
+        cursor = self._conexion().execute('DELETE FROM cache WHERE clave = ?', (clave,))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        return self._leer(self.make_and_validate_key(key, version=version)) is not _AUSENTE
+
+    def clear(self):
+        self._conexion().execute('DELETE FROM cache')
+
+    def _cull(self, conexion):
+        """
+        Borra lo vencido y, si todavía hay más de MAX_ENTRIES filas, la
+        fracción 1/CULL_FREQUENCY que vence antes
+        """
+        conexion.execute('DELETE FROM cache WHERE expira <= ?', (time.time(),))
+        (cantidad,) = conexion.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if cantidad > self._max_entries:
+            conexion.execute(
+                'DELETE FROM cache WHERE clave IN '
+                '(SELECT clave FROM cache ORDER BY expira IS NULL, expira LIMIT ?)',
+                (cantidad // self._cull_frequency,),
+            )
+
+
+class SQLiteCache(ContadoresMixin, _SQLiteCacheBase):
+    pass
@@ -0,0 +1,115 @@
+"""
+Contadores de visitas de propiedades y entradas sin una escritura por request.
+
+Cada proceso (worker de gunicorn) suma las visitas en memoria y un hilo las
+vuelca cada CONTADOR_VISTAS_INTERVALO segundos, y una última vez al apagarse
+el proceso. Cada volcado es una transacción por modelo con un
+``UPDATE ... SET vistas = vistas + n WHERE ... IN (...)`` por cada cantidad
+distinta, en lugar de un UPDATE por visita que compita por el lock de
+escritura de SQLite.
+
+update() no pasa por save(): no cambia ``actualizado`` ni
+``fecha_actualizacion`` (ETags) ni dispara los signals que invalidan las
+páginas cacheadas.
+
+Con CONTADOR_VISTAS_INTERVALO = 0 (tests) no hay hilo: las visitas quedan en
+memoria hasta llamar a volcar_vistas().
+"""
+import atexit
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, router, transaction
+from django.db.models import F
+
+
+# Valores por UPDATE (límite de parámetros de SQLite)
+TAMANO_LOTE = 500
+
+# Claves distintas en memoria a partir de las cuales se vuelca sin esperar
+MAXIMO_PENDIENTES = 10000
+
+_pendientes = Counter()  # (modelo, campo, valor) -> visitas
+_lock = threading.Lock()
+_hilo = None
+_despertar = threading.Event()
+_parar = threading.Event()
+
+
+def registrar_vista(modelo, campo, valor):
+    """
+    Suma una visita a la fila de ``modelo`` con ``campo`` == ``valor``
+    """
+    with _lock:
+        _pendientes[(modelo, campo, valor)] += 1
+        lleno = len(_pendientes) >= MAXIMO_PENDIENTES
+    if settings.CONTADOR_VISTAS_INTERVALO > 0:
+        _iniciar_hilo()
+        if lleno:
+            _despertar.set()
+
+
+def volcar_vistas():
+    """
+    Escribe las visitas acumuladas y devuelve cuántas se volcaron. Si falla
+    la escritura de un modelo, sus visitas vuelven a quedar pendientes
+    """
+    with _lock:
+        pendientes = dict(_pendientes)
+        _pendientes.clear()
+
+    # (modelo, campo) -> visitas -> valores
+    grupos = defaultdict(lambda: defaultdict(list))
+    for (modelo, campo, valor), visitas in pendientes.items():
+        grupos[(modelo, campo)][visitas].append(valor)
+
+    volcadas = 0
+    for (modelo, campo), por_cantidad in grupos.items():
+        try:
+            with transaction.atomic(using=router.db_for_write(modelo)):
+                for visitas, valores in por_cantidad.items():
+                    for inicio in range(0, len(valores), TAMANO_LOTE):
+                        modelo.objects.filter(
+                            **{f'{campo}__in': valores[inicio:inicio + TAMANO_LOTE]}
+                        ).update(vistas=F('vistas') + visitas)
+        except Exception as e:
+            print(f"Error volcando vistas de {modelo.__name__}: {e}")
+            with _lock:
+                for visitas, valores in por_cantidad.items():
+                    for valor in valores:
+                        _pendientes[(modelo, campo, valor)] += visitas
+        else:
+            volcadas += sum(visitas * len(valores) for visitas, valores in por_cantidad.items())
+    return volcadas
+
+
+def _volcar_periodicamente():
+    while not _parar.is_set():
+        _despertar.wait(settings.CONTADOR_VISTAS_INTERVALO)
+        _despertar.clear()
+        close_old_connections()
+        volcar_vistas()
+        close_old_connections()
+
+
+def _iniciar_hilo():
+    global _hilo
+    if _hilo is not None and _hilo.is_alive():
+        return
+    with _lock:
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_volcar_periodicamente, name='vistas-inmobiliaria', daemon=True)
+            _hilo.start()
+
+
+@atexit.register
+def _volcar_al_salir(timeout=10):
+    """
+    Al apagar el worker, despierta al hilo para que vuelque lo que quede
+    en memoria antes de terminar
+    """
+    if _hilo is not None and _hilo.is_alive():
+        _parar.set()
+        _despertar.set()
+        _hilo.join(timeout)
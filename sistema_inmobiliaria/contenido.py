@@ -0,0 +1,229 @@
+"""
+Render-on-write del cuerpo de las entradas del blog.
+
+Entrada.contenido es el HTML tal como lo escribe el editor en el admin. Al
+guardar la entrada se procesa una sola vez y se guardan en columnas:
+
+- contenido_html: el HTML saneado que se muestra (solo etiquetas y atributos
+  permitidos, sin scripts ni URLs javascript:), con las imágenes en
+  loading="lazy" y un id y un enlace de ancla en cada título.
+- texto_plano: el texto sin etiquetas, para el resumen y el índice de
+  búsqueda.
+- palabras y tiempo_lectura.
+
+Las vistas y los templates leen esas columnas y no vuelven a procesar el
+cuerpo.
+"""
+import math
+import re
+from collections import namedtuple
+from html import escape
+from html.parser import HTMLParser
+
+from django.utils.text import slugify
+
+
+PALABRAS_POR_MINUTO = 200
+
+ETIQUETAS_PERMITIDAS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'caption', 'cite', 'code', 'del', 'div',
+    'em', 'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i',
+    'img', 'ins', 'li', 'mark', 'ol', 'p', 'pre', 'q', 's', 'small', 'span',
+    'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr',
+    'u', 'ul',
+}
+
+# Atributos por etiqueta; los de '*' valen para todas
+ATRIBUTOS_PERMITIDOS = {
+    '*': {'class', 'title'},
+    'a': {'href', 'target', 'rel'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan', 'scope'},
+    'ol': {'start'},
+}
+
+# Etiquetas que se descartan con todo su contenido
+ETIQUETAS_DESCARTADAS = {'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript', 'svg', 'math'}
+
+ETIQUETAS_VACIAS = {'br', 'hr', 'img'}
+
+# Cortes de línea en el texto plano
+ETIQUETAS_BLOQUE = {
+    'blockquote', 'br', 'div', 'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'hr', 'li', 'p', 'pre', 'td', 'th', 'tr',
+}
+
+# Etiquetas que cierran un <p> abierto, como hace el navegador
+ETIQUETAS_CIERRAN_PARRAFO = {
+    'blockquote', 'div', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr',
+    'ol', 'p', 'pre', 'table', 'ul',
+}
+
+# Etiqueta -> (la que cierra implícitamente, contenedores que cortan la búsqueda)
+CIERRES_IMPLICITOS = {
+    'li': ('li', {'ul', 'ol'}),
+    'tr': ('tr', {'table', 'thead', 'tbody', 'tfoot'}),
+    'td': ('td', {'tr'}),
+    'th': ('th', {'tr'}),
+}
+
+TITULOS = {'h2', 'h3', 'h4'}
+
+ESQUEMAS_PERMITIDOS = {'http', 'https', 'mailto', 'tel'}
+
+_RE_ESQUEMA = re.compile(r'^\s*([a-zA-Z][a-zA-Z0-9+.-]*):')
+_RE_PALABRA = re.compile(r'\w+')
+
+ContenidoRenderizado = namedtuple('ContenidoRenderizado', 'html texto palabras tiempo_lectura')
+
+
+def _url_segura(url):
+    # Se quitan los caracteres de control que los navegadores ignoran
+    # (java\tscript:) antes de mirar el esquema
+    limpia = ''.join(caracter for caracter in url if caracter >= ' ')
+    esquema = _RE_ESQUEMA.match(limpia)
+    return esquema is None or esquema.group(1).lower() in ESQUEMAS_PERMITIDOS
+
+
+class _Saneador(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.salida = []
+        self.texto = []
+        self.abiertas = []
+        self.descartando = 0
+        self.titulo = None  # (posición en salida, atributos, texto, profundidad)
+        self.anclas = set()
+
+    def _atributos(self, etiqueta, atributos):
+        permitidos = ATRIBUTOS_PERMITIDOS['*'] | ATRIBUTOS_PERMITIDOS.get(etiqueta, set())
+        resultado = {}
+        for nombre, valor in atributos:
+            nombre = nombre.lower()
+            if nombre not in permitidos or valor is None:
+                continue
+            if nombre in ('href', 'src') and not _url_segura(valor):
+                continue
+            resultado[nombre] = valor
+        if etiqueta == 'img':
+            resultado.setdefault('alt', '')
+            resultado['loading'] = 'lazy'
+            resultado['decoding'] = 'async'
+        if etiqueta == 'a' and resultado.get('target') == '_blank':
+            resultado['rel'] = 'noopener noreferrer'
+        return resultado
+
+    @staticmethod
+    def _etiqueta(etiqueta, atributos):
+        partes = ''.join(f' {nombre}="{escape(valor)}"' for nombre, valor in atributos.items())
+        return f'<{etiqueta}{partes}>'
+
+    def _ancla(self, texto):
+        base = slugify(texto) or 'seccion'
+        ancla, numero = base, 2
+        while ancla in self.anclas:
+            ancla, numero = f'{base}-{numero}', numero + 1
+        self.anclas.add(ancla)
+        return ancla
+
+    def handle_starttag(self, etiqueta, atributos):
+        if etiqueta in ETIQUETAS_DESCARTADAS:
+            if etiqueta not in ETIQUETAS_VACIAS:
+                self.descartando += 1
+            return
+        if self.descartando:
+            return
+        if etiqueta in ETIQUETAS_BLOQUE:
+            self.texto.append('\n')
+        if etiqueta not in ETIQUETAS_PERMITIDAS:
+            return
+        self._cierre_implicito(etiqueta)
+        atributos = self._atributos(etiqueta, atributos)
+        if etiqueta in TITULOS and self.titulo is None:
+            # El id sale del texto del título: se completa en el cierre
+            self.titulo = (len(self.salida), atributos, [], len(self.abiertas))
+            self.salida.append('')
+        else:
+            self.salida.append(self._etiqueta(etiqueta, atributos))
+        if etiqueta not in ETIQUETAS_VACIAS:
+            self.abiertas.append(etiqueta)
+
+    def handle_startendtag(self, etiqueta, atributos):
+        self.handle_starttag(etiqueta, atributos)
+        if etiqueta not in ETIQUETAS_VACIAS:
+            self.handle_endtag(etiqueta)
+
+    def handle_endtag(self, etiqueta):
+        if etiqueta in ETIQUETAS_DESCARTADAS:
+            self.descartando = max(self.descartando - 1, 0)
+            return
+        if self.descartando:
+            return
+        if etiqueta in ETIQUETAS_BLOQUE:
+            self.texto.append('\n')
+        if etiqueta in self.abiertas:
+            # Cierra también lo que haya quedado abierto adentro
+            self._cerrar_hasta(etiqueta)
+
+    def _cerrar_hasta(self, etiqueta):
+        while self.abiertas:
+            abierta = self.abiertas.pop()
+            self._cerrar(abierta)
+            if abierta == etiqueta:
+                return
+
+    def _cierre_implicito(self, etiqueta):
+        if etiqueta in ETIQUETAS_CIERRAN_PARRAFO and 'p' in self.abiertas:
+            self._cerrar_hasta('p')
+        if etiqueta in CIERRES_IMPLICITOS:
+            hermana, contenedores = CIERRES_IMPLICITOS[etiqueta]
+            for abierta in reversed(self.abiertas):
+                if abierta in contenedores:
+                    return
+                if abierta == hermana:
+                    self._cerrar_hasta(hermana)
+                    return
+
+    def _cerrar(self, etiqueta):
+        if self.titulo is not None and len(self.abiertas) == self.titulo[3]:
+            posicion, atributos, texto, _ = self.titulo
+            atributos['id'] = self._ancla(''.join(texto))
+            self.salida[posicion] = self._etiqueta(etiqueta, atributos)
+            self.salida.append(
+                f'<a class="ancla-titulo" href="#{atributos["id"]}" aria-label="Enlace a esta sección">#</a>'
+            )
+            self.titulo = None
+        self.salida.append(f'</{etiqueta}>')
+
+    def handle_data(self, datos):
+        if self.descartando:
+            return
+        self.salida.append(escape(datos, quote=False))
+        self.texto.append(datos)
+        if self.titulo is not None:
+            self.titulo[2].append(datos)
+
+    def close(self):
+        super().close()
+        self._cerrar_hasta(None)
+
+
+def renderizar(contenido):
+    """
+    Procesa el HTML de una entrada y devuelve ContenidoRenderizado(html,
+    texto, palabras, tiempo_lectura)
+    """
+    saneador = _Saneador()
+    saneador.feed(contenido or '')
+    saneador.close()
+    lineas = (' '.join(linea.split()) for linea in ''.join(saneador.texto).splitlines())
+    texto = '\n'.join(linea for linea in lineas if linea)
+    palabras = len(_RE_PALABRA.findall(texto))
+    return ContenidoRenderizado(
+        html=''.join(saneador.salida),
+        texto=texto,
+        palabras=palabras,
+        tiempo_lectura=max(1, math.ceil(palabras / PALABRAS_POR_MINUTO)),
+    )
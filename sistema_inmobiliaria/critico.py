@@ -0,0 +1,228 @@
+"""
+CSS crítico por tipo de página.
+
+Los estilos propios viven en archivos estáticos (css/base.css y
+css/paginas/<pagina>.css) que el navegador cachea y que se cargan sin
+bloquear el render. En el HTML queda inline solo el subconjunto que usa la
+parte visible al abrir la página: la barra de navegación, el hero y las
+primeras líneas del contenido.
+
+El subconjunto se calcula a partir de los templates, sin navegador: se
+juntan las etiquetas, clases e ids del marcado inicial y se conservan las
+reglas cuyos selectores usan solo esos nombres. El comando css_critico lo
+escribe en templates/sistema_inmobiliaria/critico/<pagina>.css, que las
+páginas incluyen en el bloque css_critico de base.html.
+"""
+import posixpath
+import re
+from pathlib import Path
+
+from django.contrib.staticfiles import finders
+
+from .storage import minificar_css
+
+
+DIRECTORIO_TEMPLATES = Path(__file__).resolve().parent / 'templates' / 'sistema_inmobiliaria'
+DIRECTORIO_CRITICO = DIRECTORIO_TEMPLATES / 'critico'
+
+# Líneas del bloque content que se consideran visibles sin hacer scroll
+LINEAS_VISIBLES = 40
+
+# pagina -> hojas de estilo propias (además de css/base.css). 'base' es el
+# CSS crítico por defecto, solo con la navegación.
+PAGINAS = {
+    'base': [],
+    'home': [],
+    'propiedades': ['css/paginas/propiedades.css'],
+    'propiedad': ['css/paginas/propiedad.css'],
+    'blog': ['css/paginas/blog.css'],
+    'entrada': ['css/paginas/entrada.css'],
+    'contacto': ['css/paginas/contacto.css'],
+    'nosotros': ['css/paginas/nosotros.css'],
+}
+
+_RE_ETIQUETA_TEMPLATE = re.compile(r'{%.*?%}|{{.*?}}|{#.*?#}', re.DOTALL)
+_RE_ETIQUETA_HTML = re.compile(r'<([a-zA-Z][a-zA-Z0-9-]*)')
+_RE_ATRIBUTO = re.compile(r'\b(class|id)="([^"]*)"')
+_RE_COMENTARIO = re.compile(r'/\*.*?\*/', re.DOTALL)
+_RE_URL = re.compile(r'''url\(\s*['"]?(?!data:|https?:|/)([^'")]+)['"]?\s*\)''')
+_RE_KEYFRAMES = re.compile(r'@(?:-webkit-)?keyframes\s+([\w-]+)')
+# Estados que no se ven en el primer pintado
+_RE_PSEUDO_INTERACTIVA = re.compile(r':(hover|focus|focus-within|focus-visible|active|visited)\b')
+_RE_PSEUDO = re.compile(r'::?[\w-]+(\([^)]*\))?')
+_SIEMPRE = {':root', 'html', 'body', '*'}
+
+
+def _bloque(template, nombre):
+    """
+    Contenido de {% block nombre %} ... {% endblock %} (sin bloques anidados)
+    """
+    coincidencia = re.search(
+        r'{%%\s*block\s+%s\s*%%}(.*?){%%\s*endblock' % nombre, template, re.DOTALL
+    )
+    return coincidencia.group(1) if coincidencia else ''
+
+
+def marcado_visible(pagina, lineas=LINEAS_VISIBLES):
+    """
+    Marcado de la parte visible al abrir la página: lo que base.html pone
+    antes del hero (navegación) más el hero y las primeras líneas del
+    contenido del template de la página
+    """
+    base = (DIRECTORIO_TEMPLATES / 'base.html').read_text(encoding='utf-8')
+    marcado = [base[base.index('<body'):base.index('{% block hero %}')]]
+    if pagina != 'base':
+        template = (DIRECTORIO_TEMPLATES / f'{pagina}.html').read_text(encoding='utf-8')
+        contenido = _bloque(template, 'content').strip('\n').splitlines()[:lineas]
+        marcado += [_bloque(template, 'hero'), '\n'.join(contenido)]
+    return '\n'.join(marcado)
+
+
+def nombres_usados(html):
+    """
+    Etiquetas, clases (con punto) e ids (con numeral) del marcado. Lo que
+    arman las etiquetas de template se descarta: las clases fijas alcanzan
+    """
+    html = _RE_ETIQUETA_TEMPLATE.sub(' ', html)
+    nombres = {etiqueta.lower() for etiqueta in _RE_ETIQUETA_HTML.findall(html)}
+    for atributo, valor in _RE_ATRIBUTO.findall(html):
+        prefijo = '.' if atributo == 'class' else '#'
+        nombres.update(prefijo + parte for parte in valor.split())
+    return nombres
+
+
+def _reglas(css):
+    """
+    Recorre el CSS y devuelve (prelude, cuerpo) por regla. Para las
+    at-rules con bloque (@media, @keyframes) el cuerpo es el texto interno;
+    las que no tienen bloque (@charset, @import) se descartan
+    """
+    css = _RE_COMENTARIO.sub('', css)
+    reglas = []
+    posicion = 0
+    while True:
+        apertura = css.find('{', posicion)
+        if apertura == -1:
+            return reglas
+        profundidad = 1
+        cierre = apertura + 1
+        while profundidad:
+            if css[cierre] == '{':
+                profundidad += 1
+            elif css[cierre] == '}':
+                profundidad -= 1
+            cierre += 1
+        prelude = css[posicion:apertura].rsplit(';', 1)[-1].strip()
+        reglas.append((prelude, css[apertura + 1:cierre - 1]))
+        posicion = cierre
+
+
+def _selectores(prelude):
+    """
+    Separa una lista de selectores por las comas que no están dentro de
+    paréntesis (:not(.a, .b))
+    """
+    selectores, actual, profundidad = [], '', 0
+    for caracter in prelude:
+        if caracter == ',' and not profundidad:
+            selectores.append(actual.strip())
+            actual = ''
+            continue
+        profundidad += {'(': 1, ')': -1}.get(caracter, 0)
+        actual += caracter
+    selectores.append(actual.strip())
+    return selectores
+
+
+def _selector_visible(selector, nombres, interactivas):
+    if selector in _SIEMPRE:
+        return True
+    if not interactivas and _RE_PSEUDO_INTERACTIVA.search(selector):
+        return False
+    selector = _RE_PSEUDO.sub('', re.sub(r'\[[^\]]*\]', '', selector))
+    for compuesto in re.split(r'\s*[\s>+~]\s*', selector):
+        for parte in re.findall(r'[.#]?[\w-]+|\*', compuesto):
+            if parte != '*' and parte.lower() not in nombres and parte not in nombres:
+                return False
+    return True
+
+
+def filtrar_reglas(css, nombres, interactivas=False):
+    """
+    Deja las reglas con algún selector que use solo los nombres dados (ver
+    nombres_usados), y de cada regla solo esos selectores. Con
+    ``interactivas`` se conservan también :hover, :focus, etc.; los
+    @keyframes quedan si alguna regla conservada los usa.
+    """
+    criticas = []
+    for prelude, cuerpo in _reglas(css):
+        if prelude.startswith(('@media', '@supports')):
+            internas = filtrar_reglas(cuerpo, nombres, interactivas)
+            if internas:
+                criticas.append(f'{prelude}{{{internas}}}')
+        elif prelude.startswith('@'):
+            # @keyframes: se decide al final, según las animaciones usadas
+            criticas.append((prelude, cuerpo))
+        else:
+            visibles = [
+                selector for selector in _selectores(prelude)
+                if _selector_visible(selector, nombres, interactivas)
+            ]
+            if visibles:
+                criticas.append(f"{','.join(visibles)}{{{cuerpo}}}")
+
+    usadas = ''.join(regla for regla in criticas if isinstance(regla, str))
+    resultado = []
+    for regla in criticas:
+        if isinstance(regla, tuple):
+            prelude, cuerpo = regla
+            nombre = _RE_KEYFRAMES.match(prelude)
+            if nombre is None or not re.search(r'\b%s\b' % re.escape(nombre.group(1)), usadas):
+                continue
+            regla = f'{prelude}{{{cuerpo}}}'
+        resultado.append(regla)
+    return '\n'.join(resultado)
+
+
+def _urls_a_static(css, hoja):
+    """
+    Las url() relativas a la hoja pasan a {% static %}, para que apunten al
+    archivo con hash una vez hecho collectstatic
+    """
+    directorio = posixpath.dirname(hoja)
+
+    def reemplazar(coincidencia):
+        ruta = posixpath.normpath(posixpath.join(directorio, coincidencia.group(1)))
+        return "url('{%% static \"%s\" %%}')" % ruta
+    return _RE_URL.sub(reemplazar, css)
+
+
+def css_critico(pagina):
+    """
+    CSS crítico minificado de la página, listo para ir dentro de <style>
+    """
+    nombres = nombres_usados(marcado_visible(pagina))
+    partes = []
+    for hoja in ['css/base.css', *PAGINAS[pagina]]:
+        hoja = f'sistema_inmobiliaria/{hoja}'
+        ruta = finders.find(hoja)
+        if ruta is None:
+            raise ValueError(f"CSS crítico de {pagina}: no se encontró {hoja}")
+        css = Path(ruta).read_text(encoding='utf-8')
+        partes.append(_urls_a_static(filtrar_reglas(css, nombres), hoja))
+    return minificar_css('\n'.join(partes))
+
+
+def escribir_css_critico(pagina):
+    """
+    Escribe templates/sistema_inmobiliaria/critico/<pagina>.css y devuelve
+    su ruta
+    """
+    DIRECTORIO_CRITICO.mkdir(exist_ok=True)
+    destino = DIRECTORIO_CRITICO / f'{pagina}.css'
+    destino.write_text(
+        '{% load static %}{# Generado con: python manage.py css_critico #}\n'
+        + css_critico(pagina) + '\n',
+        encoding='utf-8',
+    )
+    return destino
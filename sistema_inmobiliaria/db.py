@@ -0,0 +1,38 @@
+"""
+Ajustes de conexión a la base de datos.
+
+SQLite viene con valores pensados para un solo proceso: journal en modo
+rollback, fsync en cada commit y sin espera ante bloqueos. Con varios
+workers de gunicorn escribiendo consultas a la vez eso termina en errores
+"database is locked". Aquí se aplica el perfil de settings.SQLITE_PRAGMAS
+cada vez que Django abre una conexión.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def sentencias_pragma(pragmas=None):
+    """
+    Convierte el dict de pragmas en sentencias SQL, en un orden estable
+    (journal_mode primero, porque afecta al resto)
+    """
+    if pragmas is None:
+        pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    orden = sorted(pragmas, key=lambda nombre: nombre != 'journal_mode')
+    return [f"PRAGMA {nombre} = {pragmas[nombre]}" for nombre in orden]
+
+
+@receiver(connection_created)
+def aplicar_pragmas_sqlite(sender, connection, **kwargs):
+    """
+    Aplica el perfil de pragmas a cada nueva conexión SQLite
+    """
+    if connection.vendor != 'sqlite':
+        return
+    cursor = connection.connection.cursor()
+    try:
+        for sentencia in sentencias_pragma():
+            cursor.execute(sentencia)
+    finally:
+        cursor.close()
@@ -1,20 +1,22 @@
-from django.core.mail import send_mail, EmailMultiAlternatives
+from django.core.mail import send_mail, EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.conf import settings
 from django.urls import reverse
+from asgiref.sync import sync_to_async
 import uuid
 
 
-def enviar_email_contacto_propiedad(contacto):
+def mensaje_contacto_propiedad(contacto):
     """
-    Envía email al agente cuando alguien contacta sobre una propiedad
+    Arma el email al agente por una consulta sobre una propiedad; None si la
+    propiedad no tiene agente con email
     """
     propiedad = contacto.propiedad
     agente = propiedad.vendedor_id
     
     if not agente or not agente.email:
-        return False
+        return None
     
     asunto = f"Nueva consulta sobre {propiedad.titulo}"
     
@@ -29,15 +31,26 @@ def enviar_email_contacto_propiedad(contacto):
     html_content = render_to_string('emails/contacto_propiedad_agente.html', context)
     text_content = strip_tags(html_content)
     
+    msg = EmailMultiAlternatives(
+        subject=asunto,
+        body=text_content,
+        from_email=settings.EMAIL_HOST_USER,
+        to=[agente.email],
+        reply_to=[contacto.email]
+    )
+    msg.attach_alternative(html_content, "text/html")
+    return msg
+
+
+def enviar_email_contacto_propiedad(contacto):
+    """
+    Envía email al agente cuando alguien contacta sobre una propiedad
+    """
+    msg = mensaje_contacto_propiedad(contacto)
+    if msg is None:
+        return False
+    
     try:
-        msg = EmailMultiAlternatives(
-            subject=asunto,
-            body=text_content,
-            from_email=settings.EMAIL_HOST_USER,
-            to=[agente.email],
-            reply_to=[contacto.email]
-        )
-        msg.attach_alternative(html_content, "text/html")
         msg.send()
         return True
     except Exception as e:
@@ -45,23 +58,16 @@ def enviar_email_contacto_propiedad(contacto):
         return False
 
 
-def enviar_email_solicitud_visita(solicitud):
+def mensaje_solicitud_visita(solicitud):
     """
-    Envía email al agente cuando alguien solicita una visita
+    Arma el email al agente por una solicitud de visita; None si la
+    propiedad no tiene agente con email
     """
-    print(f"=== DEBUG: enviar_email_solicitud_visita ===")
-    print(f"Solicitud ID: {solicitud.id}")
-    
     propiedad = solicitud.propiedad
-    print(f"Propiedad: {propiedad.titulo}")
-    
     agente = propiedad.vendedor_id
-    print(f"Agente: {agente}")
-    print(f"Agente email: {agente.email if agente else 'No agente'}")
     
     if not agente or not agente.email:
-        print(f"ERROR: No hay agente o email para la propiedad {propiedad.titulo}")
-        return False
+        return None
     
     asunto = f"Nueva solicitud de visita para {propiedad.titulo}"
     
@@ -73,36 +79,32 @@ def enviar_email_solicitud_visita(solicitud):
     }
     
     # Renderizar template HTML
-    print(f"Renderizando template con contexto...")
-    try:
-        html_content = render_to_string('emails/solicitud_visita_agente.html', context)
-        text_content = strip_tags(html_content)
-        print(f"Template renderizado exitosamente")
-    except Exception as e:
-        print(f"ERROR renderizando template: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
-    
-    print(f"Enviando email a: {agente.email}")
-    print(f"Asunto: {asunto}")
+    html_content = render_to_string('emails/solicitud_visita_agente.html', context)
+    text_content = strip_tags(html_content)
     
+    msg = EmailMultiAlternatives(
+        subject=asunto,
+        body=text_content,
+        from_email=settings.EMAIL_HOST_USER,
+        to=[agente.email],
+        reply_to=[solicitud.email]
+    )
+    msg.attach_alternative(html_content, "text/html")
+    return msg
+
+
+def enviar_email_solicitud_visita(solicitud):
+    """
+    Envía email al agente cuando alguien solicita una visita
+    """
     try:
-        msg = EmailMultiAlternatives(
-            subject=asunto,
-            body=text_content,
-            from_email=settings.EMAIL_HOST_USER,
-            to=[agente.email],
-            reply_to=[solicitud.email]
-        )
-        msg.attach_alternative(html_content, "text/html")
+        msg = mensaje_solicitud_visita(solicitud)
+        if msg is None:
+            return False
         msg.send()
-        print(f"Email enviado exitosamente a {agente.email}")
         return True
     except Exception as e:
-        print(f"ERROR enviando email: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"Error enviando email: {e}")
         return False
 
 
@@ -137,22 +139,12 @@ def enviar_email_contacto_general(contacto):
         return False
 
 
-def enviar_confirmacion_newsletter(suscriptor, request):
+def mensaje_confirmacion_newsletter(suscriptor, confirm_url):
     """
-    Envía email de confirmación para suscripción al newsletter
+    Arma el email de confirmación de la suscripción al newsletter
     """
-    # Generar token único para confirmación
-    token = str(uuid.uuid4())
-    suscriptor.token_confirmacion = token
-    suscriptor.save()
-    
     asunto = "Confirma tu suscripción al newsletter"
     
-    # URL de confirmación
-    confirm_url = request.build_absolute_uri(
-        reverse('confirmar_newsletter', kwargs={'token': token})
-    )
-    
     # Contexto para el template
     context = {
         'suscriptor': suscriptor,
@@ -163,14 +155,34 @@ def enviar_confirmacion_newsletter(suscriptor, request):
     html_content = render_to_string('emails/confirmacion_newsletter.html', context)
     text_content = strip_tags(html_content)
     
+    msg = EmailMultiAlternatives(
+        subject=asunto,
+        body=text_content,
+        from_email=settings.EMAIL_HOST_USER,
+        to=[suscriptor.email]
+    )
+    msg.attach_alternative(html_content, "text/html")
+    return msg
+
+
+def url_confirmacion_newsletter(request, token):
+    return request.build_absolute_uri(
+        reverse('confirmar_newsletter', kwargs={'token': token})
+    )
+
+
+def enviar_confirmacion_newsletter(suscriptor, request):
+    """
+    Envía email de confirmación para suscripción al newsletter
+    """
+    # Generar token único para confirmación
+    token = str(uuid.uuid4())
+    suscriptor.token_confirmacion = token
+    suscriptor.save()
+    
+    msg = mensaje_confirmacion_newsletter(suscriptor, url_confirmacion_newsletter(request, token))
+    
     try:
-        msg = EmailMultiAlternatives(
-            subject=asunto,
-            body=text_content,
-            from_email=settings.EMAIL_HOST_USER,
-            to=[suscriptor.email]
-        )
-        msg.attach_alternative(html_content, "text/html")
         msg.send()
         return True
     except Exception as e:
@@ -178,11 +190,59 @@ def enviar_confirmacion_newsletter(suscriptor, request):
         return False
 
 
-def enviar_notificacion_visita_confirmada(solicitud):
+# ============ ENVÍO ASÍNCRONO (vistas async de views.py) ============
+
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+async def enviar_async(msg):
     """
-    Envía email al cliente confirmando la visita
+    Envía un email sin bloquear el event loop mientras espera al servidor
+    SMTP. Con el backend SMTP y el paquete aiosmtplib instalado habla SMTP
+    de forma asíncrona; si no (tests, backend de consola) usa el backend
+    configurado en un hilo aparte. Devuelve True si se envió.
     """
-    asunto = f"Visita confirmada - {solicitud.propiedad.titulo}"
+    try:
+        import aiosmtplib
+    except ImportError:
+        aiosmtplib = None
+    
+    try:
+        if aiosmtplib is not None and settings.EMAIL_BACKEND == SMTP_BACKEND:
+            await aiosmtplib.send(
+                msg.message(),
+                sender=msg.from_email,
+                recipients=msg.recipients(),
+                hostname=settings.EMAIL_HOST,
+                port=int(settings.EMAIL_PORT or 25),
+                username=settings.EMAIL_HOST_USER or None,
+                password=settings.EMAIL_HOST_PASSWORD or None,
+                start_tls=settings.EMAIL_USE_TLS,
+                use_tls=settings.EMAIL_USE_SSL,
+                timeout=settings.EMAIL_TIMEOUT or 30,
+            )
+        else:
+            # thread_sensitive=False: el envío no usa la base y no tiene que
+            # esperar turno en el hilo compartido del ORM
+            await sync_to_async(msg.send, thread_sensitive=False)()
+        return True
+    except Exception as e:
+        print(f"Error enviando email: {e}")
+        return False
+
+
+# Template y asunto del email al cliente según el nuevo estado de la visita
+NOTIFICACIONES_VISITA = {
+    'confirmada': ('emails/visita_confirmada_cliente.html', "Visita confirmada - {titulo}"),
+    'rechazada': ('emails/visita_rechazada_cliente.html', "Solicitud de visita - {titulo}"),
+}
+
+
+def _mensaje_visita(solicitud, estado):
+    """
+    Arma el email al cliente para el cambio de estado de una visita
+    """
+    template, asunto = NOTIFICACIONES_VISITA[estado]
     
     # Contexto para el template
     context = {
@@ -192,17 +252,22 @@ def enviar_notificacion_visita_confirmada(solicitud):
     }
     
     # Renderizar template HTML
-    html_content = render_to_string('emails/visita_confirmada_cliente.html', context)
+    html_content = render_to_string(template, context)
     text_content = strip_tags(html_content)
     
+    msg = EmailMultiAlternatives(
+        subject=asunto.format(titulo=solicitud.propiedad.titulo),
+        body=text_content,
+        from_email=settings.EMAIL_HOST_USER,
+        to=[solicitud.email]
+    )
+    msg.attach_alternative(html_content, "text/html")
+    return msg
+
+
+def _enviar_notificacion_visita(solicitud, estado):
+    msg = _mensaje_visita(solicitud, estado)
     try:
-        msg = EmailMultiAlternatives(
-            subject=asunto,
-            body=text_content,
-            from_email=settings.EMAIL_HOST_USER,
-            to=[solicitud.email]
-        )
-        msg.attach_alternative(html_content, "text/html")
         msg.send()
         return True
     except Exception as e:
@@ -210,21 +275,64 @@ def enviar_notificacion_visita_confirmada(solicitud):
         return False
 
 
+def enviar_notificacion_visita_confirmada(solicitud):
+    """
+    Envía email al cliente confirmando la visita
+    """
+    return _enviar_notificacion_visita(solicitud, 'confirmada')
+
+
 def enviar_notificacion_visita_rechazada(solicitud):
     """
     Envía email al cliente informando que la visita fue rechazada
     """
-    asunto = f"Solicitud de visita - {solicitud.propiedad.titulo}"
+    return _enviar_notificacion_visita(solicitud, 'rechazada')
+
+
+def enviar_notificaciones_visitas(solicitud_ids, estado):
+    """
+    Envía en lote los emails de cambio de estado de varias visitas, usando
+    una sola consulta y una sola conexión SMTP. Devuelve la cantidad enviada.
+    """
+    from .models import SolicitudVisita
+    
+    if estado not in NOTIFICACIONES_VISITA:
+        return 0
+    
+    solicitudes = SolicitudVisita.objects.prefetch_related('propiedad__vendedor_id').filter(
+        id__in=solicitud_ids, estado=estado
+    )
+    mensajes = [_mensaje_visita(solicitud, estado) for solicitud in solicitudes]
+    if not mensajes:
+        return 0
+    
+    try:
+        return get_connection().send_messages(mensajes) or 0
+    except Exception as e:
+        print(f"Error enviando emails de visitas: {e}")
+        return 0
+
+
+def enviar_notificacion_consulta_respondida(consulta_id):
+    """
+    Envía email al cliente informando que su consulta fue respondida
+    """
+    from .models import Consulta
+    
+    consulta = Consulta.objects.prefetch_related('propiedad').filter(pk=consulta_id).first()
+    if consulta is None:
+        return False
+    
+    asunto = f"Respuesta a tu consulta - {consulta.asunto or 'Consulta General'}"
     
     # Contexto para el template
     context = {
-        'solicitud': solicitud,
-        'propiedad': solicitud.propiedad,
-        'agente': solicitud.propiedad.vendedor_id,
+        'consulta': consulta,
+        'propiedad': consulta.propiedad,
     }
     
     # Renderizar template HTML
-    html_content = render_to_string('emails/visita_rechazada_cliente.html', context)
+    html_content = render_to_string('emails/consulta_respondida.html', context)
     text_content = strip_tags(html_content)
     
     try:
@@ -232,11 +340,11 @@ def enviar_notificacion_visita_rechazada(solicitud):
             subject=asunto,
             body=text_content,
             from_email=settings.EMAIL_HOST_USER,
-            to=[solicitud.email]
+            to=[consulta.email],
         )
         msg.attach_alternative(html_content, "text/html")
         msg.send()
         return True
     except Exception as e:
-        print(f"Error enviando email: {e}")
+        print(f"Error enviando email de consulta respondida: {e}")
         return False
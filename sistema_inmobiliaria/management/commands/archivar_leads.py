@@ -0,0 +1,33 @@
+"""
+Mueve al archivo las consultas respondidas y las visitas cerradas antiguas.
+
+Pensado para correr periódicamente (cron / tarea programada), de modo que
+las tablas calientes solo tengan la ventana de los últimos ARCHIVO_LEADS_DIAS.
+
+Uso:
+    python manage.py archivar_leads
+    python manage.py archivar_leads --dias 90 --lote 1000 --simular
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sistema_inmobiliaria.archivo import archivar_leads
+
+
+class Command(BaseCommand):
+    help = 'Archiva consultas respondidas y visitas completadas/rechazadas antiguas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=None,
+            help='Antigüedad mínima en días (por defecto settings.ARCHIVO_LEADS_DIAS)'
+        )
+        parser.add_argument('--lote', type=int, default=500, help='Filas por transacción')
+        parser.add_argument('--simular', action='store_true', help='Solo contar, sin mover nada')
+
+    def handle(self, *args, **options):
+        dias = options['dias'] if options['dias'] is not None else settings.ARCHIVO_LEADS_DIAS
+        consultas, visitas = archivar_leads(dias, lote=options['lote'], simular=options['simular'])
+        accion = 'a archivar' if options['simular'] else 'archivadas'
+        self.stdout.write(f"Consultas {accion}: {consultas}")
+        self.stdout.write(f"Visitas {accion}: {visitas}")
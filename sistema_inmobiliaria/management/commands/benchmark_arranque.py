@@ -0,0 +1,104 @@
+"""
+Mide el arranque de un proceso: lo que paga cada worker de gunicorn al
+levantar y cada invocación de manage.py.
+
+Corre en procesos nuevos (python -X importtime) para medir imports en frío:
+django.setup() (settings, apps, modelos, signals) y la carga de las URLs
+(vistas, forms), que en un worker pasa con el primer request.
+
+Uso:
+    python manage.py benchmark_arranque
+    python manage.py benchmark_arranque --repeticiones 5 --top 30
+    python manage.py benchmark_arranque --maximo-ms 800   # falla si se pasa
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+SCRIPT = """
+import json, sys, time
+inicio = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls = time.perf_counter()
+print(json.dumps({
+    'setup_ms': (setup - inicio) * 1000,
+    'urls_ms': (urls - setup) * 1000,
+    'modulos': sorted(sys.modules),
+}))
+"""
+
+
+def _importtime(salida):
+    """
+    Interpreta las líneas de -X importtime:
+    ``import time: self [us] | cumulative | imported package``
+    """
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        modulos.append((nombre.strip(), int(propio) / 1000, int(acumulado) / 1000))
+    return modulos
+
+
+def medir_arranque():
+    """
+    Arranca un intérprete nuevo y devuelve los tiempos de setup y URLs, los
+    módulos cargados y los tiempos de import de cada uno
+    """
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    if proceso.returncode != 0:
+        raise CommandError(f"Falló el arranque:\n{proceso.stderr[-2000:]}")
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    resultado['imports'] = _importtime(proceso.stderr)
+    return resultado
+
+
+class Command(BaseCommand):
+    help = 'Mide django.setup() y el tiempo de import de cada módulo en un proceso nuevo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=3, help='Arranques a medir (se informa la mediana)')
+        parser.add_argument('--top', type=int, default=20, help='Módulos más lentos a listar')
+        parser.add_argument('--maximo-ms', type=float, help='Falla si setup + URLs supera este tiempo')
+
+    def handle(self, *args, **options):
+        mediciones = [medir_arranque() for _ in range(max(options['repeticiones'], 1))]
+        setup = statistics.median(m['setup_ms'] for m in mediciones)
+        urls = statistics.median(m['urls_ms'] for m in mediciones)
+        ultima = mediciones[-1]
+
+        self.stdout.write(f"django.setup(): {setup:.0f} ms")
+        self.stdout.write(f"Carga de URLs:  {urls:.0f} ms")
+        self.stdout.write(f"Módulos cargados: {len(ultima['modulos'])}")
+
+        # Tiempo propio agregado por paquete de primer nivel
+        por_paquete = defaultdict(float)
+        for nombre, propio, _ in ultima['imports']:
+            por_paquete[nombre.split('.')[0]] += propio
+        self.stdout.write("\nPor paquete (tiempo propio):")
+        for paquete, ms in sorted(por_paquete.items(), key=lambda item: -item[1])[:10]:
+            self.stdout.write(f"  {ms:8.1f} ms  {paquete}")
+
+        self.stdout.write("\nMódulos más lentos (acumulado, incluye lo que importan):")
+        lentos = sorted(ultima['imports'], key=lambda item: -item[2])[:options['top']]
+        for nombre, propio, acumulado in lentos:
+            self.stdout.write(f"  {acumulado:8.1f} ms  {propio:7.1f} ms  {nombre}")
+
+        total = setup + urls
+        if options['maximo_ms'] is not None and total > options['maximo_ms']:
+            raise CommandError(f"Arranque de {total:.0f} ms, más que el máximo de {options['maximo_ms']:.0f} ms")
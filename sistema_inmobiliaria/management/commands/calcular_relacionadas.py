@@ -0,0 +1,35 @@
+"""
+Recalcula las entradas relacionadas por contenido (TF-IDF + similitud
+coseno, ver relacionadas.py) de todas las entradas publicadas.
+
+Las ediciones del admin ya actualizan las filas afectadas; este comando
+rehace todo (por ejemplo a diario, o después de importar entradas), para
+que los pesos IDF reflejen el blog completo.
+
+Requiere numpy.
+
+Uso:
+    python manage.py calcular_relacionadas
+    python manage.py calcular_relacionadas --k 8
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sistema_inmobiliaria.relacionadas import K_RELACIONADAS, recalcular_relacionadas
+
+
+class Command(BaseCommand):
+    help = 'Precalcula las entradas relacionadas por contenido'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=K_RELACIONADAS, help='Relacionadas a guardar por entrada')
+
+    def handle(self, *args, **options):
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            raise CommandError("calcular_relacionadas necesita numpy (pip install numpy)")
+        inicio = time.perf_counter()
+        entradas = recalcular_relacionadas(k=options['k'])
+        self.stdout.write(f"Entradas procesadas: {entradas} en {(time.perf_counter() - inicio) * 1000:.0f} ms")
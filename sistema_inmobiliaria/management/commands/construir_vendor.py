@@ -0,0 +1,43 @@
+"""
+Construye las dependencias de front-end propias (Bootstrap, Font Awesome y
+fuentes) recortadas a lo que usan los templates.
+
+Uso:
+    python manage.py construir_vendor
+
+El deploy lo corre antes de collectstatic (bin/post_compile). En
+desarrollo se vuelve a correr al usar clases o íconos nuevos en los
+templates.
+"""
+import shutil
+from urllib.error import URLError
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sistema_inmobiliaria import vendor
+
+
+class Command(BaseCommand):
+    help = 'Descarga Bootstrap, Font Awesome y las fuentes y los deja purgados en static/'
+
+    def handle(self, *args, **options):
+        try:
+            import fontTools  # noqa: F401
+        except ImportError:
+            self.stdout.write(self.style.WARNING(
+                "fonttools no está instalado: las fuentes de íconos se copian completas"
+            ))
+
+        try:
+            archivos = vendor.construir()
+        except URLError as error:
+            raise CommandError(f"No se pudo descargar una dependencia: {error}")
+
+        # Se reemplaza todo el directorio para no dejar fuentes viejas
+        shutil.rmtree(vendor.DIRECTORIO_VENDOR, ignore_errors=True)
+        for ruta, contenido in sorted(archivos.items()):
+            destino = vendor.DIRECTORIO_VENDOR / ruta
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            destino.write_bytes(contenido)
+            self.stdout.write(f"{ruta}: {len(contenido) / 1024:.1f} KB")
+        self.stdout.write(self.style.SUCCESS(f"Listo en {vendor.DIRECTORIO_VENDOR}"))
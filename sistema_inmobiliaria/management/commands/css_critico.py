@@ -0,0 +1,31 @@
+"""
+Genera el CSS crítico que cada tipo de página lleva inline.
+
+Uso:
+    python manage.py css_critico
+    python manage.py css_critico --pagina home --pagina blog
+
+Se vuelve a correr después de cambiar los templates o las hojas de estilo
+(css/base.css, css/paginas/*.css), antes de collectstatic.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from sistema_inmobiliaria.critico import PAGINAS, escribir_css_critico
+
+
+class Command(BaseCommand):
+    help = 'Calcula el CSS crítico por página y lo escribe en templates/sistema_inmobiliaria/critico/'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pagina', action='append', choices=sorted(PAGINAS),
+            help='Página a generar (se puede repetir); por defecto, todas'
+        )
+
+    def handle(self, *args, **options):
+        for pagina in options['pagina'] or PAGINAS:
+            try:
+                destino = escribir_css_critico(pagina)
+            except ValueError as error:
+                raise CommandError(str(error))
+            self.stdout.write(f"{pagina}: {destino.stat().st_size / 1024:.1f} KB -> {destino.name}")
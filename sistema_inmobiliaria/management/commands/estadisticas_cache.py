@@ -0,0 +1,37 @@
+"""
+Muestra los aciertos y fallos acumulados de la caché compartida.
+
+Uso:
+    python manage.py estadisticas_cache
+    python manage.py estadisticas_cache --reiniciar
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Muestra la tasa de aciertos de la caché compartida por los workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reiniciar', action='store_true', help='Pone los contadores en cero')
+
+    def handle(self, *args, **options):
+        if not hasattr(cache, 'estadisticas'):
+            raise CommandError(f"El backend {settings.CACHES['default']['BACKEND']} no lleva contadores")
+
+        config = settings.CACHES['default']
+        self.stdout.write(f"Backend: {settings.CACHE_BACKEND} ({config['LOCATION']})")
+        self.stdout.write(f"Prefijo: {config['KEY_PREFIX']} - versión {config['VERSION']}")
+
+        if options['reiniciar']:
+            cache.reiniciar_estadisticas()
+            self.stdout.write(self.style.SUCCESS("Contadores reiniciados"))
+            return
+
+        datos = cache.estadisticas()
+        total = datos['aciertos'] + datos['fallos']
+        tasa = datos['aciertos'] / total * 100 if total else 0
+        self.stdout.write(f"Aciertos: {datos['aciertos']}")
+        self.stdout.write(f"Fallos: {datos['fallos']}")
+        self.stdout.write(f"Tasa de aciertos: {tasa:.1f}%")
@@ -0,0 +1,133 @@
+"""
+Prueba de estrés de escrituras concurrentes sobre SQLite.
+
+Compara los pragmas por defecto contra el perfil de settings.SQLITE_PRAGMAS
+usando varios procesos que insertan consultas mientras otros leen, como
+hacen los workers de gunicorn en producción. Las conexiones se abren sin la
+espera de 5 segundos que agrega el módulo sqlite3 de Python: solo espera el
+perfil que trae busy_timeout, como en SQLite sin ajustar.
+
+Los procesos se crean con el método por defecto de cada plataforma (fork en
+Linux, spawn en Windows y macOS); por eso las sentencias PRAGMA se arman en
+el proceso principal y los hijos no leen los settings.
+
+Uso:
+    python manage.py estres_sqlite --escritores 4 --lectores 2 --escrituras 300
+"""
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from sistema_inmobiliaria.db import sentencias_pragma
+
+
+TABLA = """
+CREATE TABLE consulta (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre VARCHAR(100) NOT NULL,
+    email VARCHAR(254) NOT NULL,
+    mensaje TEXT NOT NULL,
+    fecha_consulta DATETIME NOT NULL
+)
+"""
+
+
+def _conectar(ruta, sentencias):
+    # isolation_level=None: las transacciones se manejan a mano, como Django
+    conexion = sqlite3.connect(ruta, timeout=0, isolation_level=None)
+    for sentencia in sentencias:
+        conexion.execute(sentencia)
+    return conexion
+
+
+def _escritor(ruta, sentencias, escrituras, resultados):
+    conexion = _conectar(ruta, sentencias)
+    errores = 0
+    for i in range(escrituras):
+        try:
+            conexion.execute("BEGIN")
+            conexion.execute(
+                "INSERT INTO consulta (nombre, email, mensaje, fecha_consulta) "
+                "VALUES (?, ?, ?, datetime('now'))",
+                (f"Cliente {os.getpid()}-{i}", "cliente@example.com", "Consulta de estrés " * 10),
+            )
+            conexion.execute("COMMIT")
+        except sqlite3.OperationalError:
+            errores += 1
+            if conexion.in_transaction:
+                conexion.execute("ROLLBACK")
+    conexion.close()
+    resultados.put(errores)
+
+
+def _lector(ruta, sentencias, detener):
+    conexion = _conectar(ruta, sentencias)
+    while not detener.is_set():
+        try:
+            conexion.execute("SELECT COUNT(*) FROM consulta").fetchone()
+            conexion.execute(
+                "SELECT id, nombre, email FROM consulta ORDER BY fecha_consulta DESC LIMIT 20"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            pass
+    conexion.close()
+
+
+class Command(BaseCommand):
+    help = 'Mide escrituras concurrentes en SQLite con y sin el perfil SQLITE_PRAGMAS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, default=4, help='Procesos que insertan')
+        parser.add_argument('--lectores', type=int, default=2, help='Procesos que leen en paralelo')
+        parser.add_argument('--escrituras', type=int, default=200, help='Inserciones por escritor')
+
+    def handle(self, *args, **options):
+        perfiles = [
+            ('por defecto', {}),
+            ('SQLITE_PRAGMAS', None),  # None = perfil de settings (ver db.sentencias_pragma)
+        ]
+        for nombre, pragmas in perfiles:
+            total, errores, segundos = self._medir(pragmas, options)
+            self.stdout.write(
+                f"{nombre:>15}: {total - errores} escrituras en {segundos:.2f}s "
+                f"({(total - errores) / segundos:.0f}/s), {errores} errores de bloqueo"
+            )
+
+    def _medir(self, pragmas, options):
+        contexto = multiprocessing.get_context()
+        sentencias = sentencias_pragma(pragmas)
+
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'estres.sqlite3')
+            conexion = _conectar(ruta, sentencias)
+            conexion.execute(TABLA)
+            conexion.close()
+
+            resultados = contexto.Queue()
+            detener = contexto.Event()
+            lectores = [
+                contexto.Process(target=_lector, args=(ruta, sentencias, detener))
+                for _ in range(options['lectores'])
+            ]
+            escritores = [
+                contexto.Process(target=_escritor, args=(ruta, sentencias, options['escrituras'], resultados))
+                for _ in range(options['escritores'])
+            ]
+            for proceso in lectores:
+                proceso.start()
+
+            inicio = time.perf_counter()
+            for proceso in escritores:
+                proceso.start()
+            errores = sum(resultados.get() for _ in escritores)
+            segundos = time.perf_counter() - inicio
+
+            detener.set()
+            for proceso in escritores + lectores:
+                proceso.join()
+
+        return options['escritores'] * options['escrituras'], errores, segundos
@@ -0,0 +1,43 @@
+"""
+Copia a la base 'leads' las consultas, visitas, suscriptores y sesiones que
+quedaron en 'default' antes de separar las bases (ver routers.py).
+
+Uso (una sola vez, después de migrar la base nueva):
+    python manage.py migrate --database=leads
+    python manage.py mover_leads
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from sistema_inmobiliaria.routers import LEADS_DB, LEADS_MODELS
+
+
+class Command(BaseCommand):
+    help = "Copia los registros de leads desde la base 'default' a la base 'leads'"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Filas por INSERT')
+
+    def handle(self, *args, **options):
+        tablas_origen = connections['default'].introspection.table_names()
+        for etiqueta in sorted(LEADS_MODELS):
+            modelo = apps.get_model(etiqueta)
+            if modelo._meta.db_table not in tablas_origen:
+                self.stdout.write(f"{etiqueta}: no existe en 'default', nada que copiar")
+                continue
+            if modelo._base_manager.using(LEADS_DB).exists():
+                raise CommandError(f"{etiqueta} ya tiene datos en '{LEADS_DB}'; no se copia para evitar duplicados")
+
+            origen = modelo._base_manager.using('default').order_by('pk')
+            copiados = 0
+            with transaction.atomic(using=LEADS_DB):
+                lote = []
+                for objeto in origen.iterator(chunk_size=options['lote']):
+                    lote.append(objeto)
+                    if len(lote) >= options['lote']:
+                        copiados += len(modelo._base_manager.using(LEADS_DB).bulk_create(lote))
+                        lote = []
+                if lote:
+                    copiados += len(modelo._base_manager.using(LEADS_DB).bulk_create(lote))
+            self.stdout.write(f"{etiqueta}: {copiados} registros copiados")
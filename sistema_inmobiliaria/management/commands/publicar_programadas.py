@@ -0,0 +1,45 @@
+"""
+Publica las entradas del blog programadas cuya fecha de publicación llegó.
+
+Cada entrada se publica con save(), con la misma invalidación que una
+publicación manual (ver blog.publicar_programadas). Sin este proceso las
+entradas programadas no aparecen nunca.
+
+Se puede correr desde cron cada minuto, o como proceso aparte con
+--continuo (ver Procfile): revisa de nuevo al llegar la próxima fecha
+programada o cada --intervalo segundos, lo que ocurra antes, para ver las
+entradas que se programen mientras tanto.
+
+Uso:
+    python manage.py publicar_programadas
+    python manage.py publicar_programadas --continuo --intervalo 30
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from sistema_inmobiliaria.blog import proxima_publicacion, publicar_programadas
+
+
+class Command(BaseCommand):
+    help = 'Publica las entradas programadas cuya fecha ya llegó'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuo', action='store_true', help='Seguir corriendo y publicar a medida que llegan las fechas')
+        parser.add_argument('--intervalo', type=int, default=60, help='Segundos máximos entre revisiones con --continuo')
+
+    def handle(self, *args, **options):
+        while True:
+            publicadas = publicar_programadas()
+            if publicadas or not options['continuo']:
+                self.stdout.write(f"Entradas publicadas: {publicadas}")
+            if not options['continuo']:
+                return
+            espera = options['intervalo']
+            proxima = proxima_publicacion()
+            if proxima is not None:
+                espera = min(espera, (proxima - timezone.now()).total_seconds())
+            close_old_connections()
+            time.sleep(max(espera, 1))
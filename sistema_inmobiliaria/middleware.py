@@ -0,0 +1,303 @@
+"""
+Caché de página completa para visitantes anónimos.
+
+Las páginas públicas son iguales para todos los anónimos salvo el token
+CSRF de los formularios y los mensajes flash. Se guarda el HTML con esos
+dos huecos marcados y, al servirlo, solo se completan los huecos: la
+respuesta sale sin tocar el ORM ni el motor de templates (salvo el
+fragmento de mensajes, cuando los hay).
+
+Las vistas se marcan con @cache_pagina('catalogo', 'blog', ...) indicando
+de qué datos dependen; los signals llaman a invalidar_paginas() con esos
+mismos grupos, que cambian de versión y dejan afuera las páginas viejas.
+
+Las vistas con GET condicional usan @condicional en lugar de @condition: la
+página cacheada se sirve con los mismos ETag/Last-Modified que la vista y
+responde 304 igual que ella (una consulta por los validadores, sin renderizar).
+
+Los middlewares de este módulo funcionan en cadenas sync (WSGI) y async
+(ASGI): con uno solo que fuera sync, Django correría toda la cadena, y las
+vistas async, en un hilo por request.
+
+ContadorVistasMiddleware cuenta las visitas de las páginas de detalle,
+también las que salen de la caché (ver contador_vistas.py).
+"""
+import hashlib
+import re
+import time
+from calendar import timegm
+from datetime import datetime, timezone
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .contador_vistas import registrar_vista
+
+
+HUECO_CSRF = '<!--hueco:csrf-->'
+HUECO_MENSAJES = '<!--hueco:mensajes-->'
+
+_RE_CSRF = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+_RE_MENSAJES = re.compile(r'<!--mensajes-->.*?<!--/mensajes-->', re.DOTALL)
+
+
+def cache_pagina(*grupos):
+    """
+    Marca una vista como cacheable para anónimos. ``grupos`` son los datos
+    de los que depende la página ('catalogo', 'blog'); sin grupos la página
+    solo cambia con un deploy (CACHE_VERSION).
+    """
+    def decorador(vista):
+        vista.cache_pagina = grupos
+        return vista
+    return decorador
+
+
+def condicional(etag_func=None, last_modified_func=None):
+    """
+    @condition de Django que además deja los validadores en la vista, para
+    que PaginaCompletaCacheMiddleware los aplique a las páginas cacheadas
+    """
+    def decorador(vista):
+        vista = condition(etag_func=etag_func, last_modified_func=last_modified_func)(vista)
+        vista.validadores = (etag_func, last_modified_func)
+        return vista
+    return decorador
+
+
+def contar_vistas(modelo, campo, parametro=None):
+    """
+    Marca una vista de detalle cuyas visitas se cuentan (ver
+    ContadorVistasMiddleware). ``parametro`` es el argumento de la URL con
+    el valor de ``campo`` (por defecto, el mismo nombre)
+    """
+    def decorador(vista):
+        vista.contar_vistas = (modelo, campo, parametro or campo)
+        return vista
+    return decorador
+
+
+def _clave_version(grupo):
+    return f'pagina:version:{grupo}'
+
+
+def invalidar_paginas(*grupos):
+    """
+    Cambia la versión de los grupos: las páginas que dependen de ellos se
+    vuelven a renderizar en la próxima visita
+    """
+    version = time.time_ns()
+    cache.set_many({_clave_version(grupo): version for grupo in grupos}, None)
+
+
+def _versiones(grupos):
+    claves = [_clave_version(grupo) for grupo in grupos]
+    versiones = cache.get_many(claves)
+    faltantes = [clave for clave in claves if clave not in versiones]
+    if faltantes:
+        # Versión desalojada o nunca creada: una nueva nunca coincide con
+        # páginas guardadas antes
+        for clave in faltantes:
+            cache.add(clave, time.time_ns(), None)
+        versiones.update(cache.get_many(faltantes))
+    return [str(versiones.get(clave, '')) for clave in claves]
+
+
+def fecha_version(grupo):
+    """
+    Momento de la última invalidación del grupo: la versión es un
+    timestamp en nanosegundos
+    """
+    return datetime.fromtimestamp(int(_versiones([grupo])[0]) / 1e9, tz=timezone.utc)
+
+
+def version_grupos(*grupos):
+    """
+    Versión actual de los grupos, para armar claves de caché de otras
+    respuestas que dependen de los mismos datos (ver sindicacion.py)
+    """
+    return ':'.join(_versiones(grupos))
+
+
+class PaginaCompletaCacheMiddleware:
+    """
+    Va al final de MIDDLEWARE: CsrfViewMiddleware y MessageMiddleware ya
+    prepararon el request y, a la vuelta, fijan la cookie CSRF y consumen
+    los mensajes mostrados.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        clave = getattr(request, '_clave_pagina', None)
+        if clave and self._se_puede_guardar(request, response):
+            cache.set(clave, self._con_huecos(response), request._timeout_pagina)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        clave = getattr(request, '_clave_pagina', None)
+        if clave and self._se_puede_guardar(request, response):
+            await cache.aset(clave, self._con_huecos(response), request._timeout_pagina)
+        return response
+
+    def process_view(self, request, vista, args, kwargs):
+        grupos = getattr(vista, 'cache_pagina', None)
+        if grupos is None or not self._es_anonimo(request):
+            return None
+
+        ruta = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        clave = ':'.join(['pagina', *_versiones(grupos), ruta])
+        guardada = cache.get(clave)
+        if guardada is not None:
+            etag, ultima_modificacion = self._validadores(request, vista, args, kwargs)
+            response = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+            if response is None:
+                response = self._completar_huecos(request, guardada)
+            if ultima_modificacion:
+                response['Last-Modified'] = http_date(ultima_modificacion)
+            if etag:
+                response['ETag'] = etag
+            return response
+
+        request._clave_pagina = clave
+        request._timeout_pagina = settings.PAGINA_CACHE_TIMEOUT
+        return None
+
+    def _validadores(self, request, vista, args, kwargs):
+        # Igual que @condition: ETag entre comillas y fecha como timestamp
+        etag_func, last_modified_func = getattr(vista, 'validadores', (None, None))
+        etag = etag_func(request, *args, **kwargs) if etag_func else None
+        ultima_modificacion = last_modified_func(request, *args, **kwargs) if last_modified_func else None
+        return (
+            quote_etag(etag) if etag is not None else None,
+            timegm(ultima_modificacion.utctimetuple()) if ultima_modificacion else None,
+        )
+
+    def _es_anonimo(self, request):
+        # Sin cookie de sesión no hay usuario logueado ni datos de sesión,
+        # y se decide sin leer la base de sesiones
+        return (
+            request.method in ('GET', 'HEAD')
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        )
+
+    def _se_puede_guardar(self, request, response):
+        return (
+            request.method == 'GET'
+            and response.status_code == 200
+            and not response.streaming
+            and response.get('Content-Type', '').startswith('text/html')
+            and not response.cookies
+            and not request.session.modified
+        )
+
+    def _con_huecos(self, response):
+        html = response.content.decode(response.charset)
+        html = _RE_CSRF.sub(lambda m: m.group(1) + HUECO_CSRF + m.group(2), html)
+        html = _RE_MENSAJES.sub(HUECO_MENSAJES, html)
+        return {'html': html, 'content_type': response['Content-Type']}
+
+    def _completar_huecos(self, request, guardada):
+        html = guardada['html']
+        if HUECO_CSRF in html:
+            html = html.replace(HUECO_CSRF, get_token(request))
+        if HUECO_MENSAJES in html:
+            mensajes = list(get_messages(request))
+            html = html.replace(HUECO_MENSAJES, render_to_string(
+                'sistema_inmobiliaria/_mensajes.html', {'messages': mensajes}
+            ) if mensajes else '')
+        response = HttpResponse(html, content_type=guardada['content_type'])
+        response['X-Cache-Pagina'] = 'HIT'
+        return response
+
+
+class ContadorVistasMiddleware:
+    """
+    Suma una visita a las páginas marcadas con @contar_vistas que responden
+    200 o 304. Va antes que PaginaCompletaCacheMiddleware para contar
+    también las páginas servidas desde la caché. Las visitas se acumulan en
+    memoria (ver contador_vistas.py).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self._contar(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self._contar(request, response)
+        return response
+
+    def process_view(self, request, vista, args, kwargs):
+        contar = getattr(vista, 'contar_vistas', None)
+        if contar is not None and request.method == 'GET':
+            modelo, campo, parametro = contar
+            request._vista_contada = (modelo, campo, kwargs[parametro])
+        return None
+
+    def _contar(self, request, response):
+        contada = getattr(request, '_vista_contada', None)
+        if contada is not None and response.status_code in (200, 304):
+            registrar_vista(*contada)
+
+
+class EstaticosMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware que también acepta una cadena async. Los archivos
+    estáticos se siguen sirviendo igual; el resto pasa de largo sin
+    convertir la cadena en sincrónica.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.3 on 2026-10-19 05:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistema_inmobiliaria', '0028_vendedor_foto'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='consulta',
+            name='propiedad',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='Propiedad relacionada (si aplica)', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='consultas', to='sistema_inmobiliaria.propiedad'),
+        ),
+        migrations.AlterField(
+            model_name='solicitudvisita',
+            name='propiedad',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='solicitudes_visita', to='sistema_inmobiliaria.propiedad'),
+        ),
+    ]
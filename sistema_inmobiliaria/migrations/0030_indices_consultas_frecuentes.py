@@ -0,0 +1,30 @@
+# Generated by Django 4.1.3 on 2026-10-19 05:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistema_inmobiliaria', '0029_propiedad_fk_entre_bases'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='suscriptornewsletter',
+            name='token_confirmacion',
+            field=models.CharField(blank=True, db_index=True, help_text='Token para confirmar email', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(fields=['precio'], name='sistema_inm_precio_78c8c5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudvisita',
+            index=models.Index(fields=['estado', 'fecha_preferida'], name='sistema_inm_estado_061b82_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudvisita',
+            index=models.Index(fields=['propiedad', 'fecha_preferida'], name='sistema_inm_propied_f91d30_idx'),
+        ),
+    ]
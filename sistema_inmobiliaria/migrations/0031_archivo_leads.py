@@ -0,0 +1,90 @@
+# Generated by Django 4.1.3 on 2026-10-19 05:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistema_inmobiliaria', '0030_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultaArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consulta_id', models.BigIntegerField(help_text='ID original de la consulta', unique=True)),
+                ('nombre', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('telefono', models.CharField(blank=True, max_length=15)),
+                ('mensaje', models.TextField()),
+                ('origen', models.CharField(choices=[('propiedad', 'Consulta desde Propiedad'), ('general', 'Consulta General'), ('contacto', 'Página de Contacto'), ('home', 'Página Principal'), ('newsletter', 'Newsletter')], max_length=20)),
+                ('tipo', models.CharField(choices=[('compra', 'Interés en Compra'), ('venta', 'Interés en Venta'), ('alquiler', 'Interés en Alquiler'), ('informacion', 'Solicitud de Información'), ('general', 'Consulta General'), ('otro', 'Otro')], max_length=20)),
+                ('propiedad_id', models.BigIntegerField(blank=True, null=True)),
+                ('propiedad_titulo', models.CharField(blank=True, max_length=255)),
+                ('asunto', models.CharField(blank=True, max_length=200)),
+                ('presupuesto', models.CharField(blank=True, max_length=50)),
+                ('fecha_consulta', models.DateTimeField()),
+                ('respondida', models.BooleanField(default=True)),
+                ('respuesta', models.TextField(blank=True)),
+                ('fecha_respuesta', models.DateTimeField(blank=True, null=True)),
+                ('prioridad', models.CharField(max_length=10)),
+                ('notas_internas', models.TextField(blank=True)),
+                ('fecha_archivado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Consulta Archivada',
+                'verbose_name_plural': 'Consultas Archivadas',
+                'ordering': ['-fecha_consulta'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SolicitudVisitaArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('solicitud_id', models.BigIntegerField(help_text='ID original de la solicitud', unique=True)),
+                ('propiedad_id', models.BigIntegerField(blank=True, null=True)),
+                ('propiedad_titulo', models.CharField(blank=True, max_length=255)),
+                ('nombre', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('telefono', models.CharField(max_length=15)),
+                ('fecha_preferida', models.DateField()),
+                ('hora_preferida', models.TimeField()),
+                ('mensaje', models.TextField(blank=True)),
+                ('fecha_solicitud', models.DateTimeField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('confirmada', 'Confirmada'), ('rechazada', 'Rechazada'), ('completada', 'Completada')], max_length=20)),
+                ('respuesta_agente', models.TextField(blank=True)),
+                ('fecha_archivado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Solicitud de Visita Archivada',
+                'verbose_name_plural': 'Solicitudes de Visita Archivadas',
+                'ordering': ['-fecha_preferida'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='solicitudvisitaarchivada',
+            index=models.Index(fields=['email'], name='sistema_inm_email_ec4bfb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudvisitaarchivada',
+            index=models.Index(fields=['fecha_preferida'], name='sistema_inm_fecha_p_8213b1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudvisitaarchivada',
+            index=models.Index(fields=['fecha_archivado'], name='sistema_inm_fecha_a_3d3c1b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultaarchivada',
+            index=models.Index(fields=['email'], name='sistema_inm_email_5c1481_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultaarchivada',
+            index=models.Index(fields=['fecha_consulta'], name='sistema_inm_fecha_c_12b523_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultaarchivada',
+            index=models.Index(fields=['fecha_archivado'], name='sistema_inm_fecha_a_b402b3_idx'),
+        ),
+    ]
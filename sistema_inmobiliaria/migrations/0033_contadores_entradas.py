@@ -0,0 +1,61 @@
+# Generated by Django 4.1.3 on 2026-10-19 05:41
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def calcular_contadores(apps, schema_editor):
+    Entrada = apps.get_model('sistema_inmobiliaria', 'Entrada')
+    ContadorEntradas = apps.get_model('sistema_inmobiliaria', 'ContadorEntradas')
+    alias = schema_editor.connection.alias
+    filas = (
+        Entrada.objects.using(alias).filter(estado='publicado')
+        .annotate(dia=TruncDate('fecha_publicacion', tzinfo=timezone.get_current_timezone()))
+        .values('categoria_id', 'dia', 'destacado')
+        .annotate(cantidad=Count('id'))
+        .order_by()
+    )
+    ContadorEntradas.objects.using(alias).bulk_create([
+        ContadorEntradas(
+            categoria_id=fila['categoria_id'] or 0,
+            dia=fila['dia'],
+            destacado=fila['destacado'],
+            cantidad=fila['cantidad'],
+        )
+        for fila in filas
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistema_inmobiliaria', '0032_fechas_actualizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorEntradas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('categoria_id', models.IntegerField(default=0)),
+                ('dia', models.DateField()),
+                ('destacado', models.BooleanField(default=False)),
+                ('cantidad', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador de entradas',
+                'verbose_name_plural': 'Contadores de entradas',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='contadorentradas',
+            index=models.Index(fields=['dia'], name='sistema_inm_dia_ecf8c7_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='contadorentradas',
+            unique_together={('categoria_id', 'dia', 'destacado')},
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop, hints={'model_name': 'contadorentradas'}),
+    ]
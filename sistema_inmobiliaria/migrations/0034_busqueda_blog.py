@@ -0,0 +1,58 @@
+import html
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.html import strip_tags
+
+import sistema_inmobiliaria.models
+
+
+def texto_plano(contenido):
+    return ' '.join(html.unescape(strip_tags(contenido or '')).split())
+
+
+def indexar_entradas(apps, schema_editor):
+    Entrada = apps.get_model('sistema_inmobiliaria', 'Entrada')
+    filas = [
+        (entrada.pk, entrada.titulo, texto_plano(entrada.resumen), texto_plano(entrada.contenido), entrada.autor)
+        for entrada in Entrada.objects.using(schema_editor.connection.alias).iterator()
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO blog_busqueda (rowid, titulo, resumen, contenido, autor) VALUES (%s, %s, %s, %s, %s)',
+            filas,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistema_inmobiliaria', '0033_contadores_entradas'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE VIRTUAL TABLE blog_busqueda USING fts5("
+            "titulo, resumen, contenido, autor, tokenize='unicode61 remove_diacritics 2')",
+            'DROP TABLE blog_busqueda',
+            hints={'model_name': 'entradabusqueda'},
+        ),
+        migrations.CreateModel(
+            name='EntradaBusqueda',
+            fields=[
+                ('entrada', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='busqueda', serialize=False, to='sistema_inmobiliaria.entrada')),
+                ('documento', sistema_inmobiliaria.models.DocumentoBusquedaField(db_column='blog_busqueda')),
+                ('titulo', models.TextField()),
+                ('resumen', models.TextField()),
+                ('contenido', models.TextField()),
+                ('autor', models.TextField()),
+            ],
+            options={
+                'db_table': 'blog_busqueda',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(
+            indexar_entradas, migrations.RunPython.noop, hints={'model_name': 'entradabusqueda'}
+        ),
+    ]
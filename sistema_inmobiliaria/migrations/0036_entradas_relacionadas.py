@@ -0,0 +1,29 @@
+# Generated by Django 4.1.3 on 2026-10-19 06:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistema_inmobiliaria', '0035_contenido_renderizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntradaRelacionada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posicion', models.PositiveSmallIntegerField()),
+                ('similitud', models.FloatField()),
+                ('entrada', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relaciones', to='sistema_inmobiliaria.entrada')),
+                ('relacionada', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relacionada_en', to='sistema_inmobiliaria.entrada')),
+            ],
+            options={
+                'verbose_name': 'Entrada relacionada',
+                'verbose_name_plural': 'Entradas relacionadas',
+                'unique_together': {('entrada', 'posicion')},
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.1.3 on 2026-10-19 06:31
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def recalcular_contadores(apps, alias):
+    Entrada = apps.get_model('sistema_inmobiliaria', 'Entrada')
+    ContadorEntradas = apps.get_model('sistema_inmobiliaria', 'ContadorEntradas')
+    filas = (
+        Entrada.objects.using(alias).filter(estado='publicado')
+        .annotate(dia=TruncDate('fecha_publicacion', tzinfo=timezone.get_current_timezone()))
+        .values('categoria_id', 'dia', 'destacado')
+        .annotate(cantidad=Count('id'))
+        .order_by()
+    )
+    ContadorEntradas.objects.using(alias).all().delete()
+    ContadorEntradas.objects.using(alias).bulk_create([
+        ContadorEntradas(
+            categoria_id=fila['categoria_id'] or 0,
+            dia=fila['dia'],
+            destacado=fila['destacado'],
+            cantidad=fila['cantidad'],
+        )
+        for fila in filas
+    ])
+
+
+def programar_futuras(apps, schema_editor):
+    # Las publicadas con fecha futura pasan a programadas y dejan de contar
+    Entrada = apps.get_model('sistema_inmobiliaria', 'Entrada')
+    alias = schema_editor.connection.alias
+    Entrada.objects.using(alias).filter(estado='publicado', fecha_publicacion__gt=timezone.now()).update(estado='programado')
+    recalcular_contadores(apps, alias)
+
+
+def publicar_programadas(apps, schema_editor):
+    Entrada = apps.get_model('sistema_inmobiliaria', 'Entrada')
+    alias = schema_editor.connection.alias
+    Entrada.objects.using(alias).filter(estado='programado').update(estado='publicado')
+    recalcular_contadores(apps, alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistema_inmobiliaria', '0036_entradas_relacionadas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='entrada',
+            name='estado',
+            field=models.CharField(choices=[('borrador', 'Borrador'), ('programado', 'Programado'), ('publicado', 'Publicado'), ('archivado', 'Archivado')], default='borrador', max_length=20),
+        ),
+        migrations.RunPython(programar_futuras, publicar_programadas, hints={'model_name': 'entrada'}),
+    ]
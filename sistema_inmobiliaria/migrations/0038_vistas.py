@@ -0,0 +1,31 @@
+# Generated by Django 4.1.3 on 2026-10-19 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistema_inmobiliaria', '0037_entradas_programadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entrada',
+            name='vistas',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Lecturas, volcadas en lotes (ver contador_vistas.py)'),
+        ),
+        migrations.AddField(
+            model_name='propiedad',
+            name='vistas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='entrada',
+            index=models.Index(fields=['estado', 'vistas'], name='sistema_inm_estado_916235_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(fields=['vistas'], name='sistema_inm_vistas_0f32dd_idx'),
+        ),
+    ]
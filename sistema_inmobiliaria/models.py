@@ -1,16 +1,11 @@
 from django.db import models
 import re
-from datetime import date, time, datetime
-import datetime
-import io
-from django.conf import settings
-from django.core.mail import EmailMessage
-from django.template.loader import get_template
+from datetime import date
 from django.utils import timezone
-
-from reportlab.pdfgen import canvas
 from django.utils.text import slugify
 
+from .tracking import FieldTrackerMixin
+
 
 class Vendedor(models.Model):
 
@@ -19,6 +14,7 @@ class Vendedor(models.Model):
     telefono = models.CharField(max_length=10, null=False, blank=False)
     email = models.EmailField(max_length=255, blank=True, default="")
     foto = models.ImageField(upload_to='vendedores/', blank=True, null=True, help_text="Foto del vendedor")
+    actualizado = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.nombre} {self.apellido}"
@@ -49,7 +45,10 @@ class Propiedad(models.Model):
     bano = models.IntegerField()
     estacionamiento = models.IntegerField()
     creado = models.DateField(default=date.today)
+    actualizado = models.DateTimeField(auto_now=True)
     vendedor_id = models.ForeignKey(Vendedor, on_delete=models.SET_NULL, null=True)
+    # Visitas al detalle, volcadas en lotes (ver contador_vistas.py)
+    vistas = models.PositiveIntegerField(default=0, editable=False)
 
     # Validación
     def validar(self):
@@ -83,6 +82,10 @@ class Propiedad(models.Model):
 
     class Meta:
         verbose_name_plural = "propiedades"
+        indexes = [
+            models.Index(fields=['precio']),
+            models.Index(fields=['vistas']),
+        ]
 
 
 
@@ -115,12 +118,21 @@ class Categoria(models.Model):
         super().save(*args, **kwargs)
 
 
-class Entrada(models.Model):
+class Entrada(FieldTrackerMixin, models.Model):
     """
     Modelo para las entradas del blog
     """
+    # Campos que definen en qué contador está la entrada (ver ContadorEntradas),
+    # el cuerpo, que se procesa solo cuando cambia, y el texto de las
+    # relacionadas (ver relacionadas.py)
+    tracked_fields = ('estado', 'categoria_id', 'fecha_publicacion', 'destacado', 'contenido', 'titulo', 'resumen')
+    
+    # Columnas pesadas que los listados no usan
+    CAMPOS_CUERPO = ('contenido', 'contenido_html', 'texto_plano')
+    
     ESTADO_CHOICES = [
         ('borrador', 'Borrador'),
+        ('programado', 'Programado'),
         ('publicado', 'Publicado'),
         ('archivado', 'Archivado'),
     ]
@@ -130,6 +142,11 @@ class Entrada(models.Model):
     contenido = models.TextField(help_text="Contenido completo del artículo (HTML permitido)")
     resumen = models.TextField(max_length=300, blank=True, help_text="Resumen corto para mostrar en listados")
     
+    # Derivados de contenido, calculados al guardar (ver contenido.py)
+    contenido_html = models.TextField(blank=True, editable=False)
+    texto_plano = models.TextField(blank=True, editable=False)
+    palabras = models.PositiveIntegerField(default=0, editable=False)
+    
     # Metadatos
     autor = models.CharField(max_length=100, default="Admin")
     categoria = models.ForeignKey(Categoria, on_delete=models.SET_NULL, null=True, blank=True)
@@ -145,8 +162,9 @@ class Entrada(models.Model):
     
     # Configuración
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='borrador')
-    tiempo_lectura = models.PositiveIntegerField(default=5, help_text="Tiempo estimado de lectura en minutos")
+    tiempo_lectura = models.PositiveIntegerField(default=5, help_text="Tiempo estimado de lectura en minutos (se calcula al guardar)")
     destacado = models.BooleanField(default=False, help_text="Marcar como artículo destacado")
+    vistas = models.PositiveIntegerField(default=0, editable=False, help_text="Lecturas, volcadas en lotes (ver contador_vistas.py)")
     
     # SEO
     meta_descripcion = models.CharField(max_length=160, blank=True, help_text="Descripción para motores de búsqueda")
@@ -160,6 +178,7 @@ class Entrada(models.Model):
             models.Index(fields=['estado', 'fecha_publicacion']),
             models.Index(fields=['categoria', 'estado']),
             models.Index(fields=['destacado', 'estado']),
+            models.Index(fields=['estado', 'vistas']),
         ]
     
     def __str__(self):
@@ -170,11 +189,21 @@ class Entrada(models.Model):
         if not self.slug:
             self.slug = slugify(self.titulo)
             
+        # Publicar con fecha futura la deja programada; al llegar la fecha la
+        # publica blog.publicar_programadas
+        if self.estado in ('programado', 'publicado'):
+            self.estado = 'programado' if self.fecha_publicacion > timezone.now() else 'publicado'
+            
+        # Procesar el cuerpo una sola vez, al guardarlo (ver contenido.py)
+        update_fields = kwargs.get('update_fields')
+        if self.has_changed('contenido') and (update_fields is None or 'contenido' in update_fields):
+            self.renderizar_contenido()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'contenido_html', 'texto_plano', 'palabras', 'tiempo_lectura'}
+            
         # Generar resumen automáticamente si no existe
-        if not self.resumen and self.contenido:
-            # Remover tags HTML básicos y truncar
-            import re
-            texto_limpio = re.sub(r'<[^>]+>', '', self.contenido)
+        if not self.resumen and self.texto_plano:
+            texto_limpio = ' '.join(self.texto_plano.split())
             self.resumen = texto_limpio[:297] + '...' if len(texto_limpio) > 300 else texto_limpio
             
         # Generar meta_descripcion si no existe
@@ -187,6 +216,18 @@ class Entrada(models.Model):
             
         super().save(*args, **kwargs)
     
+    def renderizar_contenido(self):
+        """
+        Calcula contenido_html, texto_plano, palabras y tiempo_lectura a
+        partir de contenido
+        """
+        from .contenido import renderizar
+        renderizado = renderizar(self.contenido)
+        self.contenido_html = renderizado.html
+        self.texto_plano = renderizado.texto
+        self.palabras = renderizado.palabras
+        self.tiempo_lectura = renderizado.tiempo_lectura
+    
     def get_absolute_url(self):
         """
         Retorna la URL absoluta de la entrada
@@ -215,7 +256,7 @@ class Entrada(models.Model):
         """
         Manager personalizado para obtener solo entradas publicadas
         """
-        return cls.objects.filter(estado='publicado', fecha_publicacion__lte=timezone.now())
+        return cls.objects.filter(estado='publicado')
     
     @classmethod
     def destacadas(cls):
@@ -225,10 +266,94 @@ class Entrada(models.Model):
         return cls.publicadas().filter(destacado=True)
 
 
-class Consulta(models.Model):
+class ContadorEntradas(models.Model):
+    """
+    Cantidad de entradas publicadas por categoría, día de publicación y
+    destacado. Lo mantienen los signals de Entrada (ver blog.py) y permite
+    paginar el blog sin COUNT(*) sobre las entradas.
+    """
+    # 0 = entradas sin categoría (NULL rompería el unique en SQLite)
+    categoria_id = models.IntegerField(default=0)
+    dia = models.DateField()
+    destacado = models.BooleanField(default=False)
+    cantidad = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = "Contador de entradas"
+        verbose_name_plural = "Contadores de entradas"
+        unique_together = [('categoria_id', 'dia', 'destacado')]
+        indexes = [
+            models.Index(fields=['dia']),
+        ]
+    
+    def __str__(self):
+        return f"{self.categoria_id}/{self.dia}/{self.destacado}: {self.cantidad}"
+
+
+class EntradaRelacionada(models.Model):
+    """
+    Entradas más parecidas por contenido (similitud coseno de TF-IDF),
+    precalculadas por el comando calcular_relacionadas y al guardar cada
+    entrada (ver relacionadas.py)
+    """
+    entrada = models.ForeignKey(Entrada, on_delete=models.CASCADE, related_name='relaciones')
+    relacionada = models.ForeignKey(Entrada, on_delete=models.CASCADE, related_name='relacionada_en')
+    posicion = models.PositiveSmallIntegerField()
+    similitud = models.FloatField()
+    
+    class Meta:
+        verbose_name = "Entrada relacionada"
+        verbose_name_plural = "Entradas relacionadas"
+        # También es el índice de la consulta del detalle
+        unique_together = [('entrada', 'posicion')]
+    
+    def __str__(self):
+        return f"{self.entrada_id} -> {self.relacionada_id} ({self.similitud:.2f})"
+
+
+class DocumentoBusquedaField(models.TextField):
+    """
+    Columna oculta de una tabla FTS5 que lleva el nombre de la tabla: a la
+    izquierda de MATCH busca en todas las columnas del índice
+    """
+
+
+@DocumentoBusquedaField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class EntradaBusqueda(models.Model):
+    """
+    Índice de texto completo (tabla virtual FTS5 ``blog_busqueda``) con el
+    texto sin HTML de cada Entrada. El rowid es el id de la entrada; lo
+    mantienen los signals de Entrada (ver busqueda.py).
+    """
+    entrada = models.OneToOneField(
+        Entrada, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING, related_name='busqueda'
+    )
+    documento = DocumentoBusquedaField(db_column='blog_busqueda')
+    titulo = models.TextField()
+    resumen = models.TextField()
+    contenido = models.TextField()
+    autor = models.TextField()
+
+    class Meta:
+        managed = False
+        db_table = 'blog_busqueda'
+
+
+class Consulta(FieldTrackerMixin, models.Model):
     """
     Modelo unificado para todas las consultas del sitio web
     """
+    tracked_fields = ('respondida', 'respuesta', 'propiedad_id')
+
     ORIGEN_CHOICES = [
         ('propiedad', 'Consulta desde Propiedad'),
         ('general', 'Consulta General'),
@@ -257,7 +382,10 @@ class Consulta(models.Model):
     tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, default='general', help_text="Tipo de consulta")
     
     # Campos opcionales según el contexto
-    propiedad = models.ForeignKey(Propiedad, on_delete=models.CASCADE, null=True, blank=True, 
+    # Consulta vive en la base 'leads' y Propiedad en 'default' (ver routers.py):
+    # sin constraint en la BD; el borrado en cascada lo hace signals.py
+    propiedad = models.ForeignKey(Propiedad, on_delete=models.DO_NOTHING, db_constraint=False,
+                                null=True, blank=True,
                                 related_name='consultas', help_text="Propiedad relacionada (si aplica)")
     asunto = models.CharField(max_length=200, blank=True, help_text="Asunto específico")
     presupuesto = models.CharField(max_length=50, blank=True, help_text="Presupuesto estimado")
@@ -299,8 +427,44 @@ class Consulta(models.Model):
             self.prioridad = 'alta'
         elif self.tipo == 'alquiler':
             self.prioridad = 'media'
-        
+
+        # Derivar el estado de respuesta antes de la única escritura
+        campos_respuesta = self._preparar_respuesta()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'respuesta' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | campos_respuesta
+
         super().save(*args, **kwargs)
+
+    def _preparar_respuesta(self):
+        """
+        Marca la consulta como respondida y fija la fecha de respuesta cuando
+        se carga o modifica la respuesta. Devuelve los campos tocados.
+        """
+        respuesta = (self.respuesta or '').strip()
+        if not respuesta:
+            return set()
+
+        campos = set()
+        if respuesta != (self.previous('respuesta') or '').strip() and not self.respondida:
+            self.respondida = True
+            campos.add('respondida')
+        if self.respondida and not self.fecha_respuesta:
+            self.fecha_respuesta = timezone.now()
+            campos.add('fecha_respuesta')
+        return campos
+
+    def debe_notificar_respuesta(self):
+        """
+        Indica si el último cambio amerita avisar al cliente: se respondió por
+        primera vez o se modificó una respuesta ya enviada.
+        """
+        respuesta = (self.respuesta or '').strip()
+        if not self.respondida or not respuesta:
+            return False
+        if not self.previous('respondida'):
+            return True
+        return respuesta != (self.previous('respuesta') or '').strip()
     
     @property
     def es_sobre_propiedad(self):
@@ -314,10 +478,12 @@ class Consulta(models.Model):
         return timezone.now() - self.fecha_consulta
 
 
-class SolicitudVisita(models.Model):
+class SolicitudVisita(FieldTrackerMixin, models.Model):
     """
     Modelo para solicitudes de visita a propiedades
     """
+    tracked_fields = ('estado', 'propiedad_id')
+
     ESTADO_CHOICES = [
         ('pendiente', 'Pendiente'),
         ('confirmada', 'Confirmada'),
@@ -325,7 +491,9 @@ class SolicitudVisita(models.Model):
         ('completada', 'Completada'),
     ]
     
-    propiedad = models.ForeignKey(Propiedad, on_delete=models.CASCADE, related_name='solicitudes_visita')
+    # Ver Consulta.propiedad: FK entre bases, cascada manejada en signals.py
+    propiedad = models.ForeignKey(Propiedad, on_delete=models.DO_NOTHING, db_constraint=False,
+                                  related_name='solicitudes_visita')
     nombre = models.CharField(max_length=100, help_text="Nombre del interesado")
     email = models.EmailField(help_text="Email de contacto")
     telefono = models.CharField(max_length=15, help_text="Teléfono de contacto")
@@ -340,6 +508,10 @@ class SolicitudVisita(models.Model):
         verbose_name = "Solicitud de Visita"
         verbose_name_plural = "Solicitudes de Visita"
         ordering = ['-fecha_solicitud']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_preferida']),
+            models.Index(fields=['propiedad', 'fecha_preferida']),
+        ]
     
     def __str__(self):
         return f"Visita {self.nombre} - {self.propiedad.titulo} ({self.get_estado_display()})"
@@ -357,7 +529,7 @@ class SuscriptorNewsletter(models.Model):
     fecha_suscripcion = models.DateTimeField(auto_now_add=True)
     activo = models.BooleanField(default=True, help_text="Suscripción activa")
     confirmado = models.BooleanField(default=False, help_text="Email confirmado")
-    token_confirmacion = models.CharField(max_length=100, blank=True, help_text="Token para confirmar email")
+    token_confirmacion = models.CharField(max_length=100, blank=True, db_index=True, help_text="Token para confirmar email")
     
     class Meta:
         verbose_name = "Suscriptor Newsletter"
@@ -366,3 +538,73 @@ class SuscriptorNewsletter(models.Model):
     
     def __str__(self):
         return f"{self.email} ({'Activo' if self.activo else 'Inactivo'})"
+
+
+class ConsultaArchivada(models.Model):
+    """
+    Copia fría de consultas respondidas antiguas (ver comando archivar_leads).
+    No tiene FK a Propiedad: guarda el id y el título al momento de archivar.
+    """
+    consulta_id = models.BigIntegerField(unique=True, help_text="ID original de la consulta")
+    nombre = models.CharField(max_length=100)
+    email = models.EmailField()
+    telefono = models.CharField(max_length=15, blank=True)
+    mensaje = models.TextField()
+    origen = models.CharField(max_length=20, choices=Consulta.ORIGEN_CHOICES)
+    tipo = models.CharField(max_length=20, choices=Consulta.TIPO_CHOICES)
+    propiedad_id = models.BigIntegerField(null=True, blank=True)
+    propiedad_titulo = models.CharField(max_length=255, blank=True)
+    asunto = models.CharField(max_length=200, blank=True)
+    presupuesto = models.CharField(max_length=50, blank=True)
+    fecha_consulta = models.DateTimeField()
+    respondida = models.BooleanField(default=True)
+    respuesta = models.TextField(blank=True)
+    fecha_respuesta = models.DateTimeField(null=True, blank=True)
+    prioridad = models.CharField(max_length=10)
+    notas_internas = models.TextField(blank=True)
+    fecha_archivado = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Consulta Archivada"
+        verbose_name_plural = "Consultas Archivadas"
+        ordering = ['-fecha_consulta']
+        indexes = [
+            models.Index(fields=['email']),
+            models.Index(fields=['fecha_consulta']),
+            models.Index(fields=['fecha_archivado']),
+        ]
+    
+    def __str__(self):
+        return f"Consulta archivada de {self.nombre} ({self.fecha_consulta:%d/%m/%Y})"
+
+
+class SolicitudVisitaArchivada(models.Model):
+    """
+    Copia fría de visitas completadas o rechazadas antiguas
+    """
+    solicitud_id = models.BigIntegerField(unique=True, help_text="ID original de la solicitud")
+    propiedad_id = models.BigIntegerField(null=True, blank=True)
+    propiedad_titulo = models.CharField(max_length=255, blank=True)
+    nombre = models.CharField(max_length=100)
+    email = models.EmailField()
+    telefono = models.CharField(max_length=15)
+    fecha_preferida = models.DateField()
+    hora_preferida = models.TimeField()
+    mensaje = models.TextField(blank=True)
+    fecha_solicitud = models.DateTimeField()
+    estado = models.CharField(max_length=20, choices=SolicitudVisita.ESTADO_CHOICES)
+    respuesta_agente = models.TextField(blank=True)
+    fecha_archivado = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Solicitud de Visita Archivada"
+        verbose_name_plural = "Solicitudes de Visita Archivadas"
+        ordering = ['-fecha_preferida']
+        indexes = [
+            models.Index(fields=['email']),
+            models.Index(fields=['fecha_preferida']),
+            models.Index(fields=['fecha_archivado']),
+        ]
+    
+    def __str__(self):
+        return f"Visita archivada {self.nombre} - {self.propiedad_titulo} ({self.get_estado_display()})"
@@ -0,0 +1,257 @@
+"""
+Entradas relacionadas por contenido.
+
+Cada entrada publicada se representa con un vector TF-IDF de su título,
+resumen y texto plano; las relacionadas son sus vecinas más cercanas por
+similitud coseno. El cálculo se hace fuera del request y se guarda en
+EntradaRelacionada: el detalle de una entrada las lee con una consulta por
+índice.
+
+- ``python manage.py calcular_relacionadas`` recalcula todo, con la matriz
+  densa en lotes de filas. Necesita NumPy (dependencia opcional).
+- Al crear, editar o despublicar una entrada (signals.py) se recalcula en
+  segundo plano. Se leen todas las publicadas (el IDF depende de todas),
+  pero sin matriz densa: con los vectores dispersos y un índice invertido
+  se calculan solo las similitudes de las filas afectadas (la entrada y las
+  entradas a las que entra o de las que sale como vecina) y solo esas se
+  reescriben.
+
+Después de reescribir se invalidan las páginas cacheadas del blog, que
+muestran las relacionadas.
+
+Sin NumPy no hay recálculo completo, pero las ediciones igual completan la
+tabla; el detalle de una entrada sin filas usa las entradas de la misma
+categoría, como antes.
+"""
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from .middleware import invalidar_paginas
+from .models import Entrada, EntradaRelacionada
+
+
+# Vecinas guardadas por entrada (el detalle muestra 3; sobran por si alguna
+# se despublica antes del próximo cálculo)
+K_RELACIONADAS = 6
+
+# Filas de la matriz de similitud que se calculan por vez
+TAMANO_LOTE = 256
+
+# El título cuenta como si apareciera varias veces en el texto
+PESO_TITULO = 3
+
+# Términos presentes en más de esta fracción de las entradas no distinguen nada
+MAXIMA_FRECUENCIA_DOCUMENTOS = 0.8
+
+PALABRAS_VACIAS = {
+    'algo', 'ante', 'antes', 'aqui', 'asi', 'aun', 'bien', 'cada', 'como', 'con',
+    'contra', 'cual', 'cuando', 'del', 'desde', 'donde', 'durante', 'ella', 'ellas',
+    'ellos', 'entre', 'era', 'eres', 'esa', 'esas', 'ese', 'eso', 'esos', 'esta',
+    'estan', 'estar', 'estas', 'este', 'esto', 'estos', 'fue', 'han', 'hasta', 'hay',
+    'las', 'les', 'los', 'mas', 'mis', 'mucho', 'muy', 'nada', 'nos', 'nosotros',
+    'otra', 'otras', 'otro', 'otros', 'para', 'pero', 'poco', 'por', 'porque',
+    'puede', 'pueden', 'que', 'quien', 'sea', 'ser', 'sin', 'sobre', 'son', 'sus',
+    'tambien', 'tan', 'tanto', 'tener', 'tiene', 'tienen', 'todo', 'todos', 'tus',
+    'una', 'uno', 'unos', 'unas', 'usted', 'vez', 'ya',
+}
+
+_RE_PALABRA = re.compile(r'[a-z0-9]{3,}')
+
+
+def _terminos(texto):
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+    return [termino for termino in _RE_PALABRA.findall(texto) if termino not in PALABRAS_VACIAS]
+
+
+def _documento(entrada):
+    return Counter(
+        _terminos(entrada.titulo) * PESO_TITULO
+        + _terminos(entrada.resumen)
+        + _terminos(entrada.texto_plano)
+    )
+
+
+def vectores_tfidf(documentos):
+    """
+    Vector TF-IDF disperso ({término: peso}) de cada documento, normalizado.
+    TF sublineal (1 + log tf) e IDF suavizado. Solo se conservan los términos
+    de al menos dos documentos (los demás no suman a ninguna similitud), pero
+    cuentan para la norma
+    """
+    total = len(documentos)
+    frecuencia = Counter(termino for documento in documentos for termino in documento)
+    maximo = MAXIMA_FRECUENCIA_DOCUMENTOS * total if total > 4 else total
+    vectores = []
+    for documento in documentos:
+        pesos = {
+            termino: (1 + math.log(tf)) * (math.log((1 + total) / (1 + frecuencia[termino])) + 1)
+            for termino, tf in documento.items()
+        }
+        norma = math.sqrt(sum(peso * peso for peso in pesos.values())) or 1.0
+        vectores.append({
+            termino: peso / norma
+            for termino, peso in pesos.items() if 2 <= frecuencia[termino] <= maximo
+        })
+    return vectores
+
+
+def matriz_tfidf(documentos):
+    """
+    Matriz densa (documentos x términos) con los vectores de vectores_tfidf()
+    """
+    import numpy as np
+
+    vectores = vectores_tfidf(documentos)
+    columnas = {
+        termino: indice
+        for indice, termino in enumerate(sorted({termino for vector in vectores for termino in vector}))
+    }
+    matriz = np.zeros((len(vectores), len(columnas)), dtype=np.float32)
+    for fila, vector in enumerate(vectores):
+        for termino, peso in vector.items():
+            matriz[fila, columnas[termino]] = peso
+    return matriz
+
+
+def vecinos(matriz, k=K_RELACIONADAS, filas=None):
+    """
+    Para cada fila (todas, o las de ``filas``) las k filas más parecidas con
+    similitud positiva: {fila: [(otra fila, similitud), ...]} ordenadas de
+    mayor a menor
+    """
+    import numpy as np
+
+    filas = np.arange(matriz.shape[0]) if filas is None else np.asarray(filas, dtype=int)
+    k = min(k, matriz.shape[0] - 1)
+    resultado = {}
+    if k <= 0:
+        return {int(fila): [] for fila in filas}
+    for inicio in range(0, len(filas), TAMANO_LOTE):
+        lote = filas[inicio:inicio + TAMANO_LOTE]
+        similitudes = matriz[lote] @ matriz.T
+        similitudes[np.arange(len(lote)), lote] = -1  # la propia entrada
+        mejores = np.argpartition(-similitudes, k - 1, axis=1)[:, :k]
+        for posicion, fila in enumerate(lote):
+            candidatas = sorted(mejores[posicion], key=lambda otra: (-similitudes[posicion, otra], otra))
+            resultado[int(fila)] = [
+                (int(otra), float(similitudes[posicion, otra]))
+                for otra in candidatas if similitudes[posicion, otra] > 0
+            ]
+    return resultado
+
+
+def _indice_invertido(vectores):
+    indice = defaultdict(list)  # término -> [(fila, peso), ...]
+    for fila, vector in enumerate(vectores):
+        for termino, peso in vector.items():
+            indice[termino].append((fila, peso))
+    return indice
+
+
+def _similitudes(vectores, indice, fila):
+    # Similitud coseno de la fila con las que comparten algún término
+    similitudes = defaultdict(float)
+    for termino, peso in vectores[fila].items():
+        for otra, peso_otra in indice[termino]:
+            similitudes[otra] += peso * peso_otra
+    similitudes.pop(fila, None)
+    return similitudes
+
+
+def _vecinos_dispersos(vectores, indice, fila, k):
+    return [
+        (otra, similitud)
+        for otra, similitud in heapq.nsmallest(
+            k, _similitudes(vectores, indice, fila).items(), key=lambda par: (-par[1], par[0])
+        )
+        if similitud > 0
+    ]
+
+
+def _publicadas():
+    return (
+        Entrada.publicadas()
+        .only('titulo', 'resumen', 'texto_plano')
+        .order_by('pk')
+    )
+
+
+def recalcular_relacionadas(entrada_ids=None, k=K_RELACIONADAS):
+    """
+    Recalcula las relacionadas de todas las entradas publicadas, o solo las
+    afectadas por cambios en ``entrada_ids`` (ver el docstring del módulo).
+    Devuelve cuántas entradas se reescribieron
+    """
+    if entrada_ids is None:
+        # Solo la matriz densa del recálculo completo usa NumPy
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            print("Error calculando entradas relacionadas: falta instalar numpy")
+            return 0
+
+    entradas = list(_publicadas())
+    ids = [entrada.pk for entrada in entradas]
+    fila_de = {pk: fila for fila, pk in enumerate(ids)}
+    documentos = [_documento(entrada) for entrada in entradas]
+
+    if entrada_ids is None:
+        calculadas = vecinos(matriz_tfidf(documentos), k)
+        reescribir = set(ids)
+    else:
+        vectores = vectores_tfidf(documentos)
+        indice = _indice_invertido(vectores)
+        cambiadas = set(entrada_ids)
+        reescribir = cambiadas.copy()
+        # Entradas que hoy listan a alguna de las cambiadas (puede haber salido)
+        reescribir |= set(
+            EntradaRelacionada.objects.filter(relacionada_id__in=cambiadas)
+            .values_list('entrada_id', flat=True)
+        )
+        # Entradas a las que alguna de las cambiadas entra como vecina
+        filas_cambiadas = [fila_de[pk] for pk in cambiadas if pk in fila_de]
+        if filas_cambiadas:
+            umbral = dict(
+                EntradaRelacionada.objects.filter(posicion=k - 1).values_list('entrada_id', 'similitud')
+            )
+            for fila_cambiada in filas_cambiadas:
+                for fila, similitud in _similitudes(vectores, indice, fila_cambiada).items():
+                    if similitud > umbral.get(ids[fila], 0):
+                        reescribir.add(ids[fila])
+        calculadas = {
+            fila_de[pk]: _vecinos_dispersos(vectores, indice, fila_de[pk], k)
+            for pk in reescribir if pk in fila_de
+        }
+
+    nuevas = [
+        EntradaRelacionada(entrada_id=ids[fila], relacionada_id=ids[otra], posicion=posicion, similitud=similitud)
+        for fila, lista in calculadas.items()
+        for posicion, (otra, similitud) in enumerate(lista)
+    ]
+    with transaction.atomic():
+        EntradaRelacionada.objects.filter(entrada_id__in=reescribir).delete()
+        if entrada_ids is None:
+            # Entradas que dejaron de estar publicadas
+            EntradaRelacionada.objects.exclude(entrada_id__in=ids).delete()
+        EntradaRelacionada.objects.bulk_create(nuevas, batch_size=500)
+        transaction.on_commit(lambda: invalidar_paginas('blog'))
+    return len(reescribir)
+
+
+def entradas_relacionadas(entrada, cantidad=3):
+    """
+    Relacionadas precalculadas que sigan publicadas, en una consulta por el
+    índice (entrada, posicion)
+    """
+    return list(
+        Entrada.publicadas()
+        .filter(relacionada_en__entrada=entrada)
+        .order_by('relacionada_en__posicion')
+        .defer(*Entrada.CAMPOS_CUERPO)[:cantidad]
+    )
@@ -0,0 +1,56 @@
+"""
+Router de bases de datos: separa la captación de leads del catálogo.
+
+Los formularios públicos (consultas, visitas, newsletter) y las sesiones
+escriben mucho y compiten por el lock de escritura de SQLite con el admin
+que edita propiedades y entradas. Al ponerlos en otro archivo ('leads')
+cada base tiene su propio lock.
+"""
+
+LEADS_DB = 'leads'
+
+# Modelos (app_label.model_name) que viven en la base de leads
+LEADS_MODELS = {
+    'sistema_inmobiliaria.consulta',
+    'sistema_inmobiliaria.solicitudvisita',
+    'sistema_inmobiliaria.suscriptornewsletter',
+    # Archivo frío de leads (comando archivar_leads), junto a las tablas
+    # calientes para mover cada lote en una sola transacción
+    'sistema_inmobiliaria.consultaarchivada',
+    'sistema_inmobiliaria.solicitudvisitaarchivada',
+    'sessions.session',
+}
+
+
+def es_modelo_leads(app_label, model_name):
+    return f"{app_label}.{model_name}" in LEADS_MODELS
+
+
+class LeadsRouter:
+    """
+    Envía los modelos de LEADS_MODELS a la base 'leads' y el resto a 'default'.
+
+    Se decide siempre por modelo (no por instancia), así la propiedad de una
+    consulta se lee del catálogo aunque la consulta venga de 'leads'.
+    """
+
+    def _db_para(self, model):
+        if es_modelo_leads(model._meta.app_label, model._meta.model_name):
+            return LEADS_DB
+        return 'default'
+
+    def db_for_read(self, model, **hints):
+        return self._db_para(model)
+
+    def db_for_write(self, model, **hints):
+        return self._db_para(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las FK de leads hacia Propiedad cruzan bases; la integridad se
+        # mantiene en la aplicación (ver signals.verificar_propiedad)
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if model_name is None:
+            return None
+        return (db == LEADS_DB) == es_modelo_leads(app_label, model_name)
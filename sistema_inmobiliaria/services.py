@@ -0,0 +1,199 @@
+"""
+Servicios de ingreso de consultas y de gestión de solicitudes de visita.
+
+Las vistas y el admin solo traducen request/response; aquí se hacen las
+escrituras dentro de una transacción y el envío de emails queda encolado
+para después del commit.
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import router, transaction
+
+from .email_utils import (
+    NOTIFICACIONES_VISITA,
+    enviar_email_contacto_general,
+    enviar_email_contacto_propiedad,
+    enviar_email_solicitud_visita,
+    enviar_notificaciones_visitas,
+)
+from .models import Consulta, Propiedad, SolicitudVisita
+from .tasks import encolar
+
+
+# Mapeo del campo "tipo" del formulario a Consulta.TIPO_CHOICES
+TIPO_MAPPING = {
+    'compra': 'compra',
+    'venta': 'venta',
+    'alquiler': 'alquiler',
+    'visita': 'informacion',  # Las visitas son solicitudes de información
+    'general': 'general',
+}
+
+EMAIL_FALLBACK = "alerepettosac@gmail.com"
+
+
+def obtener_propiedad(propiedad_id):
+    """
+    Busca la propiedad junto con su vendedor en una sola consulta
+    """
+    if not propiedad_id:
+        return None
+    try:
+        return Propiedad.objects.select_related('vendedor_id').get(id=int(propiedad_id))
+    except (ValueError, Propiedad.DoesNotExist):
+        return None
+
+
+def _parsear_visita(fecha_visita, hora_visita):
+    try:
+        return (
+            datetime.strptime(fecha_visita, '%Y-%m-%d').date(),
+            datetime.strptime(hora_visita, '%H:%M').time(),
+        )
+    except (TypeError, ValueError):
+        return None, None
+
+
+def registrar_contacto(datos, propiedad_url=None):
+    """
+    Registra una consulta del formulario de contacto (y la solicitud de visita
+    si corresponde) y encola los emails para después del commit.
+
+    ``datos`` es un dict con las claves del formulario (nombre, email,
+    mensaje, tipo, precio, telefono, propiedad_id, fecha_visita, hora_visita).
+    ``propiedad_url`` es una función que recibe el id y devuelve la URL
+    absoluta de la propiedad, usada en el email de respaldo.
+
+    Devuelve la tupla (consulta, solicitud_visita o None).
+    """
+    tipo = datos.get('tipo', '')
+    propiedad_id = datos.get('propiedad_id', '')
+    propiedad = obtener_propiedad(propiedad_id)
+    agente = propiedad.vendedor_id if propiedad else None
+
+    fecha_obj = hora_obj = None
+    if tipo == "Visita" and propiedad:
+        fecha_obj, hora_obj = _parsear_visita(datos.get('fecha_visita'), datos.get('hora_visita'))
+
+    # Consulta y SolicitudVisita comparten la base de leads (ver routers.py)
+    db = router.db_for_write(Consulta)
+    with transaction.atomic(using=db):
+        consulta = Consulta.objects.create(
+            nombre=datos.get('nombre', ''),
+            email=datos.get('email', ''),
+            telefono=datos.get('telefono', ''),
+            mensaje=datos.get('mensaje', ''),
+            origen='propiedad' if propiedad else 'general',
+            tipo=TIPO_MAPPING.get(tipo.lower() if tipo else 'general', 'general'),
+            propiedad=propiedad,
+            presupuesto=datos.get('precio') or '',
+            # Guardar información del agente si es una consulta de propiedad
+            notas_internas=f"Agente: {agente.nombre} ({agente.email})" if agente else '',
+        )
+
+        solicitud = None
+        if fecha_obj and hora_obj:
+            solicitud = SolicitudVisita.objects.create(
+                propiedad=propiedad,
+                nombre=consulta.nombre,
+                email=consulta.email,
+                telefono=consulta.telefono,
+                fecha_preferida=fecha_obj,
+                hora_preferida=hora_obj,
+                mensaje=consulta.mensaje,
+                estado='pendiente',
+            )
+
+        url = propiedad_url(propiedad.id) if propiedad and propiedad_url else ''
+        consulta_id = consulta.id
+        solicitud_id = solicitud.id if solicitud else None
+        transaction.on_commit(lambda: encolar(
+            notificar_contacto, consulta_id, solicitud_id, tipo, propiedad_id, url
+        ), using=db)
+
+    return consulta, solicitud
+
+
+def notificar_contacto(consulta_id, solicitud_id=None, tipo='', propiedad_id='', propiedad_url=''):
+    """
+    Tarea en segundo plano: envía el email específico según el tipo de
+    consulta y, si falla, el email genérico de respaldo.
+    """
+    # prefetch y no select_related: la propiedad está en otra base
+    consulta = Consulta.objects.prefetch_related('propiedad__vendedor_id').get(pk=consulta_id)
+
+    if solicitud_id:
+        solicitud = SolicitudVisita.objects.prefetch_related('propiedad__vendedor_id').get(pk=solicitud_id)
+        email_enviado = enviar_email_solicitud_visita(solicitud)
+    elif consulta.propiedad and tipo != "Visita":
+        email_enviado = enviar_email_contacto_propiedad(consulta)
+    elif not consulta.propiedad:
+        consulta.asunto = consulta.asunto or tipo or "Consulta general"
+        email_enviado = enviar_email_contacto_general(consulta)
+    else:
+        email_enviado = False
+
+    if not email_enviado:
+        send_mail(
+            f"Consulta de {consulta.nombre}",
+            _mensaje_completo(consulta, tipo, propiedad_id, propiedad_url),
+            settings.EMAIL_HOST_USER,
+            [EMAIL_FALLBACK],
+        )
+    return True
+
+
+def _mensaje_completo(consulta, tipo, propiedad_id, propiedad_url):
+    propiedad_info = ""
+    propiedad = consulta.propiedad
+    if propiedad:
+        agente = propiedad.vendedor_id
+        propiedad_info = f"""
+
+=== INFORMACIÓN DE LA PROPIEDAD ===
+Propiedad: {propiedad.titulo}
+Precio: ${propiedad.precio:,.0f}
+Habitaciones: {propiedad.habitaciones}
+Baños: {propiedad.bano}
+Estacionamiento: {propiedad.estacionamiento}
+Vendedor: {agente.nombre if agente else 'No asignado'} {agente.apellido if agente else ''}
+URL: {propiedad_url}
+"""
+    elif propiedad_id:
+        propiedad_info = f"""
+
+=== INFORMACIÓN DE LA PROPIEDAD ===
+Propiedad ID: {propiedad_id} (Propiedad no encontrada)
+"""
+
+    return f"""NUEVA CONSULTA DE CONTACTO
+
+Nombre: {consulta.nombre}
+Email: {consulta.email}
+Teléfono: {consulta.telefono}
+Tipo de operación: {tipo}
+Presupuesto: ${consulta.presupuesto}{propiedad_info}
+
+Mensaje:
+{consulta.mensaje}"""
+
+
+def cambiar_estado_visitas(queryset, estado):
+    """
+    Cambia el estado de varias solicitudes de visita con un único UPDATE y
+    encola un solo trabajo de emails para las que efectivamente cambiaron.
+
+    Mantiene la semántica de solicitud_visita_post_save: solo se notifica
+    al pasar a 'confirmada' o 'rechazada'. Devuelve la cantidad actualizada.
+    """
+    db = router.db_for_write(SolicitudVisita)
+    with transaction.atomic(using=db):
+        ids = list(queryset.exclude(estado=estado).values_list('id', flat=True))
+        if not ids:
+            return 0
+        actualizadas = SolicitudVisita.objects.filter(id__in=ids).update(estado=estado)
+        if estado in NOTIFICACIONES_VISITA:
+            transaction.on_commit(lambda: encolar(enviar_notificaciones_visitas, ids, estado), using=db)
+    return actualizadas
@@ -1,151 +1,142 @@
-from django.db.models.signals import post_save, pre_save
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from django.conf import settings
 from django.utils import timezone
 
-from .models import SolicitudVisita, Consulta
-from .email_utils import enviar_notificacion_visita_confirmada, enviar_notificacion_visita_rechazada
+from .models import Propiedad, SolicitudVisita, Consulta, Vendedor, Entrada, Categoria
+from .blog import actualizar_contadores, invalidar_sidebar_blog, mover_contadores_sin_categoria
+from .busqueda import desindexar_entrada, indexar_entrada
+from .email_utils import (
+    NOTIFICACIONES_VISITA,
+    enviar_notificaciones_visitas,
+    enviar_notificacion_consulta_respondida,
+)
+from .middleware import invalidar_paginas
+from .relacionadas import recalcular_relacionadas
+from .tasks import encolar
 
 
+@receiver(pre_save, sender=Consulta)
 @receiver(pre_save, sender=SolicitudVisita)
-def solicitud_visita_pre_save(sender, instance, **kwargs):
+def verificar_propiedad(sender, instance, **kwargs):
     """
-    Guarda el estado anterior de la solicitud de visita antes de guardar
+    Integridad de la FK a Propiedad, que cruza bases de datos (ver routers.py).
+    Solo consulta el catálogo si la propiedad cambió y no vino ya cargada.
     """
-    if instance.pk:
-        try:
-            instance._estado_anterior = SolicitudVisita.objects.get(pk=instance.pk).estado
-        except SolicitudVisita.DoesNotExist:
-            instance._estado_anterior = None
-    else:
-        instance._estado_anterior = None
+    if instance.propiedad_id is None or not instance.has_changed('propiedad_id'):
+        return
+    if sender.propiedad.field.is_cached(instance):
+        return
+    if not Propiedad.objects.filter(pk=instance.propiedad_id).exists():
+        raise IntegrityError(
+            f"{sender.__name__}.propiedad_id={instance.propiedad_id} no existe en el catálogo"
+        )
 
 
-@receiver(post_save, sender=SolicitudVisita)
-def solicitud_visita_post_save(sender, instance, created, **kwargs):
+@receiver(post_delete, sender=Propiedad)
+def propiedad_post_delete(sender, instance, **kwargs):
     """
-    Envía notificación por email cuando cambia el estado de una solicitud de visita
+    Borrado en cascada de las consultas y visitas de la propiedad, que viven
+    en la base de leads
     """
-    if not created and hasattr(instance, '_estado_anterior'):
-        estado_anterior = instance._estado_anterior
-        estado_actual = instance.estado
-        
-        # Solo enviar email si el estado cambió y no es 'pendiente'
-        if estado_anterior != estado_actual and estado_actual != 'pendiente':
-            if estado_actual == 'confirmada':
-                enviar_notificacion_visita_confirmada(instance)
-            elif estado_actual == 'rechazada':
-                enviar_notificacion_visita_rechazada(instance)
+    Consulta.objects.filter(propiedad_id=instance.pk).delete()
+    SolicitudVisita.objects.filter(propiedad_id=instance.pk).delete()
 
 
-@receiver(pre_save, sender=Consulta)
-def consulta_pre_save(sender, instance, **kwargs):
+@receiver(post_save, sender=Vendedor)
+def vendedor_post_save(sender, instance, created, **kwargs):
     """
-    Guarda el estado anterior de la consulta antes de guardar
+    Nueva versión para las propiedades del vendedor: invalida sus tarjetas
+    cacheadas y los validadores de la página de detalle
     """
-    if instance.pk:
-        try:
-            consulta_anterior = Consulta.objects.get(pk=instance.pk)
-            instance._respondida_anterior = consulta_anterior.respondida
-            instance._respuesta_anterior = consulta_anterior.respuesta
-        except Consulta.DoesNotExist:
-            instance._respondida_anterior = None
-            instance._respuesta_anterior = ""
-    else:
-        instance._respondida_anterior = None
-        instance._respuesta_anterior = ""
+    if not created:
+        Propiedad.objects.filter(vendedor_id=instance).update(actualizado=timezone.now())
 
 
-@receiver(post_save, sender=Consulta)
-def consulta_post_save(sender, instance, created, **kwargs):
+@receiver(post_save, sender=Entrada)
+@receiver(post_delete, sender=Entrada)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def entrada_categoria_cambio(sender, **kwargs):
     """
-    Envía notificación por email cuando se responde una consulta
+    Cualquier cambio editorial invalida el sidebar y las páginas cacheadas
+    del blog, después del commit
     """
-    print(f"DEBUG: consulta_post_save called - created: {created}, id: {instance.pk}")
-    
-    if not created and hasattr(instance, '_respondida_anterior'):
-        respondida_anterior = instance._respondida_anterior
-        respuesta_anterior = instance._respuesta_anterior
-        
-        print(f"DEBUG: respondida_anterior: {respondida_anterior}, instance.respondida: {instance.respondida}")
-        print(f"DEBUG: respuesta_anterior: '{respuesta_anterior}', instance.respuesta: '{instance.respuesta}'")
-        
-        # Condiciones más flexibles para enviar email
-        enviar_email = False
-        
-        # Caso 1: Se marcó como respondida por primera vez y hay respuesta
-        if not respondida_anterior and instance.respondida and instance.respuesta:
-            enviar_email = True
-            print("DEBUG: Caso 1 - Primera vez respondida")
-        
-        # Caso 2: Ya estaba respondida pero se cambió la respuesta
-        elif (respondida_anterior and instance.respondida and 
-              instance.respuesta and instance.respuesta.strip() != respuesta_anterior.strip()):
-            enviar_email = True
-            print("DEBUG: Caso 2 - Respuesta actualizada")
-        
-        # Caso 3: Se agregó respuesta sin marcar como respondida
-        elif (instance.respuesta and instance.respuesta.strip() != respuesta_anterior.strip() and 
-              len(instance.respuesta.strip()) > 0):
-            enviar_email = True
-            # Auto-marcar como respondida
-            instance.respondida = True
-            print("DEBUG: Caso 3 - Auto-marcando como respondida")
-        
-        if enviar_email:
-            print("DEBUG: Enviando email de consulta respondida")
-            # Actualizar fecha de respuesta si no está establecida
-            if not instance.fecha_respuesta:
-                instance.fecha_respuesta = timezone.now()
-                instance.save(update_fields=['fecha_respuesta'])
-            
-            enviar_notificacion_consulta_respondida(instance)
-        else:
-            print("DEBUG: No se cumplieron las condiciones para enviar email")
+    def invalidar():
+        invalidar_sidebar_blog()
+        invalidar_paginas('blog')
+    transaction.on_commit(invalidar, using=kwargs.get('using'))
 
 
-def enviar_notificacion_consulta_respondida(consulta):
+@receiver(post_save, sender=Propiedad)
+@receiver(post_delete, sender=Propiedad)
+@receiver(post_save, sender=Vendedor)
+@receiver(post_delete, sender=Vendedor)
+def catalogo_cambio(sender, **kwargs):
     """
-    Envía email al cliente informando que su consulta fue respondida
+    Invalida las páginas cacheadas del catálogo (home, listado y detalle)
     """
-    print(f"DEBUG: Iniciando envío de email para consulta ID: {consulta.pk}")
-    print(f"DEBUG: Email destinatario: {consulta.email}")
-    print(f"DEBUG: Nombre: {consulta.nombre}")
-    
-    asunto = f"Respuesta a tu consulta - {consulta.asunto or 'Consulta General'}"
-    print(f"DEBUG: Asunto del email: {asunto}")
-    
-    # Contexto para el template
-    context = {
-        'consulta': consulta,
-        'propiedad': consulta.propiedad,
-    }
-    
-    try:
-        # Renderizar template HTML
-        print("DEBUG: Renderizando template HTML")
-        html_content = render_to_string('emails/consulta_respondida.html', context)
-        text_content = strip_tags(html_content)
-        print("DEBUG: Template renderizado correctamente")
-        
-        print("DEBUG: Creando mensaje de email")
-        msg = EmailMultiAlternatives(
-            subject=asunto,
-            body=text_content,
-            from_email=settings.EMAIL_HOST_USER,
-            to=[consulta.email],
+    transaction.on_commit(lambda: invalidar_paginas('catalogo'), using=kwargs.get('using'))
+
+
+@receiver(post_save, sender=Entrada)
+def entrada_post_save(sender, instance, created, **kwargs):
+    """
+    Mantiene ContadorEntradas (paginación del blog sin COUNT), el índice de
+    búsqueda y, en segundo plano, las entradas relacionadas
+    """
+    actualizar_contadores(instance, creada=created)
+    indexar_entrada(instance, using=kwargs.get('using'))
+    campos = ('titulo', 'resumen', 'contenido', 'estado', 'fecha_publicacion')
+    if created or any(instance.has_changed(campo) for campo in campos):
+        transaction.on_commit(
+            lambda: encolar(recalcular_relacionadas, [instance.pk]), using=kwargs.get('using')
         )
-        msg.attach_alternative(html_content, "text/html")
+
+
+@receiver(post_delete, sender=Entrada)
+def entrada_post_delete(sender, instance, **kwargs):
+    actualizar_contadores(instance, borrada=True)
+    desindexar_entrada(instance.pk, using=kwargs.get('using'))
+
+
+@receiver(post_delete, sender=Categoria)
+def categoria_post_delete(sender, instance, **kwargs):
+    mover_contadores_sin_categoria(instance.pk)
+
+
+@receiver(post_save, sender=SolicitudVisita)
+def solicitud_visita_post_save(sender, instance, created, **kwargs):
+    """
+    Envía notificación por email cuando cambia el estado de una solicitud de visita
+    """
+    if not created:
+        estado_actual = instance.estado
         
-        print("DEBUG: Enviando email...")
-        msg.send()
-        print("DEBUG: Email enviado exitosamente")
-        return True
-    except Exception as e:
-        print(f"ERROR enviando email de consulta respondida: {e}")
-        import traceback
-        print(f"ERROR traceback: {traceback.format_exc()}")
-        return False
+        # Solo enviar email si el estado cambió a confirmada o rechazada
+        # (el valor anterior lo conserva FieldTrackerMixin, sin otra consulta)
+        if instance.has_changed('estado') and estado_actual in NOTIFICACIONES_VISITA:
+            solicitud_id = instance.pk
+            transaction.on_commit(
+                lambda: encolar(enviar_notificaciones_visitas, [solicitud_id], estado_actual),
+                using=kwargs.get('using'),
+            )
+
+
+@receiver(post_save, sender=Consulta)
+def consulta_post_save(sender, instance, created, **kwargs):
+    """
+    Envía notificación por email cuando se responde una consulta.
+    
+    Los campos derivados (respondida, fecha_respuesta) ya se calcularon en
+    Consulta.save, así que aquí no se vuelve a escribir. El email se encola
+    recién cuando la transacción confirma.
+    """
+    if created or not instance.debe_notificar_respuesta():
+        return
+    
+    consulta_id = instance.pk
+    transaction.on_commit(
+        lambda: encolar(enviar_notificacion_consulta_respondida, consulta_id),
+        using=kwargs.get('using'),
+    )
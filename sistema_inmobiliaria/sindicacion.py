@@ -0,0 +1,312 @@
+"""
+Sitemap y feeds RSS/Atom.
+
+El sitemap es un índice (sitemap.xml) que apunta a shards de hasta
+URLS_POR_SHARD URLs: las páginas fijas, las propiedades y las entradas
+publicadas. Cada shard cubre un rango fijo de ids (el shard n va de
+n * URLS_POR_SHARD + 1 a (n + 1) * URLS_POR_SHARD), así se lee por la clave
+primaria sin OFFSET y no cambia de contenido cuando se agregan filas al
+final.
+
+Las filas de cada documento se leen en la vista, antes de responder: con
+ASGI el contenido de un StreamingHttpResponse se recorre en el event loop,
+donde el ORM no se puede usar. El XML se envía a medida que se arma
+(StreamingHttpResponse) y al terminar queda en la caché. Las claves
+llevan la versión de los grupos de invalidar_paginas ('catalogo', 'blog'),
+así que editar una propiedad o una entrada deja afuera solo lo que depende
+de ella. Los feeds (las últimas FEED_ITEMS entradas o propiedades) se
+cachean igual.
+"""
+import hashlib
+import io
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import ExpressionWrapper, F, IntegerField, Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import escape
+from django.utils.text import Truncator
+
+from .middleware import version_grupos
+from .models import Entrada, Propiedad
+
+
+URLS_POR_SHARD = 5000
+
+# URLs por bloque enviado al cliente
+URLS_POR_BLOQUE = 500
+
+FEED_ITEMS = 20
+
+CONTENT_TYPE_XML = 'application/xml; charset=utf-8'
+
+# formato -> clase de django.utils.feedgenerator
+FORMATOS_FEED = {
+    'rss': 'Rss201rev2Feed',
+    'atom': 'Atom1Feed',
+}
+
+# Páginas fijas del sitemap: (nombre de la URL, changefreq, prioridad)
+PAGINAS = [
+    ('Home', 'daily', '1.0'),
+    ('Propiedades', 'daily', '0.9'),
+    ('Blog', 'daily', '0.8'),
+    ('Nosotros', 'monthly', '0.4'),
+    ('Contacto', 'monthly', '0.4'),
+]
+
+_CABECERA_URLSET = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+
+
+def _propiedades():
+    return Propiedad.objects.all()
+
+
+def _entradas():
+    return Entrada.publicadas()
+
+
+# seccion -> (queryset, grupo de invalidación, campo de la URL, nombre de la URL, campo de lastmod)
+SECCIONES = {
+    'propiedades': (_propiedades, 'catalogo', 'pk', 'Propiedad', 'actualizado'),
+    'blog': (_entradas, 'blog', 'slug', 'Entrada', 'fecha_actualizacion'),
+}
+
+
+def _clave(request, nombre, *grupos):
+    # El sitemap lleva URLs absolutas: la clave depende del host
+    host = hashlib.md5(request.build_absolute_uri('/').encode()).hexdigest()
+    return ':'.join(['sindicacion', version_grupos(*grupos), host, nombre])
+
+
+def _respuesta_cacheada(clave, timeout, generar, leer=lambda: None, content_type=CONTENT_TYPE_XML):
+    """
+    Sirve el documento guardado en la caché o lo envía a medida que
+    ``generar(datos)`` produce los bloques, guardándolo al final. ``leer()``
+    hace las consultas (solo si no está en la caché) y ``generar`` solo arma
+    el texto: corre fuera de la vista, sin acceso al ORM bajo ASGI
+    """
+    guardado = cache.get(clave)
+    if guardado is not None:
+        return HttpResponse(guardado, content_type=content_type)
+
+    datos = leer()
+
+    def enviar():
+        bloques = []
+        for bloque in generar(datos):
+            bloques.append(bloque)
+            yield bloque
+        cache.set(clave, ''.join(bloques), timeout)
+    return StreamingHttpResponse(enviar(), content_type=content_type)
+
+
+def _plantilla_url(request, nombre):
+    # reverse() una sola vez por shard, no una por fila
+    marcador = '0' if nombre == 'Propiedad' else 'marcador'
+    url = request.build_absolute_uri(reverse(nombre, args=[marcador]))
+    return url.replace(f'/{marcador}/', '/{}/')
+
+
+def _lastmod(fecha):
+    return timezone.localtime(fecha).date().isoformat() if fecha else None
+
+
+def _url(loc, lastmod=None, changefreq=None, prioridad=None):
+    partes = [f'<url><loc>{escape(loc)}</loc>']
+    if lastmod:
+        partes.append(f'<lastmod>{lastmod}</lastmod>')
+    if changefreq:
+        partes.append(f'<changefreq>{changefreq}</changefreq>')
+    if prioridad:
+        partes.append(f'<priority>{prioridad}</priority>')
+    partes.append('</url>\n')
+    return ''.join(partes)
+
+
+def _shards(seccion):
+    """
+    [(número de shard, última modificación)] de la sección, en una consulta
+    agrupada por rango de ids
+    """
+    queryset, _, _, _, campo_fecha = SECCIONES[seccion]
+    numero = ExpressionWrapper((F('pk') - 1) / URLS_POR_SHARD, output_field=IntegerField())
+    return list(
+        queryset().order_by().annotate(shard=numero)
+        .values('shard').annotate(lastmod=Max(campo_fecha))
+        .values_list('shard', 'lastmod').order_by('shard')
+    )
+
+
+def sitemap_indice(request):
+    def leer():
+        shards = [('paginas', 0, None)]
+        for seccion in SECCIONES:
+            shards += [(seccion, numero, lastmod) for numero, lastmod in _shards(seccion)]
+        return shards
+
+    def generar(shards):
+        yield (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        )
+        for seccion, numero, lastmod in shards:
+            loc = request.build_absolute_uri(
+                reverse('sitemap_seccion', kwargs={'seccion': seccion, 'numero': numero})
+            )
+            yield f'<sitemap><loc>{escape(loc)}</loc>'
+            if lastmod:
+                yield f'<lastmod>{_lastmod(lastmod)}</lastmod>'
+            yield '</sitemap>\n'
+        yield '</sitemapindex>\n'
+
+    grupos = sorted({grupo for _, grupo, _, _, _ in SECCIONES.values()})
+    return _respuesta_cacheada(
+        _clave(request, 'sitemap', *grupos), settings.SITEMAP_CACHE_TIMEOUT, generar, leer
+    )
+
+
+def sitemap_seccion(request, seccion, numero):
+    if seccion == 'paginas':
+        if numero != 0:
+            raise Http404("Shard inexistente")
+
+        def generar_paginas(_):
+            yield _CABECERA_URLSET
+            for nombre, changefreq, prioridad in PAGINAS:
+                yield _url(request.build_absolute_uri(reverse(nombre)), changefreq=changefreq, prioridad=prioridad)
+            yield '</urlset>\n'
+        return _respuesta_cacheada(
+            _clave(request, 'sitemap-paginas'), settings.SITEMAP_CACHE_TIMEOUT, generar_paginas
+        )
+
+    if seccion not in SECCIONES:
+        raise Http404("Sección inexistente")
+    queryset, grupo, campo_url, nombre_url, campo_fecha = SECCIONES[seccion]
+
+    def leer():
+        # A lo sumo URLS_POR_SHARD tuplas de dos valores
+        return list(
+            queryset()
+            .filter(pk__gt=numero * URLS_POR_SHARD, pk__lte=(numero + 1) * URLS_POR_SHARD)
+            .order_by('pk').values_list(campo_url, campo_fecha)
+        )
+
+    def generar(filas):
+        plantilla = _plantilla_url(request, nombre_url)
+        bloque = [_CABECERA_URLSET]
+        for valor, fecha in filas:
+            bloque.append(_url(plantilla.format(valor), _lastmod(fecha)))
+            if len(bloque) >= URLS_POR_BLOQUE:
+                yield ''.join(bloque)
+                bloque = []
+        bloque.append('</urlset>\n')
+        yield ''.join(bloque)
+
+    return _respuesta_cacheada(
+        _clave(request, f'sitemap-{seccion}-{numero}', grupo), settings.SITEMAP_CACHE_TIMEOUT, generar, leer
+    )
+
+
+def _clase_feed(formato):
+    # Se valida antes de responder: dentro del streaming ya no habría 404
+    if formato not in FORMATOS_FEED:
+        raise Http404("Formato de feed inexistente")
+    # feedgenerator arrastra xml.sax y urllib.request: solo lo cargan los
+    # procesos que sirven feeds (ver benchmark_arranque)
+    from django.utils import feedgenerator
+    return getattr(feedgenerator, FORMATOS_FEED[formato])
+
+
+def _escribir(feed):
+    # Un feed son FEED_ITEMS ítems: se genera de una vez
+    salida = io.StringIO()
+    feed.write(salida, 'utf-8')
+    yield salida.getvalue()
+
+
+def feed_blog(request, formato):
+    clase = _clase_feed(formato)
+
+    def leer():
+        return list(
+            Entrada.publicadas().select_related('categoria').defer(*Entrada.CAMPOS_CUERPO)
+            .order_by('-fecha_publicacion')[:FEED_ITEMS]
+        )
+
+    def generar(entradas):
+        feed = clase(
+            language='es',
+            title="Blog | Bienes Raíces",
+            link=request.build_absolute_uri(reverse('Blog')),
+            description="Novedades, consejos y tendencias del mercado inmobiliario",
+            feed_url=request.build_absolute_uri(),
+        )
+        for entrada in entradas:
+            link = request.build_absolute_uri(reverse('Entrada', args=[entrada.slug]))
+            feed.add_item(
+                title=entrada.titulo,
+                link=link,
+                description=escape(entrada.resumen),
+                author_name=entrada.autor,
+                pubdate=entrada.fecha_publicacion,
+                updateddate=entrada.fecha_actualizacion,
+                unique_id=link,
+                categories=[entrada.categoria.nombre] if entrada.categoria else None,
+            )
+        yield from _escribir(feed)
+
+    return _respuesta_cacheada(
+        _clave(request, f'feed-blog-{formato}', 'blog'), settings.SITEMAP_CACHE_TIMEOUT, generar, leer,
+        content_type=clase.content_type,
+    )
+
+
+def feed_propiedades(request, formato):
+    clase = _clase_feed(formato)
+
+    def leer():
+        return list(Propiedad.objects.order_by('-creado', '-pk').only(
+            'titulo', 'precio', 'descripcion', 'habitaciones', 'bano', 'creado', 'actualizado'
+        )[:FEED_ITEMS])
+
+    def generar(propiedades):
+        feed = clase(
+            language='es',
+            title="Propiedades nuevas | Bienes Raíces",
+            link=request.build_absolute_uri(reverse('Propiedades')),
+            description="Las últimas propiedades publicadas",
+            feed_url=request.build_absolute_uri(),
+        )
+        for propiedad in propiedades:
+            link = request.build_absolute_uri(reverse('Propiedad', args=[propiedad.pk]))
+            feed.add_item(
+                title=propiedad.titulo,
+                link=link,
+                description=escape(
+                    f"${propiedad.precio} · {propiedad.habitaciones} habitaciones · "
+                    f"{propiedad.bano} baños. {Truncator(propiedad.descripcion).words(40)}"
+                ),
+                pubdate=timezone.make_aware(datetime.combine(propiedad.creado, time.min)),
+                updateddate=propiedad.actualizado,
+                unique_id=link,
+            )
+        yield from _escribir(feed)
+
+    return _respuesta_cacheada(
+        _clave(request, f'feed-propiedades-{formato}', 'catalogo'), settings.SITEMAP_CACHE_TIMEOUT, generar, leer,
+        content_type=clase.content_type,
+    )
+
+
+def robots_txt(request):
+    sitemap = request.build_absolute_uri(reverse('sitemap'))
+    return HttpResponse(
+        f"User-agent: *\nDisallow: /admin/\n\nSitemap: {sitemap}\n", content_type='text/plain; charset=utf-8'
+    )
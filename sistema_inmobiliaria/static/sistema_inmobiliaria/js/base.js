@@ -0,0 +1,163 @@
+// Navbar scroll effect
+window.addEventListener('scroll', function() {
+    const navbar = document.querySelector('.navbar-modern');
+    if (window.scrollY > 50) {
+        navbar.classList.add('scrolled');
+    } else {
+        navbar.classList.remove('scrolled');
+    }
+});
+
+// Dark mode toggle
+const darkModeToggle = document.getElementById('darkModeToggle');
+const body = document.body;
+
+// Initialize dark mode (enabled by default)
+const darkModePreference = localStorage.getItem('darkMode');
+if (darkModePreference === null || darkModePreference === 'enabled') {
+    body.classList.add('dark-mode');
+    document.querySelector('#darkModeToggle i').className = 'fas fa-sun';
+    localStorage.setItem('darkMode', 'enabled');
+} else {
+    body.classList.remove('dark-mode');
+    document.querySelector('#darkModeToggle i').className = 'fas fa-moon';
+}
+
+darkModeToggle.addEventListener('click', function() {
+    body.classList.toggle('dark-mode');
+    const icon = this.querySelector('i');
+    if (body.classList.contains('dark-mode')) {
+        icon.className = 'fas fa-sun';
+        localStorage.setItem('darkMode', 'enabled');
+    } else {
+        icon.className = 'fas fa-moon';
+        localStorage.setItem('darkMode', 'disabled');
+    }
+});
+
+// Smooth scrolling for anchor links
+document.querySelectorAll('a[href^="#"]').forEach(anchor => {
+    anchor.addEventListener('click', function (e) {
+        e.preventDefault();
+        const target = document.querySelector(this.getAttribute('href'));
+        if (target) {
+            target.scrollIntoView({
+                behavior: 'smooth',
+                block: 'start'
+            });
+        }
+    });
+});
+
+// Add animation classes on scroll
+const observerOptions = {
+    threshold: 0.1,
+    rootMargin: '0px 0px -50px 0px'
+};
+
+const observer = new IntersectionObserver(function(entries) {
+    entries.forEach(entry => {
+        if (entry.isIntersecting) {
+            entry.target.classList.add('animate-fade-in-up');
+        }
+    });
+}, observerOptions);
+
+// Observe elements for animation
+document.querySelectorAll('.property-card, .feature-card').forEach(el => {
+    observer.observe(el);
+});
+
+// Newsletter subscription functionality
+function initNewsletterForms() {
+    const newsletterForms = document.querySelectorAll('.newsletter-form');
+
+    newsletterForms.forEach(form => {
+        form.addEventListener('submit', async function(e) {
+            e.preventDefault();
+
+            const emailInput = form.querySelector('.newsletter-email, input[type="email"]');
+            const submitBtn = form.querySelector('button[type="submit"]');
+            const email = emailInput.value.trim();
+
+            if (!email) {
+                showNewsletterMessage('Por favor ingresa tu email', 'error');
+                return;
+            }
+
+            // Disable button and show loading
+            const originalText = submitBtn.innerHTML;
+            submitBtn.disabled = true;
+            submitBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Suscribiendo...';
+
+            try {
+                const response = await fetch(document.body.dataset.newsletterUrl, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRFToken': getCookie('csrftoken')
+                    },
+                    body: JSON.stringify({ email: email })
+                });
+
+                const data = await response.json();
+
+                if (data.success) {
+                    showNewsletterMessage(data.message, 'success');
+                    emailInput.value = '';
+                } else {
+                    showNewsletterMessage(data.message, 'error');
+                }
+            } catch (error) {
+                showNewsletterMessage('Error al procesar la suscripción. Inténtalo de nuevo.', 'error');
+            } finally {
+                // Restore button
+                submitBtn.disabled = false;
+                submitBtn.innerHTML = originalText;
+            }
+        });
+    });
+}
+
+function showNewsletterMessage(message, type) {
+    // Remove existing messages
+    const existingMessages = document.querySelectorAll('.newsletter-message');
+    existingMessages.forEach(msg => msg.remove());
+
+    // Create new message
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `alert alert-${type === 'success' ? 'success' : 'danger'} newsletter-message mt-2`;
+    messageDiv.innerHTML = `
+        <i class="fas fa-${type === 'success' ? 'check-circle' : 'exclamation-circle'} me-2"></i>
+        ${message}
+    `;
+
+    // Find the first newsletter form and append message
+    const firstForm = document.querySelector('.newsletter-form');
+    if (firstForm) {
+        firstForm.parentNode.insertBefore(messageDiv, firstForm.nextSibling);
+
+        // Auto-remove after 5 seconds
+        setTimeout(() => {
+            messageDiv.remove();
+        }, 5000);
+    }
+}
+
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
+
+// Initialize newsletter forms when page loads
+document.addEventListener('DOMContentLoaded', initNewsletterForms);
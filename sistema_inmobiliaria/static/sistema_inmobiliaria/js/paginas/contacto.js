@@ -0,0 +1,23 @@
+// Dynamic contact details input
+document.addEventListener('DOMContentLoaded', function() {
+    const radioButtons = document.querySelectorAll('input[name="contacto"]');
+    const contactDiv = document.getElementById('contacto');
+
+    radioButtons.forEach(radio => {
+        radio.addEventListener('change', function() {
+            if (this.value === 'telefono') {
+                contactDiv.innerHTML = `
+                    <label for="telefono" class="form-label fw-semibold">Número de Teléfono *</label>
+                    <input type="tel" class="form-control form-control-lg" 
+                           id="telefono" name="telefono" placeholder="+1 (555) 123-4567" required>
+                `;
+            } else if (this.value === 'email') {
+                contactDiv.innerHTML = `
+                    <label for="email_contacto" class="form-label fw-semibold">Confirmar Email *</label>
+                    <input type="email" class="form-control form-control-lg" 
+                           id="email_contacto" name="email_contacto" placeholder="confirma@email.com" required>
+                `;
+            }
+        });
+    });
+});
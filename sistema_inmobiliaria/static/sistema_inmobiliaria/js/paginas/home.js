@@ -0,0 +1,105 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Contact modal functionality
+    const contactModal = document.getElementById('contactModal');
+    const contactForm = document.getElementById('contactForm');
+    const submitBtn = document.getElementById('submitBtn');
+    const modalMessages = document.getElementById('modalMessages');
+
+    // Handle modal open - capture property data
+    contactModal.addEventListener('show.bs.modal', function(event) {
+        const button = event.relatedTarget; // Button that triggered the modal
+        const propiedadId = button.getAttribute('data-propiedad-id');
+        const propiedadTitulo = button.getAttribute('data-propiedad-titulo');
+        const propiedadPrecio = button.getAttribute('data-propiedad-precio');
+
+        console.log('Modal abierto para propiedad:', propiedadId, propiedadTitulo, propiedadPrecio);
+
+        // Update hidden fields
+        document.getElementById('modalPropiedadId').value = propiedadId || '';
+        document.querySelector('input[name="precio"]').value = propiedadPrecio || '';
+
+        // Update modal title to include property info
+        const modalTitle = contactModal.querySelector('.modal-title');
+        if (propiedadTitulo) {
+            modalTitle.textContent = `Contactar Agente - ${propiedadTitulo}`;
+        } else {
+            modalTitle.textContent = 'Contactar Agente';
+        }
+
+        // Pre-fill message with property reference
+        const mensajeTextarea = document.getElementById('modalMensaje');
+        if (propiedadTitulo && !mensajeTextarea.value) {
+            mensajeTextarea.value = `Estoy interesado/a en la propiedad: ${propiedadTitulo}. Me gustaría obtener más información.`;
+        }
+    });
+
+    // Handle contact form submission
+    contactForm.addEventListener('submit', async function(e) {
+        e.preventDefault();
+
+        // Show loading state
+        const originalText = submitBtn.innerHTML;
+        submitBtn.disabled = true;
+        submitBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Enviando...';
+
+        // Clear previous messages
+        modalMessages.innerHTML = '';
+
+        try {
+            const formData = new FormData(contactForm);
+            console.log('Enviando datos:', Object.fromEntries(formData));
+
+            const response = await fetch(contactForm.action, {
+                method: 'POST',
+                body: formData,
+                headers: {
+                    'X-Requested-With': 'XMLHttpRequest'
+                }
+            });
+
+            if (response.ok) {
+                // Show success message
+                modalMessages.innerHTML = `
+                    <div class="alert alert-success alert-dismissible fade show" role="alert">
+                        <i class="fas fa-check-circle me-2"></i>
+                        ¡Gracias por contactarnos! Hemos recibido tu mensaje y nos pondremos en contacto contigo en breve.
+                        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+                    </div>
+                `;
+
+                // Clear form
+                contactForm.reset();
+
+                // Close modal after 3 seconds
+                setTimeout(() => {
+                    const modal = bootstrap.Modal.getInstance(contactModal);
+                    modal.hide();
+                }, 3000);
+            } else {
+                throw new Error('Error en el servidor');
+            }
+        } catch (error) {
+            console.error('Error enviando formulario:', error);
+            // Show error message
+            modalMessages.innerHTML = `
+                <div class="alert alert-danger alert-dismissible fade show" role="alert">
+                    <i class="fas fa-exclamation-circle me-2"></i>
+                    Hubo un error enviando tu mensaje. Por favor inténtalo nuevamente.
+                    <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+                </div>
+            `;
+        } finally {
+            // Restore button
+            submitBtn.disabled = false;
+            submitBtn.innerHTML = originalText;
+        }
+    });
+
+    // Clear modal when it's closed
+    contactModal.addEventListener('hidden.bs.modal', function() {
+        contactForm.reset();
+        modalMessages.innerHTML = '';
+        submitBtn.disabled = false;
+        submitBtn.innerHTML = '<i class="fas fa-paper-plane me-2"></i>Enviar Mensaje';
+    });
+});
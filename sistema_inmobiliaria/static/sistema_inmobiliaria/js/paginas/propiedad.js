@@ -0,0 +1,195 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Contact modal functionality
+    const contactModal = document.getElementById('contactModal');
+    const contactForm = document.getElementById('contactForm');
+    const submitBtn = document.getElementById('submitBtn');
+    const modalMessages = document.getElementById('modalMessages');
+
+    // Handle modal open - capture property data
+    contactModal.addEventListener('show.bs.modal', function(event) {
+        const button = event.relatedTarget;
+        const propiedadId = button.getAttribute('data-propiedad-id');
+        const propiedadTitulo = button.getAttribute('data-propiedad-titulo');
+        const propiedadPrecio = button.getAttribute('data-propiedad-precio');
+
+        console.log('Modal abierto para propiedad:', propiedadId, propiedadTitulo, propiedadPrecio);
+
+        // Update hidden fields
+        document.getElementById('modalPropiedadId').value = propiedadId || '';
+        document.querySelector('input[name="precio"]').value = propiedadPrecio || '';
+
+        // Update modal title to include property info
+        const modalTitle = contactModal.querySelector('.modal-title');
+        if (propiedadTitulo) {
+            modalTitle.textContent = `Contactar Agente - ${propiedadTitulo}`;
+        } else {
+            modalTitle.textContent = 'Contactar Agente';
+        }
+
+        // Pre-fill message with property reference
+        const mensajeTextarea = document.getElementById('modalMensaje');
+        console.log('Textarea encontrado:', mensajeTextarea);
+        if (propiedadTitulo) {
+            const mensaje = `Estoy interesado/a en la propiedad: ${propiedadTitulo}. Me gustaría obtener más información.`;
+            mensajeTextarea.value = mensaje;
+            console.log('Mensaje asignado:', mensaje);
+            console.log('Valor actual del textarea:', mensajeTextarea.value);
+        }
+    });
+
+    // Handle contact form submission
+    contactForm.addEventListener('submit', async function(e) {
+        e.preventDefault();
+
+        const originalText = submitBtn.innerHTML;
+        submitBtn.disabled = true;
+        submitBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Enviando...';
+        modalMessages.innerHTML = '';
+
+        try {
+            const formData = new FormData(contactForm);
+            console.log('Enviando datos:', Object.fromEntries(formData));
+
+            const response = await fetch(contactForm.action, {
+                method: 'POST',
+                body: formData,
+                headers: { 'X-Requested-With': 'XMLHttpRequest' }
+            });
+
+            if (response.ok) {
+                modalMessages.innerHTML = `
+                    <div class="alert alert-success alert-dismissible fade show" role="alert">
+                        <i class="fas fa-check-circle me-2"></i>
+                        ¡Gracias por contactarnos! Hemos recibido tu mensaje y nos pondremos en contacto contigo en breve.
+                        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+                    </div>
+                `;
+                contactForm.reset();
+                setTimeout(() => {
+                    const modal = bootstrap.Modal.getInstance(contactModal);
+                    modal.hide();
+                }, 3000);
+            } else {
+                throw new Error('Error en el servidor');
+            }
+        } catch (error) {
+            console.error('Error enviando formulario:', error);
+            modalMessages.innerHTML = `
+                <div class="alert alert-danger alert-dismissible fade show" role="alert">
+                    <i class="fas fa-exclamation-circle me-2"></i>
+                    Hubo un error enviando tu mensaje. Por favor inténtalo nuevamente.
+                    <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+                </div>
+            `;
+        } finally {
+            submitBtn.disabled = false;
+            submitBtn.innerHTML = originalText;
+        }
+    });
+
+    // Clear modal when it's closed
+    contactModal.addEventListener('hidden.bs.modal', function() {
+        contactForm.reset();
+        modalMessages.innerHTML = '';
+        submitBtn.disabled = false;
+        submitBtn.innerHTML = '<i class="fas fa-paper-plane me-2"></i>Enviar Mensaje';
+    });
+
+    // Schedule Visit Modal functionality
+    const scheduleModal = document.getElementById('scheduleModal');
+    const scheduleForm = document.getElementById('scheduleForm');
+    const scheduleSubmitBtn = document.getElementById('scheduleSubmitBtn');
+    const scheduleMessages = document.getElementById('scheduleMessages');
+
+    // Set minimum date to today
+    const today = new Date().toISOString().split('T')[0];
+    document.getElementById('scheduleFecha').setAttribute('min', today);
+
+    // Handle schedule modal open - capture property data
+    scheduleModal.addEventListener('show.bs.modal', function(event) {
+        const button = event.relatedTarget;
+        const propiedadId = button.getAttribute('data-propiedad-id');
+        const propiedadTitulo = button.getAttribute('data-propiedad-titulo');
+        const propiedadDireccion = button.getAttribute('data-propiedad-direccion');
+
+        console.log('Schedule modal abierto para propiedad:', propiedadId, propiedadTitulo);
+
+        // Update hidden field
+        document.getElementById('schedulePropiedadId').value = propiedadId || '';
+
+        // Update modal title to include property info
+        const modalTitle = scheduleModal.querySelector('.modal-title');
+        if (propiedadTitulo) {
+            modalTitle.textContent = `Agendar Visita - ${propiedadTitulo}`;
+        } else {
+            modalTitle.textContent = 'Agendar Visita';
+        }
+
+        // Pre-fill message with property reference
+        const mensajeTextarea = document.getElementById('scheduleMensaje');
+        if (propiedadTitulo && propiedadDireccion) {
+            const mensaje = `Solicito agendar una visita para la propiedad: ${propiedadTitulo} ubicada en ${propiedadDireccion}. Quedo atento a su confirmación.`;
+            mensajeTextarea.value = mensaje;
+        }
+    });
+
+    // Handle schedule form submission
+    scheduleForm.addEventListener('submit', async function(e) {
+        e.preventDefault();
+
+        const originalText = scheduleSubmitBtn.innerHTML;
+        scheduleSubmitBtn.disabled = true;
+        scheduleSubmitBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Procesando...';
+        scheduleMessages.innerHTML = '';
+
+        try {
+            const formData = new FormData(scheduleForm);
+            console.log('Enviando solicitud de visita:', Object.fromEntries(formData));
+
+            const response = await fetch(scheduleForm.action, {
+                method: 'POST',
+                body: formData,
+                headers: { 'X-Requested-With': 'XMLHttpRequest' }
+            });
+
+            if (response.ok) {
+                scheduleMessages.innerHTML = `
+                    <div class="alert alert-success alert-dismissible fade show" role="alert">
+                        <i class="fas fa-check-circle me-2"></i>
+                        ¡Solicitud de visita enviada exitosamente! El vendedor revisará tu solicitud y te contactará para confirmar la fecha y hora.
+                        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+                    </div>
+                `;
+                scheduleForm.reset();
+                setTimeout(() => {
+                    const modal = bootstrap.Modal.getInstance(scheduleModal);
+                    modal.hide();
+                }, 4000);
+            } else {
+                throw new Error('Error en el servidor');
+            }
+        } catch (error) {
+            console.error('Error enviando solicitud de visita:', error);
+            scheduleMessages.innerHTML = `
+                <div class="alert alert-danger alert-dismissible fade show" role="alert">
+                    <i class="fas fa-exclamation-circle me-2"></i>
+                    Hubo un error enviando tu solicitud. Por favor inténtalo nuevamente.
+                    <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+                </div>
+            `;
+        } finally {
+            scheduleSubmitBtn.disabled = false;
+            scheduleSubmitBtn.innerHTML = originalText;
+        }
+    });
+
+    // Clear schedule modal when it's closed
+    scheduleModal.addEventListener('hidden.bs.modal', function() {
+        scheduleForm.reset();
+        scheduleMessages.innerHTML = '';
+        scheduleSubmitBtn.disabled = false;
+        scheduleSubmitBtn.innerHTML = '<i class="fas fa-calendar-plus me-2"></i>Agendar Visita';
+        // Reset minimum date
+        document.getElementById('scheduleFecha').setAttribute('min', today);
+    });
+});
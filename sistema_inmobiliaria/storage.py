@@ -0,0 +1,175 @@
+"""
+Storage de archivos estáticos: estáticos propios minificados, nombres con
+hash y variantes comprimidas.
+
+collectstatic minifica en el lugar los archivos de settings.STATIC_MINIFICAR
+(mismo nombre que la fuente) y después todo pasa por
+CompressedManifestStaticFilesStorage de WhiteNoise: nombre con hash del
+contenido (que WhiteNoise sirve con ``Cache-Control: immutable`` y un año de
+vida) y copias .gz y .br (esta última si está instalado el paquete
+``Brotli``).
+
+Los minificadores no tocan cadenas, template literals ni expresiones
+regulares: solo sacan comentarios y espacios del código que las rodea.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+_RE_ESPACIOS_CSS = re.compile(r'\s*([{};,>])\s*')
+_RE_SALTOS_JS = re.compile(r'[ \t]*\n\s*')
+
+# Caracteres después de los cuales una '/' abre una expresión regular y no
+# es una división
+_ANTES_DE_REGEX = set('(,=:[!&|?{};+-*%<>~^')
+_RE_PALABRA_ANTES_DE_REGEX = re.compile(r'(?:^|[^\w$])(?:return|typeof|case|do|else|in|of|new|delete|void|throw|yield|await)\s*$')
+
+
+def _fin_de_literal(texto, inicio, cierre):
+    # Índice después del cierre de un literal que empieza en ``inicio``,
+    # saltando los escapes
+    i = inicio + 1
+    while i < len(texto) and texto[i] != cierre:
+        if texto[i] == '\\':
+            i += 1
+        elif texto[i] == '\n' and cierre in '\'"':
+            break
+        i += 1
+    return i + 1
+
+
+def _fin_de_regex(texto, inicio):
+    i, en_clase = inicio + 1, False
+    while i < len(texto) and texto[i] != '\n':
+        caracter = texto[i]
+        if caracter == '\\':
+            i += 1
+        elif caracter == '[':
+            en_clase = True
+        elif caracter == ']':
+            en_clase = False
+        elif caracter == '/' and not en_clase:
+            return i + 1
+        i += 1
+    return i
+
+
+def _trozos(texto, js=False):
+    """
+    Separa el código de los comentarios y de los literales (cadenas, y en
+    JS también template literals y regex), que el minificado no debe tocar.
+    Devuelve pares (tipo, texto) con tipo 'codigo', 'literal' o 'comentario'
+    """
+    trozos = []
+    codigo = []
+    anterior = ''  # último carácter de código que no es espacio
+    i = 0
+    while i < len(texto):
+        caracter = texto[i]
+        siguiente = texto[i + 1:i + 2]
+        if caracter == '/' and siguiente == '*':
+            fin = texto.find('*/', i + 2)
+            fin = len(texto) if fin == -1 else fin + 2
+            tipo = 'comentario'
+        elif js and caracter == '/' and siguiente == '/':
+            fin = texto.find('\n', i)
+            fin = len(texto) if fin == -1 else fin
+            tipo = 'comentario'
+        elif caracter in '\'"' or (js and caracter == '`'):
+            fin = _fin_de_literal(texto, i, caracter)
+            tipo = 'literal'
+        elif js and caracter == '/' and (
+            not anterior or anterior in _ANTES_DE_REGEX or _RE_PALABRA_ANTES_DE_REGEX.search(''.join(codigo))
+        ):
+            fin = _fin_de_regex(texto, i)
+            tipo = 'literal'
+        else:
+            codigo.append(caracter)
+            if not caracter.isspace():
+                anterior = caracter
+            i += 1
+            continue
+        if codigo:
+            trozos.append(('codigo', ''.join(codigo)))
+            codigo = []
+        trozos.append((tipo, texto[i:fin]))
+        if tipo == 'literal':
+            anterior = texto[fin - 1]
+        i = fin
+    if codigo:
+        trozos.append(('codigo', ''.join(codigo)))
+    return trozos
+
+
+def _sin_comentarios(trozos):
+    # Quita los comentarios y junta el código que quedaba a cada lado
+    resultado = []
+    for tipo, texto in trozos:
+        if tipo == 'comentario':
+            continue
+        if tipo == 'codigo' and resultado and resultado[-1][0] == 'codigo':
+            resultado[-1] = ('codigo', resultado[-1][1] + texto)
+        else:
+            resultado.append((tipo, texto))
+    return resultado
+
+
+def minificar_css(css):
+    """
+    Quita comentarios y espacios sobrantes fuera de las cadenas
+    """
+    return ''.join(
+        _RE_ESPACIOS_CSS.sub(r'\1', re.sub(r'\s+', ' ', texto)) if tipo == 'codigo' else texto
+        for tipo, texto in _sin_comentarios(_trozos(css))
+    ).replace(';}', '}').strip()
+
+
+def minificar_js(js):
+    """
+    Minificado conservador (sin parser de JavaScript): quita comentarios,
+    indentación y líneas vacías fuera de cadenas, template literals y regex.
+    Los saltos de línea quedan, así no cambia la inserción automática de ';'
+    """
+    return ''.join(
+        _RE_SALTOS_JS.sub('\n', texto) if tipo == 'codigo' else texto
+        for tipo, texto in _sin_comentarios(_trozos(js, js=True))
+    ).strip()
+
+
+MINIFICADORES = {
+    '.css': minificar_css,
+    '.js': minificar_js,
+}
+
+
+def minificar_archivo(nombre):
+    """
+    Contenido minificado del estático ``nombre`` (ruta relativa a los
+    directorios de estáticos)
+    """
+    minificar = next(
+        (funcion for extension, funcion in MINIFICADORES.items() if nombre.endswith(extension)),
+        lambda texto: texto,
+    )
+    ruta = finders.find(nombre)
+    if ruta is None:
+        raise ValueError(f"STATIC_MINIFICAR: no se encontró {nombre}")
+    with open(ruta, encoding='utf-8') as archivo:
+        return minificar(archivo.read())
+
+
+class MinificadoManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for nombre in getattr(settings, 'STATIC_MINIFICAR', []):
+                contenido = minificar_archivo(nombre)
+                if self.exists(nombre):
+                    self.delete(nombre)
+                self._save(nombre, ContentFile(contenido.encode('utf-8')))
+                paths[nombre] = (self, nombre)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
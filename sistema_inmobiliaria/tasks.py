@@ -0,0 +1,71 @@
+"""
+Cola en segundo plano para el trabajo lento (envío de emails) que no debe
+bloquear el ciclo request/response.
+
+Cada proceso (worker de gunicorn) tiene su propio hilo consumidor. Con
+BACKGROUND_TASKS_ASYNC = False las tareas se ejecutan en línea, lo que
+resulta útil en los tests y en desarrollo.
+"""
+import atexit
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+_cola = queue.Queue()
+_hilo = None
+_lock = threading.Lock()
+_FIN = object()
+
+
+def encolar(funcion, *args, **kwargs):
+    """
+    Agrega una tarea a la cola del proceso actual
+    """
+    if not getattr(settings, 'BACKGROUND_TASKS_ASYNC', True):
+        _ejecutar(funcion, args, kwargs)
+        return
+    _iniciar_hilo()
+    _cola.put((funcion, args, kwargs))
+
+
+def _ejecutar(funcion, args, kwargs):
+    try:
+        funcion(*args, **kwargs)
+    except Exception as e:
+        print(f"Error ejecutando tarea {getattr(funcion, '__name__', funcion)}: {e}")
+
+
+def _procesar_cola():
+    while True:
+        tarea = _cola.get()
+        try:
+            if tarea is _FIN:
+                return
+            close_old_connections()
+            _ejecutar(*tarea)
+        finally:
+            close_old_connections()
+            _cola.task_done()
+
+
+def _iniciar_hilo():
+    global _hilo
+    if _hilo is not None and _hilo.is_alive():
+        return
+    with _lock:
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_procesar_cola, name='tareas-inmobiliaria', daemon=True)
+            _hilo.start()
+
+
+@atexit.register
+def _vaciar_cola(timeout=10):
+    """
+    Al apagar el worker, intenta terminar las tareas pendientes
+    """
+    if _hilo is not None and _hilo.is_alive():
+        _cola.put(_FIN)
+        _hilo.join(timeout)
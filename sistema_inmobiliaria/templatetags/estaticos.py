@@ -0,0 +1,34 @@
+"""
+Hojas de estilo que no bloquean el primer pintado.
+
+Lo necesario para la parte visible ya va inline (CSS crítico, ver
+sistema_inmobiliaria.critico); el resto se pide con media="print" y se
+activa al terminar de cargar.
+"""
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from .. import vendor
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def hoja_diferida(ruta):
+    url = static(ruta)
+    return format_html(
+        '<link rel="stylesheet" href="{}" media="print" onload="this.media=\'all\'">'
+        '<noscript><link rel="stylesheet" href="{}"></noscript>',
+        url, url,
+    )
+
+
+@register.simple_tag
+def url_vendor(nombre):
+    """
+    URL de una dependencia de front-end: la copia propia (manage.py
+    construir_vendor) o, si todavía no se construyó, el CDN
+    """
+    return vendor.url_vendor(nombre)
@@ -0,0 +1,37 @@
+"""
+Tarjeta de propiedad cacheada por fragmento.
+
+La clave lleva el id de la propiedad, la variante de la tarjeta y la
+versión de la propiedad (``Propiedad.actualizado``). Guardar la propiedad
+o su vendedor cambia la versión (ver signals.vendedor_post_save), así que
+las tarjetas viejas simplemente dejan de leerse y expiran solas.
+"""
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+register = template.Library()
+
+TEMPLATE_TARJETA = 'sistema_inmobiliaria/_tarjeta_propiedad.html'
+
+
+def clave_tarjeta(propiedad, variante):
+    version = propiedad.actualizado.timestamp() if propiedad.actualizado else 0
+    return f"tarjeta_propiedad:{variante}:{propiedad.pk}:{version}"
+
+
+@register.simple_tag
+def tarjeta_propiedad(propiedad, variante='listado'):
+    """
+    Renderiza (o toma de la caché) la tarjeta de una propiedad.
+    Variantes: 'destacada' (home), 'listado' (propiedades) y 'relacionada'.
+    """
+    clave = clave_tarjeta(propiedad, variante)
+    html = cache.get(clave)
+    if html is None:
+        html = render_to_string(TEMPLATE_TARJETA, {'propiedad': propiedad, 'variante': variante})
+        cache.set(clave, html, settings.TARJETAS_CACHE_TIMEOUT)
+    return mark_safe(html)
@@ -1,4 +1,4 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -203,6 +203,7 @@ class ContactoEndToEndTest(TestCase):
     """
     Tests end-to-end para el sistema de contacto
     """
+    databases = {'default', 'leads'}
     
     def setUp(self):
         """Configuración inicial"""
@@ -417,6 +418,7 @@ class SeguridadYErroresTest(TestCase):
     """
     Tests de seguridad y manejo de errores - CRÍTICO PARA PRODUCCIÓN
     """
+    databases = {'default', 'leads'}
     
     def setUp(self):
         """Configuración inicial"""
@@ -692,6 +694,7 @@ class IntegracionEmailTest(TestCase):
     """
     Tests de integración para sistema de emails - CRÍTICO PARA NEGOCIO
     """
+    databases = {'default', 'leads'}
     
     def setUp(self):
         """Configuración inicial"""
@@ -775,3 +778,2260 @@ class IntegracionEmailTest(TestCase):
         solicitud = SolicitudVisita.objects.latest('fecha_solicitud')
         self.assertEqual(solicitud.nombre, 'Visitante Email')
         self.assertEqual(solicitud.propiedad, self.propiedad)
+
+
+class FieldTrackerTest(TestCase):
+    """
+    Tests del seguimiento de cambios usado por los signals (sin SELECT extra)
+    """
+    databases = {'default', 'leads'}
+    
+    def setUp(self):
+        """Crear consulta y solicitud de visita de prueba"""
+        self.vendedor = Vendedor.objects.create(
+            nombre="Tracker",
+            apellido="Test",
+            telefono="1234567890",
+            email="tracker@example.com"
+        )
+        self.propiedad = Propiedad.objects.create(
+            titulo="Casa Tracker",
+            precio=120000,
+            imagen="propiedades/anuncio1.jpg",
+            descripcion="Casa para testear el seguimiento de cambios con descripción suficiente",
+            habitaciones=2,
+            bano=1,
+            estacionamiento=1,
+            vendedor_id=self.vendedor
+        )
+        self.consulta = Consulta.objects.create(
+            nombre="Cliente", email="cliente@example.com", mensaje="Hola", origen="general"
+        )
+        self.solicitud = SolicitudVisita.objects.create(
+            propiedad=self.propiedad, nombre="Visitante", email="visitante@example.com",
+            telefono="1234567890", fecha_preferida=date(2030, 1, 10), hora_preferida=time(10, 0)
+        )
+    
+    def test_previous_y_has_changed(self):
+        """Los valores originales se toman al cargar desde la BD"""
+        consulta = Consulta.objects.get(pk=self.consulta.pk)
+        self.assertFalse(consulta.has_changed('respuesta'))
+        consulta.respuesta = "Gracias por escribir"
+        self.assertTrue(consulta.has_changed('respuesta'))
+        self.assertEqual(consulta.previous('respuesta'), "")
+    
+    def test_save_renueva_valores_originales(self):
+        """Después de guardar, el valor guardado pasa a ser el original"""
+        solicitud = SolicitudVisita.objects.get(pk=self.solicitud.pk)
+        solicitud.estado = 'completada'
+        solicitud.save()
+        self.assertEqual(solicitud.previous('estado'), 'completada')
+        self.assertFalse(solicitud.has_changed('estado'))
+    
+    def test_guardado_sin_select_previo(self):
+        """Editar una consulta o visita cuesta solo el UPDATE"""
+        consulta = Consulta.objects.get(pk=self.consulta.pk)
+        consulta.notas_internas = "Llamar el lunes"
+        with self.assertNumQueries(1, using='leads'):
+            consulta.save()
+        
+        solicitud = SolicitudVisita.objects.get(pk=self.solicitud.pk)
+        solicitud.mensaje = "Prefiero por la mañana"
+        with self.assertNumQueries(1, using='leads'):
+            solicitud.save()
+    
+    def test_cambio_de_estado_envia_email(self):
+        """Confirmar una visita sigue enviando la notificación al cliente"""
+        from django.core import mail
+        solicitud = SolicitudVisita.objects.get(pk=self.solicitud.pk)
+        solicitud.estado = 'confirmada'
+        with self.settings(BACKGROUND_TASKS_ASYNC=False):
+            with self.captureOnCommitCallbacks(using='leads', execute=True):
+                solicitud.save()
+            self.assertEqual(len(mail.outbox), 1)
+            self.assertEqual(mail.outbox[0].to, ['visitante@example.com'])
+            
+            # Guardar de nuevo sin cambiar el estado no reenvía
+            with self.captureOnCommitCallbacks(using='leads', execute=True):
+                solicitud.save()
+        self.assertEqual(len(mail.outbox), 1)
+    
+    def test_respuesta_envia_un_solo_email(self):
+        """Responder una consulta envía un único email y fija la fecha de respuesta"""
+        from django.core import mail
+        consulta = Consulta.objects.get(pk=self.consulta.pk)
+        consulta.respuesta = "Te esperamos en la oficina"
+        with self.settings(BACKGROUND_TASKS_ASYNC=False):
+            with self.captureOnCommitCallbacks(using='leads', execute=True):
+                consulta.save()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIsNotNone(Consulta.objects.get(pk=consulta.pk).fecha_respuesta)
+
+
+class ConsultaRespuestaTest(TestCase):
+    """
+    Tests del flujo de respuesta de consultas: una escritura y email diferido
+    """
+    databases = {'default', 'leads'}
+    
+    def setUp(self):
+        """Crear consulta pendiente"""
+        self.consulta = Consulta.objects.create(
+            nombre="Cliente", email="cliente@example.com", mensaje="¿Sigue disponible?", origen="general"
+        )
+    
+    def test_respuesta_cuesta_un_update(self):
+        """Los campos derivados se escriben junto con la respuesta"""
+        consulta = Consulta.objects.get(pk=self.consulta.pk)
+        consulta.respuesta = "Sí, sigue disponible"
+        with self.captureOnCommitCallbacks(using='leads') as callbacks:
+            with self.assertNumQueries(1, using='leads'):
+                consulta.save()
+        self.assertEqual(len(callbacks), 1)
+        
+        consulta_db = Consulta.objects.get(pk=consulta.pk)
+        self.assertTrue(consulta_db.respondida)
+        self.assertIsNotNone(consulta_db.fecha_respuesta)
+    
+    def test_email_solo_al_confirmar_transaccion(self):
+        """El email no sale si la transacción se revierte"""
+        from django.core import mail
+        from django.db import transaction
+        consulta = Consulta.objects.get(pk=self.consulta.pk)
+        consulta.respuesta = "Respuesta que se descarta"
+        with self.settings(BACKGROUND_TASKS_ASYNC=False):
+            with self.captureOnCommitCallbacks(using='leads', execute=True):
+                try:
+                    with transaction.atomic(using='leads'):
+                        consulta.save()
+                        raise RuntimeError("rollback")
+                except RuntimeError:
+                    pass
+        self.assertEqual(len(mail.outbox), 0)
+    
+    def test_update_fields_incluye_campos_derivados(self):
+        """Guardar solo la respuesta también persiste respondida y fecha_respuesta"""
+        consulta = Consulta.objects.get(pk=self.consulta.pk)
+        consulta.respuesta = "Respondida por update_fields"
+        with self.captureOnCommitCallbacks(using='leads'):
+            consulta.save(update_fields=['respuesta'])
+        consulta_db = Consulta.objects.get(pk=consulta.pk)
+        self.assertTrue(consulta_db.respondida)
+        self.assertIsNotNone(consulta_db.fecha_respuesta)
+    
+    def test_sin_cambios_no_notifica(self):
+        """Editar notas internas de una consulta respondida no reenvía el email"""
+        consulta = Consulta.objects.get(pk=self.consulta.pk)
+        consulta.respuesta = "Primera respuesta"
+        with self.captureOnCommitCallbacks(using='leads'):
+            consulta.save()
+        consulta.notas_internas = "Cliente satisfecho"
+        with self.captureOnCommitCallbacks(using='leads') as callbacks:
+            consulta.save()
+        self.assertEqual(callbacks, [])
+
+
+class ContactoServicioTest(TestCase):
+    """
+    Tests del servicio de ingreso de contactos (services.registrar_contacto)
+    """
+    databases = {'default', 'leads'}
+    
+    def setUp(self):
+        """Crear vendedor y propiedad"""
+        self.vendedor = Vendedor.objects.create(
+            nombre="Laura",
+            apellido="Gómez",
+            telefono="1234567890",
+            email="laura@example.com"
+        )
+        self.propiedad = Propiedad.objects.create(
+            titulo="Casa Servicio",
+            precio=250000,
+            imagen="propiedades/anuncio2.jpg",
+            descripcion="Casa para testear el servicio de contacto con una descripción suficiente",
+            habitaciones=3,
+            bano=2,
+            estacionamiento=1,
+            vendedor_id=self.vendedor
+        )
+        self.datos_visita = {
+            'nombre': 'Visitante Servicio',
+            'telefono': '3333333333',
+            'email': 'servicio@example.com',
+            'mensaje': 'Quiero visitar esta casa',
+            'tipo': 'Visita',
+            'propiedad_id': str(self.propiedad.id),
+            'precio': str(self.propiedad.precio),
+            'fecha_visita': '2030-05-20',
+            'hora_visita': '11:00'
+        }
+    
+    def test_post_con_consultas_acotadas(self):
+        """Una visita completa se registra con pocas consultas y sin emails en el request"""
+        from django.core import mail
+        from django.db import connections
+        from django.test.utils import CaptureQueriesContext
+        
+        with self.captureOnCommitCallbacks(using='leads') as callbacks:
+            with CaptureQueriesContext(connections['default']) as catalogo:
+                with CaptureQueriesContext(connections['leads']) as leads:
+                    response = self.client.post(reverse('Contacto'), data=self.datos_visita)
+        
+        self.assertEqual(response.status_code, 302)
+        # Un SELECT (propiedad + vendedor) en el catálogo; solo escrituras en leads
+        self.assertEqual(len(catalogo), 1)
+        self.assertFalse([q for q in leads.captured_queries if q['sql'].startswith('SELECT')])
+        self.assertLessEqual(len(leads), 5)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len(mail.outbox), 0)
+        
+        solicitud = SolicitudVisita.objects.get(email='servicio@example.com')
+        self.assertEqual(solicitud.propiedad, self.propiedad)
+        consulta = Consulta.objects.get(email='servicio@example.com')
+        self.assertEqual(consulta.notas_internas, "Agente: Laura (laura@example.com)")
+    
+    def test_visita_notifica_al_agente(self):
+        """Tras el commit se envía el email de visita al agente"""
+        from django.core import mail
+        with self.settings(BACKGROUND_TASKS_ASYNC=False):
+            with self.captureOnCommitCallbacks(using='leads', execute=True):
+                self.client.post(reverse('Contacto'), data=self.datos_visita)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['laura@example.com'])
+    
+    def test_propiedad_inexistente_usa_respaldo(self):
+        """Con una propiedad inexistente la consulta se guarda como general"""
+        from django.core import mail
+        datos = dict(self.datos_visita, propiedad_id='99999', tipo='Compra')
+        with self.settings(BACKGROUND_TASKS_ASYNC=False, EMAIL_HOST_USER='admin@example.com'):
+            with self.captureOnCommitCallbacks(using='leads', execute=True):
+                self.client.post(reverse('Contacto'), data=datos)
+        consulta = Consulta.objects.get(email='servicio@example.com')
+        self.assertEqual(consulta.origen, 'general')
+        self.assertIsNone(consulta.propiedad)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['admin@example.com'])
+
+
+class SolicitudVisitaAdminAccionesTest(TestCase):
+    """
+    Tests de las acciones masivas de SolicitudVisitaAdmin
+    """
+    databases = {'default', 'leads'}
+    
+    def setUp(self):
+        """Crear admin, propiedad y varias solicitudes pendientes"""
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+        self.client.force_login(self.admin)
+        vendedor = Vendedor.objects.create(
+            nombre="Admin", apellido="Acciones", telefono="1234567890", email="agente@example.com"
+        )
+        propiedad = Propiedad.objects.create(
+            titulo="Casa Acciones",
+            precio=90000,
+            imagen="propiedades/anuncio3.jpg",
+            descripcion="Casa para testear acciones masivas del admin con descripción suficiente",
+            habitaciones=2,
+            bano=1,
+            estacionamiento=1,
+            vendedor_id=vendedor
+        )
+        self.solicitudes = [
+            SolicitudVisita.objects.create(
+                propiedad=propiedad, nombre=f"Visitante {i}", email=f"visitante{i}@example.com",
+                telefono="1234567890", fecha_preferida=date(2030, 1, 10 + i), hora_preferida=time(10, 0)
+            )
+            for i in range(3)
+        ]
+        self.url = reverse('admin:sistema_inmobiliaria_solicitudvisita_changelist')
+    
+    def _ejecutar_accion(self, accion, solicitudes):
+        return self.client.post(self.url, {
+            'action': accion,
+            '_selected_action': [s.pk for s in solicitudes],
+        })
+    
+    def test_confirmar_envia_un_lote_de_emails(self):
+        """Confirmar varias visitas actualiza todas y envía un email por cliente"""
+        from django.core import mail
+        with self.settings(BACKGROUND_TASKS_ASYNC=False):
+            with self.captureOnCommitCallbacks(using='leads', execute=True) as callbacks:
+                response = self._ejecutar_accion('confirmar_visitas', self.solicitudes)
+        
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(SolicitudVisita.objects.filter(estado='confirmada').count(), 3)
+        self.assertEqual(
+            sorted(m.to[0] for m in mail.outbox),
+            ['visitante0@example.com', 'visitante1@example.com', 'visitante2@example.com']
+        )
+    
+    def test_solo_notifica_las_que_cambian(self):
+        """Las visitas que ya estaban en el estado destino no se vuelven a notificar"""
+        from django.core import mail
+        SolicitudVisita.objects.filter(pk=self.solicitudes[0].pk).update(estado='rechazada')
+        with self.settings(BACKGROUND_TASKS_ASYNC=False):
+            with self.captureOnCommitCallbacks(using='leads', execute=True):
+                self._ejecutar_accion('rechazar_visitas', self.solicitudes)
+        self.assertEqual(len(mail.outbox), 2)
+    
+    def test_completar_no_envia_emails(self):
+        """Completar visitas no genera notificaciones, igual que el signal"""
+        from django.core import mail
+        with self.captureOnCommitCallbacks(using='leads', execute=True) as callbacks:
+            self._ejecutar_accion('completar_visitas', self.solicitudes)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(SolicitudVisita.objects.filter(estado='completada').count(), 3)
+
+
+class SQLitePragmasTest(TestCase):
+    """
+    Tests del perfil de pragmas aplicado al abrir conexiones SQLite
+    """
+    
+    def _pragma(self, nombre):
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {nombre}")
+            return cursor.fetchone()[0]
+    
+    def test_pragmas_aplicados_en_la_conexion(self):
+        """La conexión de Django ya tiene busy_timeout, synchronous y temp_store"""
+        self.assertEqual(self._pragma('busy_timeout'), 5000)
+        self.assertEqual(self._pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self._pragma('temp_store'), 2)  # MEMORY
+    
+    def test_journal_mode_primero(self):
+        """journal_mode se aplica antes que el resto de los pragmas"""
+        from .db import sentencias_pragma
+        sentencias = sentencias_pragma({'synchronous': 'NORMAL', 'journal_mode': 'WAL'})
+        self.assertEqual(sentencias, ["PRAGMA journal_mode = WAL", "PRAGMA synchronous = NORMAL"])
+    
+    def test_comando_estres(self):
+        """Con el perfil de settings el comando de estrés no tiene errores de bloqueo"""
+        import os
+        from unittest import SkipTest
+        from django.core.management import call_command
+        # Levanta varios procesos: solo corre con ESTRES_SQLITE=1
+        if os.environ.get('ESTRES_SQLITE') != '1':
+            raise SkipTest("prueba de estrés: correr con ESTRES_SQLITE=1")
+        salida = io.StringIO()
+        call_command('estres_sqlite', escritores=4, lectores=2, escrituras=100, stdout=salida)
+        por_defecto, perfil = salida.getvalue().splitlines()
+        self.assertIn("por defecto", por_defecto)
+        self.assertIn("SQLITE_PRAGMAS: 400 escrituras", perfil)
+        self.assertIn(" 0 errores de bloqueo", perfil)
+
+
+class LeadsRouterTest(TestCase):
+    """
+    Tests de la separación de bases: leads (consultas, visitas, sesiones) y catálogo
+    """
+    databases = {'default', 'leads'}
+    
+    def setUp(self):
+        """Crear propiedad con una consulta y una visita"""
+        vendedor = Vendedor.objects.create(
+            nombre="Router", apellido="Test", telefono="1234567890", email="router@example.com"
+        )
+        self.propiedad = Propiedad.objects.create(
+            titulo="Casa Router",
+            precio=110000,
+            imagen="propiedades/anuncio4.jpg",
+            descripcion="Casa para testear el router de bases de datos con descripción suficiente",
+            habitaciones=2,
+            bano=1,
+            estacionamiento=1,
+            vendedor_id=vendedor
+        )
+        self.consulta = Consulta.objects.create(
+            nombre="Cliente", email="cliente@example.com", mensaje="Hola",
+            origen="propiedad", propiedad=self.propiedad
+        )
+        self.solicitud = SolicitudVisita.objects.create(
+            propiedad=self.propiedad, nombre="Visitante", email="visitante@example.com",
+            telefono="1234567890", fecha_preferida=date(2030, 1, 10), hora_preferida=time(10, 0)
+        )
+    
+    def test_modelos_en_su_base(self):
+        """Los leads se guardan en 'leads' y el catálogo en 'default'"""
+        from django.db import router
+        from django.contrib.sessions.models import Session
+        self.assertEqual(self.consulta._state.db, 'leads')
+        self.assertEqual(self.solicitud._state.db, 'leads')
+        self.assertEqual(self.propiedad._state.db, 'default')
+        self.assertEqual(router.db_for_write(Session), 'leads')
+    
+    def test_propiedad_se_lee_del_catalogo(self):
+        """La FK de una consulta resuelve la propiedad en la base del catálogo"""
+        consulta = Consulta.objects.get(pk=self.consulta.pk)
+        self.assertEqual(consulta.propiedad, self.propiedad)
+        self.assertEqual(consulta.propiedad._state.db, 'default')
+    
+    def test_borrar_propiedad_borra_sus_leads(self):
+        """El borrado en cascada entre bases lo hace el signal post_delete"""
+        self.propiedad.delete()
+        self.assertFalse(Consulta.objects.filter(pk=self.consulta.pk).exists())
+        self.assertFalse(SolicitudVisita.objects.filter(pk=self.solicitud.pk).exists())
+    
+    def test_propiedad_inexistente_rechazada(self):
+        """No se puede guardar un lead que apunte a una propiedad inexistente"""
+        from django.db import IntegrityError
+        with self.assertRaises(IntegrityError):
+            Consulta.objects.create(
+                nombre="Cliente", email="otro@example.com", mensaje="Hola",
+                origen="propiedad", propiedad_id=99999
+            )
+    
+    def test_escritura_de_leads_no_bloquea_el_catalogo(self):
+        """Con una transacción de leads abierta, el catálogo sigue aceptando escrituras"""
+        from django.db import transaction
+        with transaction.atomic(using='leads'):
+            Consulta.objects.create(nombre="Ráfaga", email="rafaga@example.com", mensaje="Hola", origen="general")
+            self.propiedad.precio = 115000
+            self.propiedad.save()
+        self.assertEqual(Propiedad.objects.get(pk=self.propiedad.pk).precio, 115000)
+    
+    def test_busqueda_admin_por_titulo_de_propiedad(self):
+        """El admin de consultas sigue buscando por título de propiedad sin JOIN entre bases"""
+        Consulta.objects.create(nombre="Ajeno", email="ajeno@example.com", mensaje="Hola", origen="general")
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+        self.client.force_login(admin_user)
+        response = self.client.get(
+            reverse('admin:sistema_inmobiliaria_consulta_changelist'), {'q': 'Router'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['cl'].result_list), [self.consulta])
+
+
+class QueryPlanTest(TestCase):
+    """
+    Regresión de planes de consulta: las consultas de las vistas frecuentes
+    deben usar índices (EXPLAIN QUERY PLAN sin "SCAN" de tablas completas)
+    """
+    databases = {'default', 'leads'}
+    
+    # Consultas que recorren la tabla a propósito (listados completos),
+    # identificadas por la tabla del FROM principal
+    SCANS_PERMITIDOS = {
+        # Listado completo de propiedades en home/propiedades
+        'sistema_inmobiliaria_propiedad',
+        # Listado de categorías para filtros y sidebar
+        'sistema_inmobiliaria_categoria',
+        # Total del blog sin filtros: suma de los contadores (una fila por
+        # categoría, día y destacada), no de las entradas
+        'sistema_inmobiliaria_contadorentradas',
+    }
+    
+    def setUp(self):
+        """Crear un catálogo y un blog mínimos"""
+        from .models import Categoria, Entrada, SuscriptorNewsletter
+        vendedor = Vendedor.objects.create(
+            nombre="Plan", apellido="Test", telefono="1234567890", email="plan@example.com"
+        )
+        self.propiedades = [
+            Propiedad.objects.create(
+                titulo=f"Casa Plan {i}",
+                precio=100000 + i * 25000,
+                imagen="propiedades/anuncio5.jpg",
+                descripcion="Casa para testear planes de consulta con una descripción suficiente",
+                habitaciones=2 + i % 3,
+                bano=1,
+                estacionamiento=1,
+                vendedor_id=vendedor
+            )
+            for i in range(6)
+        ]
+        self.categoria = Categoria.objects.create(nombre="Mercado")
+        self.entradas = [
+            Entrada.objects.create(
+                titulo=f"Entrada plan {i}",
+                contenido="<p>Contenido de prueba para planes de consulta.</p>",
+                categoria=self.categoria,
+                estado='publicado',
+                destacado=i == 0,
+            )
+            for i in range(4)
+        ]
+        for i, propiedad in enumerate(self.propiedades):
+            SolicitudVisita.objects.create(
+                propiedad=propiedad, nombre="Visitante", email=f"v{i}@example.com",
+                telefono="1234567890", fecha_preferida=date(2030, 1, 1 + i), hora_preferida=time(10, 0)
+            )
+        SuscriptorNewsletter.objects.create(email="plan@example.com", token_confirmacion="token-plan")
+    
+    def _scans(self, alias, queries):
+        """Devuelve (sql, detalle) de cada SCAN de tabla completa no permitido"""
+        from django.db import connections
+        encontrados = []
+        with connections[alias].cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                for fila in cursor.fetchall():
+                    detalle = fila[-1]
+                    if not detalle.startswith('SCAN ') or 'INDEX' in detalle:
+                        continue
+                    tabla = detalle.split()[1]
+                    if tabla in self.SCANS_PERMITIDOS and ' WHERE ' not in sql:
+                        continue
+                    encontrados.append((sql, detalle))
+        return encontrados
+    
+    def _assert_sin_scans(self, funcion):
+        from django.db import connections
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connections['default']) as catalogo:
+            with CaptureQueriesContext(connections['leads']) as leads:
+                funcion()
+        scans = self._scans('default', catalogo.captured_queries) + self._scans('leads', leads.captured_queries)
+        self.assertEqual(scans, [], "Consultas que recorren la tabla completa")
+    
+    def test_planes_vistas_catalogo(self):
+        """home, listado con filtro de precio y detalle de propiedad"""
+        def vistas():
+            self.client.get(reverse('Home'))
+            self.client.get(reverse('Propiedades'), {'precio_min': 120000, 'precio_max': 200000})
+            self.client.get(reverse('Propiedad', args=[self.propiedades[0].id]))
+        self._assert_sin_scans(vistas)
+    
+    def test_planes_vistas_blog(self):
+        """Listado del blog (con y sin categoría) y detalle de entrada"""
+        def vistas():
+            self.client.get(reverse('Blog'))
+            self.client.get(reverse('Blog'), {'categoria': self.categoria.slug})
+            self.client.get(reverse('Entrada', args=[self.entradas[1].slug]))
+        self._assert_sin_scans(vistas)
+    
+    def test_relacionadas_al_azar_sin_leer_ids(self):
+        """Las relacionadas del detalle son 3 propiedades distintas, sin la actual y sin leer todos los ids"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        actual = self.propiedades[4]
+        for _ in range(10):
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(reverse('Propiedad', args=[actual.id]))
+            relacionadas = {p.pk for p in response.context['propiedades_relacionadas']}
+            self.assertEqual(len(relacionadas), 3)
+            self.assertNotIn(actual.pk, relacionadas)
+            for consulta in consultas.captured_queries:
+                if 'FROM "sistema_inmobiliaria_propiedad"' in consulta['sql'] and 'WHERE' not in consulta['sql']:
+                    self.assertIn('MAX(', consulta['sql'])
+    
+    def test_planes_newsletter_y_visitas(self):
+        """Confirmación de newsletter y búsquedas de visitas por estado/propiedad"""
+        def consultas():
+            self.client.get(reverse('confirmar_newsletter', args=['token-plan']))
+            list(SolicitudVisita.objects.filter(estado='pendiente', fecha_preferida__gte=date(2030, 1, 3)))
+            list(SolicitudVisita.objects.filter(
+                propiedad=self.propiedades[2], fecha_preferida__gte=date(2030, 1, 1)
+            ).order_by('fecha_preferida'))
+        self._assert_sin_scans(consultas)
+
+
+class ArchivoLeadsTest(TestCase):
+    """
+    Tests del archivo de leads (comando archivar_leads y admin de solo lectura)
+    """
+    databases = {'default', 'leads'}
+    
+    def setUp(self):
+        """Crear consultas y visitas viejas/recientes, cerradas/pendientes"""
+        from datetime import timedelta
+        vendedor = Vendedor.objects.create(
+            nombre="Archivo", apellido="Test", telefono="1234567890", email="archivo@example.com"
+        )
+        self.propiedad = Propiedad.objects.create(
+            titulo="Casa Archivo",
+            precio=95000,
+            imagen="propiedades/anuncio1.jpg",
+            descripcion="Casa para testear el archivo de leads con descripción suficiente",
+            habitaciones=2,
+            bano=1,
+            estacionamiento=1,
+            vendedor_id=vendedor
+        )
+        viejo = timezone.now() - timedelta(days=400)
+        self.vieja_respondida = Consulta.objects.create(
+            nombre="Viejo", email="viejo@example.com", mensaje="Consulta antigua",
+            origen="propiedad", propiedad=self.propiedad, respuesta="Respondida hace mucho"
+        )
+        self.vieja_pendiente = Consulta.objects.create(
+            nombre="Pendiente", email="pendiente@example.com", mensaje="Sin responder"
+        )
+        self.reciente = Consulta.objects.create(
+            nombre="Reciente", email="reciente@example.com", mensaje="Nueva", respuesta="Ya respondida"
+        )
+        Consulta.objects.filter(pk__in=[self.vieja_respondida.pk, self.vieja_pendiente.pk]).update(
+            fecha_consulta=viejo
+        )
+        self.visita_vieja = SolicitudVisita.objects.create(
+            propiedad=self.propiedad, nombre="Visitante", email="visitante@example.com",
+            telefono="1234567890", fecha_preferida=viejo.date(), hora_preferida=time(10, 0),
+            estado='completada'
+        )
+        self.visita_pendiente = SolicitudVisita.objects.create(
+            propiedad=self.propiedad, nombre="Pendiente", email="pendiente@example.com",
+            telefono="1234567890", fecha_preferida=viejo.date(), hora_preferida=time(11, 0)
+        )
+    
+    def test_archiva_solo_leads_cerrados_y_antiguos(self):
+        """Se mueven consultas respondidas y visitas completadas viejas; el resto queda"""
+        from django.core.management import call_command
+        from .models import ConsultaArchivada, SolicitudVisitaArchivada
+        call_command('archivar_leads', dias=180, lote=1, stdout=io.StringIO())
+        
+        self.assertEqual(
+            set(Consulta.objects.values_list('pk', flat=True)),
+            {self.vieja_pendiente.pk, self.reciente.pk}
+        )
+        self.assertEqual(list(SolicitudVisita.objects.values_list('pk', flat=True)), [self.visita_pendiente.pk])
+        
+        archivada = ConsultaArchivada.objects.get()
+        self.assertEqual(archivada.consulta_id, self.vieja_respondida.pk)
+        self.assertEqual(archivada.propiedad_titulo, "Casa Archivo")
+        self.assertEqual(archivada.respuesta, "Respondida hace mucho")
+        visita = SolicitudVisitaArchivada.objects.get()
+        self.assertEqual(visita.solicitud_id, self.visita_vieja.pk)
+        self.assertEqual(visita.estado, 'completada')
+    
+    def test_simular_no_mueve_nada(self):
+        """Con --simular solo se informan las cantidades"""
+        from django.core.management import call_command
+        salida = io.StringIO()
+        call_command('archivar_leads', dias=180, simular=True, stdout=salida)
+        self.assertIn("Consultas a archivar: 1", salida.getvalue())
+        self.assertIn("Visitas a archivar: 1", salida.getvalue())
+        self.assertEqual(Consulta.objects.count(), 3)
+    
+    def test_admin_archivo_busca_a_demanda(self):
+        """El admin del archivo no lista nada hasta que se busca"""
+        from django.core.management import call_command
+        call_command('archivar_leads', dias=180, stdout=io.StringIO())
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+        self.client.force_login(admin)
+        url = reverse('admin:sistema_inmobiliaria_consultaarchivada_changelist')
+        
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "viejo@example.com")
+        
+        response = self.client.get(url, {'q': 'viejo@example.com'})
+        self.assertContains(response, "viejo@example.com")
+
+
+class GetCondicionalTest(TestCase):
+    """
+    Tests de ETag/Last-Modified en los detalles de propiedad y de entrada
+    """
+    
+    def setUp(self):
+        """Crear propiedad con vendedor y una entrada publicada"""
+        from .models import Entrada
+        self.vendedor = Vendedor.objects.create(
+            nombre="Validador", apellido="Test", telefono="1234567890", email="validador@example.com"
+        )
+        self.propiedad = Propiedad.objects.create(
+            titulo="Casa Condicional",
+            precio=130000,
+            imagen="propiedades/anuncio2.jpg",
+            descripcion="Casa para testear el GET condicional de la vista de detalle con descripción",
+            habitaciones=3,
+            bano=2,
+            estacionamiento=1,
+            vendedor_id=self.vendedor
+        )
+        self.entrada = Entrada.objects.create(
+            titulo="Entrada condicional",
+            contenido="<p>Contenido de prueba para el GET condicional.</p>",
+            estado='publicado',
+        )
+        self.url_propiedad = reverse('Propiedad', args=[self.propiedad.id])
+    
+    def test_propiedad_sin_cambios_responde_304(self):
+        """Con el mismo ETag se responde 304 con una sola consulta y sin renderizar"""
+        # La primera visita fija la cookie CSRF, que forma parte del ETag
+        self.client.get(self.url_propiedad)
+        response = self.client.get(self.url_propiedad)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        # Página con formularios CSRF: solo ETag
+        self.assertFalse(response.has_header('Last-Modified'))
+        
+        with self.assertNumQueries(1), self.assertTemplateNotUsed('sistema_inmobiliaria/propiedad.html'):
+            response = self.client.get(self.url_propiedad, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+    
+    def test_cambio_de_vendedor_invalida(self):
+        """Editar el vendedor de la propiedad cambia el validador"""
+        from datetime import timedelta
+        self.client.get(self.url_propiedad)
+        etag = self.client.get(self.url_propiedad)['ETag']
+        self.assertEqual(self.client.get(self.url_propiedad, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Vendedor.objects.filter(pk=self.vendedor.pk).update(actualizado=timezone.now() + timedelta(seconds=5))
+        response = self.client.get(self.url_propiedad, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_entrada_if_modified_since(self):
+        """La entrada responde 304 a If-Modified-Since y 200 después de editarla"""
+        from datetime import timedelta
+        url = reverse('Entrada', args=[self.entrada.slug])
+        ultima = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=ultima).status_code, 304)
+        
+        type(self.entrada).objects.filter(pk=self.entrada.pk).update(
+            fecha_actualizacion=timezone.now() + timedelta(seconds=5)
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=ultima).status_code, 200)
+    
+    def test_propiedad_if_modified_since_no_da_304(self):
+        """Sin If-None-Match la página con formularios no responde 304 (el token CSRF pudo cambiar)"""
+        from django.utils.http import http_date
+        self.client.get(self.url_propiedad)
+        response = self.client.get(self.url_propiedad, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, 200)
+    
+    def test_invalidar_grupo_cambia_validadores(self):
+        """Una invalidación del blog (sidebar, relacionadas) cambia el ETag de la entrada"""
+        from .middleware import invalidar_paginas
+        url = reverse('Entrada', args=[self.entrada.slug])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        invalidar_paginas('blog')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_inexistente_sigue_dando_404(self):
+        """Sin validadores la vista responde 404 como antes"""
+        response = self.client.get(reverse('Propiedad', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class TarjetaPropiedadCacheTest(TestCase):
+    """
+    Tests de la tarjeta de propiedad cacheada por fragmento
+    """
+    
+    def setUp(self):
+        """Limpiar la caché y crear una propiedad con vendedor"""
+        from django.core.cache import cache
+        cache.clear()
+        self.vendedor = Vendedor.objects.create(
+            nombre="Tarjeta", apellido="Test", telefono="1234567890", email="tarjeta@example.com"
+        )
+        self.propiedad = Propiedad.objects.create(
+            titulo="Casa Tarjeta",
+            precio=150000,
+            imagen="propiedades/anuncio3.jpg",
+            descripcion="Casa para testear la tarjeta cacheada del listado con descripción suficiente",
+            habitaciones=3,
+            bano=2,
+            estacionamiento=1,
+            vendedor_id=self.vendedor
+        )
+    
+    def test_segunda_visita_usa_fragmento_cacheado(self):
+        """La tarjeta se renderiza una vez y luego sale de la caché"""
+        response = self.client.get(reverse('Propiedades'))
+        self.assertTemplateUsed(response, 'sistema_inmobiliaria/_tarjeta_propiedad.html')
+        self.assertContains(response, "Casa Tarjeta")
+        
+        response = self.client.get(reverse('Propiedades'))
+        self.assertTemplateNotUsed(response, 'sistema_inmobiliaria/_tarjeta_propiedad.html')
+        self.assertContains(response, "Casa Tarjeta")
+        self.assertContains(response, "Disponible")
+    
+    def test_guardar_propiedad_cambia_version(self):
+        """Editar la propiedad invalida su tarjeta"""
+        self.client.get(reverse('Home'))
+        self.propiedad.titulo = "Casa Tarjeta Renovada"
+        self.propiedad.save()
+        self.assertContains(self.client.get(reverse('Home')), "Casa Tarjeta Renovada")
+    
+    def test_guardar_vendedor_cambia_version(self):
+        """Guardar el vendedor actualiza la versión de sus propiedades"""
+        from .templatetags.propiedades import clave_tarjeta
+        clave = clave_tarjeta(self.propiedad, 'listado')
+        self.vendedor.telefono = "0987654321"
+        self.vendedor.save()
+        self.propiedad.refresh_from_db()
+        self.assertNotEqual(clave_tarjeta(self.propiedad, 'listado'), clave)
+
+
+class _ServidorRESP:
+    """
+    Servidor mínimo que habla el protocolo de Redis (RESP2) en un hilo, con
+    los comandos que usa RedisCache de Django, para probar el backend 'redis'
+    sin un Redis instalado
+    """
+    
+    def __init__(self):
+        import socketserver
+        import threading
+        datos = self.datos = {}  # clave -> (valor, vence)
+        
+        class Manejador(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    linea = self.rfile.readline()
+                    if not linea:
+                        return
+                    argumentos = []
+                    for _ in range(int(linea[1:])):
+                        largo = int(self.rfile.readline()[1:])
+                        argumentos.append(self.rfile.read(largo + 2)[:-2])
+                    self.wfile.write(_ServidorRESP.responder(datos, argumentos))
+        
+        self.servidor = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Manejador)
+        self.servidor.daemon_threads = True
+        self.url = 'redis://127.0.0.1:%d/1' % self.servidor.server_address[1]
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+    
+    def cerrar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+    
+    @staticmethod
+    def _bulk(valor):
+        return b'$-1\r\n' if valor is None else b'$%d\r\n%s\r\n' % (len(valor), valor)
+    
+    @staticmethod
+    def responder(datos, argumentos):
+        import time as reloj
+        comando, argumentos = argumentos[0].upper(), argumentos[1:]
+        for clave, (_, vence) in list(datos.items()):
+            if vence is not None and vence <= reloj.time():
+                del datos[clave]
+        if comando in (b'SELECT', b'CLIENT', b'FLUSHDB'):
+            if comando == b'FLUSHDB':
+                datos.clear()
+            return b'+OK\r\n'
+        if comando == b'GET':
+            return _ServidorRESP._bulk(datos.get(argumentos[0], (None,))[0])
+        if comando == b'MGET':
+            valores = [_ServidorRESP._bulk(datos.get(clave, (None,))[0]) for clave in argumentos]
+            return b'*%d\r\n' % len(valores) + b''.join(valores)
+        if comando == b'SET':
+            clave, valor, opciones = argumentos[0], argumentos[1], [o.upper() for o in argumentos[2:]]
+            if b'NX' in opciones and clave in datos:
+                return b'$-1\r\n'
+            vence = reloj.time() + int(opciones[opciones.index(b'EX') + 1]) if b'EX' in opciones else None
+            datos[clave] = (valor, vence)
+            return b'+OK\r\n'
+        if comando == b'INCRBY':
+            valor, vence = datos[argumentos[0]]
+            nuevo = int(valor) + int(argumentos[1])
+            datos[argumentos[0]] = (str(nuevo).encode(), vence)
+            return b':%d\r\n' % nuevo
+        if comando in (b'DEL', b'EXISTS'):
+            presentes = [clave for clave in argumentos if clave in datos]
+            if comando == b'DEL':
+                for clave in presentes:
+                    del datos[clave]
+            return b':%d\r\n' % len(presentes)
+        if comando in (b'EXPIRE', b'PERSIST'):
+            if argumentos[0] not in datos:
+                return b':0\r\n'
+            vence = reloj.time() + int(argumentos[1]) if comando == b'EXPIRE' else None
+            datos[argumentos[0]] = (datos[argumentos[0]][0], vence)
+            return b':1\r\n'
+        return b'-ERR comando no soportado\r\n'
+
+
+class CacheBackendsTest(TestCase):
+    """
+    Tests de los backends de caché compartida y sus contadores
+    """
+    
+    def setUp(self):
+        """Directorio temporal para los backends en disco"""
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(__import__('shutil').rmtree, self.directorio, True)
+    
+    def _backend(self, clase, location, **params):
+        from django.utils.module_loading import import_string
+        params.setdefault('KEY_PREFIX', 'test')
+        return import_string(f'sistema_inmobiliaria.cache.{clase}')(location, params)
+    
+    def test_sqlite_operaciones_basicas(self):
+        """SQLiteCache guarda, expira, reemplaza y borra claves"""
+        backend = self._backend('SQLiteCache', f'{self.directorio}/cache.sqlite3')
+        backend.set('clave', {'valor': 1})
+        self.assertEqual(backend.get('clave'), {'valor': 1})
+        self.assertFalse(backend.add('clave', 'otro'))
+        self.assertTrue(backend.add('contador', 1))
+        self.assertEqual(backend.incr('contador'), 2)
+        backend.set('vencida', 'x', timeout=-1)
+        self.assertIsNone(backend.get('vencida'))
+        self.assertTrue(backend.add('vencida', 'y'))
+        self.assertTrue(backend.delete('clave'))
+        self.assertEqual(backend.get('clave', 'defecto'), 'defecto')
+    
+    def test_versiones_de_clave(self):
+        """Las claves de otra versión no se ven"""
+        v1 = self._backend('SQLiteCache', f'{self.directorio}/cache.sqlite3', VERSION=1)
+        v2 = self._backend('SQLiteCache', f'{self.directorio}/cache.sqlite3', VERSION=2)
+        v1.set('clave', 'vieja')
+        self.assertIsNone(v2.get('clave'))
+    
+    def test_contadores_compartidos_entre_instancias(self):
+        """Los aciertos/fallos de dos workers se suman en la caché compartida"""
+        from .cache import VOLCAR_CADA
+        worker_a = self._backend('ArchivoCache', self.directorio)
+        worker_b = self._backend('ArchivoCache', self.directorio)
+        worker_a.set('clave', 'valor')
+        for _ in range(VOLCAR_CADA):
+            worker_a.get('clave')
+        worker_b.get('inexistente')
+        self.assertEqual(worker_b.estadisticas(), {'aciertos': VOLCAR_CADA, 'fallos': 1})
+        
+        worker_a.reiniciar_estadisticas()
+        self.assertEqual(worker_a.estadisticas(), {'aciertos': 0, 'fallos': 0})
+    
+    def test_contadores_get_many_y_has_key(self):
+        """get_many cuenta un acierto o fallo por clave y has_key también cuenta; add no"""
+        for clase, location in (
+            ('ArchivoCache', self.directorio),
+            ('MemoriaCache', 'contadores'),
+            ('SQLiteCache', f'{self.directorio}/cache.sqlite3'),
+        ):
+            with self.subTest(backend=clase):
+                backend = self._backend(clase, location)
+                backend.reiniciar_estadisticas()
+                backend.set('a', 1)
+                self.assertEqual(backend.get_many(['a', 'b', 'c']), {'a': 1})
+                self.assertTrue(backend.has_key('a'))
+                self.assertFalse(backend.has_key('x'))
+                self.assertFalse(backend.add('a', 2))
+                self.assertEqual(backend.estadisticas(), {'aciertos': 2, 'fallos': 3})
+    
+    def test_sqlite_incr_atomico_entre_conexiones(self):
+        """incr de SQLiteCache no pierde sumas con varios workers a la vez"""
+        import threading
+        ruta = f'{self.directorio}/cache.sqlite3'
+        workers = [self._backend('SQLiteCache', ruta) for _ in range(4)]
+        workers[0].set('contador', 0, timeout=None)
+        
+        def sumar(worker):
+            for _ in range(50):
+                worker.incr('contador')
+        hilos = [threading.Thread(target=sumar, args=(worker,)) for worker in workers]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(workers[0].get('contador'), 200)
+    
+    def test_redis_contra_servidor_resp(self):
+        """RedisCache contra un servidor RESP local: versiones, incr y contadores compartidos"""
+        from unittest import SkipTest
+        from .cache import VOLCAR_CADA
+        try:
+            import redis  # noqa: F401
+        except ImportError:
+            raise SkipTest("redis no está instalado")
+        servidor = _ServidorRESP()
+        self.addCleanup(servidor.cerrar)
+        worker_a = self._backend('RedisCache', servidor.url)
+        worker_b = self._backend('RedisCache', servidor.url)
+        v2 = self._backend('RedisCache', servidor.url, VERSION=2)
+        
+        worker_a.set('clave', {'valor': 1})
+        self.assertEqual(worker_b.get('clave'), {'valor': 1})
+        self.assertIsNone(v2.get('clave'))
+        self.assertFalse(worker_b.add('clave', 'otro'))
+        self.assertTrue(worker_b.add('contador', 1))
+        self.assertEqual(worker_a.incr('contador', 5), 6)
+        self.assertTrue(worker_a.delete('clave'))
+        self.assertEqual(worker_b.get('clave', 'defecto'), 'defecto')
+        
+        worker_a.reiniciar_estadisticas()
+        for _ in range(VOLCAR_CADA):
+            worker_a.get('contador')
+        worker_b.get('inexistente')
+        # worker_b suma además el acierto y el fallo de más arriba, sin volcar todavía
+        self.assertEqual(worker_b.estadisticas(), {'aciertos': VOLCAR_CADA + 1, 'fallos': 2})
+
+
+class SidebarBlogTest(TestCase):
+    """
+    Tests del sidebar del blog cacheado e invalidado por signals
+    """
+    
+    def setUp(self):
+        """Limpiar la caché y crear una categoría con una entrada publicada"""
+        from django.core.cache import cache
+        from .models import Categoria, Entrada
+        cache.clear()
+        self.categoria = Categoria.objects.create(nombre="Mercado")
+        self.entrada = Entrada.objects.create(
+            titulo="Entrada sidebar",
+            contenido="<p>Contenido de prueba para el sidebar.</p>",
+            categoria=self.categoria,
+            estado='publicado',
+        )
+    
+    def test_sidebar_no_repite_agregados(self):
+        """Con el sidebar en caché, el detalle de entrada no consulta categorías"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        url = reverse('Entrada', args=[self.entrada.slug])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertContains(response, "Mercado")
+        self.assertFalse([q for q in consultas.captured_queries if 'COUNT' in q['sql']])
+    
+    def test_guardar_entrada_invalida(self):
+        """Publicar una entrada nueva actualiza el conteo de la categoría"""
+        from .blog import sidebar_blog
+        from .models import Entrada
+        self.assertEqual(sidebar_blog()['categorias_con_conteo'][0].entradas_count, 1)
+        # En línea: guardar una entrada también recalcula las relacionadas
+        with self.settings(BACKGROUND_TASKS_ASYNC=False), self.captureOnCommitCallbacks(execute=True):
+            Entrada.objects.create(
+                titulo="Otra entrada", contenido="<p>Más contenido.</p>",
+                categoria=self.categoria, estado='publicado',
+            )
+        self.assertEqual(sidebar_blog()['categorias_con_conteo'][0].entradas_count, 2)
+    
+    def test_borrar_categoria_invalida(self):
+        """Borrar una categoría la quita del filtro del blog"""
+        from .blog import sidebar_blog
+        self.assertEqual(len(sidebar_blog()['categorias']), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.categoria.delete()
+        self.assertEqual(sidebar_blog()['categorias'], [])
+
+
+class ContadorEntradasTest(TestCase):
+    """
+    Tests de ContadorEntradas y de la paginación del blog sin COUNT duplicado
+    """
+    
+    def setUp(self):
+        """Entradas publicadas en distintos días, categorías y destacadas"""
+        from datetime import timedelta
+        from django.core.cache import cache
+        from .models import Categoria, Entrada
+        cache.clear()
+        self.mercado = Categoria.objects.create(nombre="Mercado")
+        self.consejos = Categoria.objects.create(nombre="Consejos")
+        ahora = timezone.now()
+        self.entradas = [
+            Entrada.objects.create(
+                titulo=f"Entrada contador {i}",
+                contenido="<p>Contenido de prueba para los contadores.</p>",
+                categoria=[self.mercado, self.consejos, None][i % 3],
+                estado='publicado',
+                destacado=i % 2 == 0,
+                fecha_publicacion=ahora - timedelta(days=i * 4),
+            )
+            for i in range(8)
+        ]
+        # Queda programada: no se cuenta hasta publicarse
+        Entrada.objects.create(
+            titulo="Entrada futura", contenido="<p>Todavía no.</p>", categoria=self.mercado,
+            estado='publicado', fecha_publicacion=ahora + timedelta(days=2),
+        )
+    
+    def _assert_coincide(self, categorias=None):
+        from datetime import timedelta
+        from .blog import contar_entradas
+        from .models import Entrada
+        desde = timezone.localdate() - timedelta(days=7)
+        for categoria in categorias or (None, self.mercado, self.consejos):
+            for destacadas in (False, True):
+                entradas = Entrada.publicadas()
+                if categoria:
+                    entradas = entradas.filter(categoria=categoria)
+                if destacadas:
+                    entradas = entradas.filter(destacado=True)
+                self.assertEqual(
+                    contar_entradas(categoria=categoria, destacadas=destacadas), entradas.count()
+                )
+                recientes = entradas.filter(fecha_publicacion__gte=timezone.make_aware(
+                    timezone.datetime.combine(desde, timezone.datetime.min.time())
+                ))
+                self.assertEqual(
+                    contar_entradas(categoria=categoria, desde=desde, destacadas=destacadas),
+                    recientes.count()
+                )
+    
+    def test_contadores_coinciden_con_count(self):
+        """Los contadores dan lo mismo que COUNT para cada combinación de filtros"""
+        self._assert_coincide()
+    
+    def test_cambios_de_entradas_mantienen_contadores(self):
+        """Despublicar, cambiar categoría, destacar y borrar mueven los contadores"""
+        from .models import Entrada
+        primera, segunda, tercera = Entrada.objects.filter(pk__in=[e.pk for e in self.entradas[:3]])
+        primera.estado = 'borrador'
+        primera.save()
+        segunda.categoria = self.mercado
+        segunda.destacado = True
+        segunda.save()
+        tercera.delete()
+        self._assert_coincide()
+        
+        self.consejos.delete()
+        self._assert_coincide(categorias=(None, self.mercado))
+    
+    def test_blog_un_solo_count(self):
+        """Sin búsqueda el blog no hace COUNT; con búsqueda uno solo"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.client.get(reverse('Blog'))
+        
+        def counts(parametros):
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(reverse('Blog'), parametros)
+            return response, [q['sql'] for q in consultas.captured_queries if 'COUNT(' in q['sql']]
+        
+        response, sqls = counts({'categoria': self.mercado.slug})
+        self.assertEqual(response.context['total_entradas'], 3)
+        self.assertEqual(sqls, [])
+        
+        response, sqls = counts({'search': 'contador'})
+        self.assertEqual(response.context['total_entradas'], 8)
+        self.assertEqual(len(sqls), 1)
+
+
+class PublicacionProgramadaTest(TestCase):
+    """
+    Tests de las entradas programadas y del publicador
+    """
+    
+    def setUp(self):
+        """Una entrada publicada y otra con fecha futura"""
+        from datetime import timedelta
+        from django.core.cache import cache
+        from .models import Categoria, Entrada
+        cache.clear()
+        self.categoria = Categoria.objects.create(nombre="Agenda")
+        with self.settings(BACKGROUND_TASKS_ASYNC=False):
+            self.publicada = Entrada.objects.create(
+                titulo="Entrada ya publicada", contenido="<p>Publicada.</p>", categoria=self.categoria,
+                estado='publicado', fecha_publicacion=timezone.now() - timedelta(days=1),
+            )
+            self.futura = Entrada.objects.create(
+                titulo="Entrada del lunes", contenido="<p>Todavía no.</p>", categoria=self.categoria,
+                estado='publicado', fecha_publicacion=timezone.now() + timedelta(days=2),
+            )
+    
+    def _llegar_fecha(self):
+        from datetime import timedelta
+        from .models import Entrada
+        # Simula el paso del tiempo sin pasar por save()
+        Entrada.objects.filter(pk=self.futura.pk).update(fecha_publicacion=timezone.now() - timedelta(minutes=1))
+    
+    def test_fecha_futura_queda_programada(self):
+        """Publicar con fecha futura guarda 'programado' y no la muestra ni la cuenta"""
+        from .blog import contar_entradas
+        from .models import Entrada
+        self.futura.refresh_from_db()
+        self.assertEqual(self.futura.estado, 'programado')
+        self.assertEqual(list(Entrada.publicadas()), [self.publicada])
+        self.assertEqual(contar_entradas(categoria=self.categoria), 1)
+        self.assertEqual(self.client.get(reverse('Entrada', args=[self.futura.slug])).status_code, 404)
+    
+    def test_publicador_publica_e_invalida(self):
+        """Al llegar la fecha el publicador la publica con la invalidación de una publicación manual"""
+        from .blog import contar_entradas, proxima_publicacion, publicar_programadas, sidebar_blog
+        from .busqueda import buscar_entradas
+        from .models import Entrada
+        with self.settings(PAGINA_CACHE_TIMEOUT=300):
+            self.assertNotContains(self.client.get(reverse('Blog')), "Entrada del lunes")
+            self.assertEqual(sidebar_blog()['categorias_con_conteo'][0].entradas_count, 1)
+            self.assertEqual(publicar_programadas(), 0)
+            self.assertEqual(proxima_publicacion(), self.futura.fecha_publicacion)
+            
+            self._llegar_fecha()
+            with self.settings(BACKGROUND_TASKS_ASYNC=False), self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(publicar_programadas(), 1)
+            self.assertIsNone(proxima_publicacion())
+            self.assertEqual(Entrada.objects.get(pk=self.futura.pk).estado, 'publicado')
+            self.assertContains(self.client.get(reverse('Blog')), "Entrada del lunes")
+            self.assertEqual(sidebar_blog()['categorias_con_conteo'][0].entradas_count, 2)
+            self.assertEqual(contar_entradas(categoria=self.categoria), 2)
+            self.assertEqual(list(buscar_entradas(Entrada.publicadas(), 'lunes')), [self.futura])
+            self.assertEqual(publicar_programadas(), 0)
+    
+    def test_comando_publicar_programadas(self):
+        """El comando publica las entradas vencidas y lo informa"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import Entrada
+        self._llegar_fecha()
+        salida = StringIO()
+        with self.settings(BACKGROUND_TASKS_ASYNC=False):
+            call_command('publicar_programadas', stdout=salida)
+        self.assertIn("Entradas publicadas: 1", salida.getvalue())
+        self.assertEqual(Entrada.publicadas().count(), 2)
+    
+    def test_accion_admin_respeta_fecha(self):
+        """La acción 'Marcar como publicado' deja programadas las de fecha futura"""
+        from django.contrib import admin
+        from .models import Entrada
+        Entrada.objects.update(estado='borrador')
+        modelo_admin = admin.site._registry[Entrada]
+        self.assertEqual(modelo_admin._actualizar(Entrada.objects.all(), estado='publicado'), 1)
+        self.assertEqual(
+            dict(Entrada.objects.values_list('pk', 'estado')),
+            {self.publicada.pk: 'publicado', self.futura.pk: 'programado'},
+        )
+
+
+class PaginaCompletaCacheTest(TestCase):
+    """
+    Tests de la caché de página completa para anónimos
+    """
+    databases = {'default', 'leads'}
+    
+    def setUp(self):
+        """Activar la caché de páginas y crear una propiedad"""
+        from django.core.cache import cache
+        cache.clear()
+        configuracion = self.settings(PAGINA_CACHE_TIMEOUT=300)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        self.vendedor = Vendedor.objects.create(
+            nombre="Pagina", apellido="Cache", telefono="1234567890", email="pagina@example.com"
+        )
+        self.propiedad = Propiedad.objects.create(
+            titulo="Casa Página",
+            precio=175000,
+            imagen="propiedades/anuncio4.jpg",
+            descripcion="Casa para testear la caché de página completa con descripción suficiente",
+            habitaciones=3,
+            bano=2,
+            estacionamiento=2,
+            vendedor_id=self.vendedor
+        )
+        self.url = reverse('Propiedad', args=[self.propiedad.id])
+    
+    def test_hit_sin_orm_ni_templates(self):
+        """La segunda visita anónima sale de la caché sin templates y sin más consulta que la del ETag"""
+        self.client.get(self.url)
+        with self.assertNumQueries(1), self.assertTemplateNotUsed('sistema_inmobiliaria/propiedad.html'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache-Pagina'], 'HIT')
+        self.assertContains(response, "Casa Página")
+    
+    def test_hit_con_validadores_de_la_vista(self):
+        """La página cacheada lleva los validadores de la vista y responde 304"""
+        from .models import Entrada
+        # La primera visita fija la cookie CSRF (parte del ETag) y la segunda guarda la página
+        self.client.get(self.url)
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache-Pagina'], 'HIT')
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        
+        entrada = Entrada.objects.create(
+            titulo="Entrada cacheada", contenido="<p>Contenido de la entrada cacheada.</p>", estado='publicado'
+        )
+        url = reverse('Entrada', args=[entrada.slug])
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache-Pagina'], 'HIT')
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+    
+    def test_token_csrf_de_cada_visitante(self):
+        """El token del formulario se genera para el visitante que recibe la página"""
+        import re
+        self.client.get(reverse('Contacto'))
+        
+        otro = Client(enforce_csrf_checks=True)
+        response = otro.get(reverse('Contacto'))
+        self.assertEqual(response['X-Cache-Pagina'], 'HIT')
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()).group(1)
+        response = otro.post(reverse('Contacto'), {
+            'csrfmiddlewaretoken': token, 'nombre': 'Cliente', 'email': 'cliente@example.com',
+            'mensaje': 'Hola', 'tipo': 'general',
+        })
+        self.assertEqual(response.status_code, 302)
+    
+    def test_mensajes_en_el_hueco(self):
+        """Los mensajes flash se insertan en la página cacheada de contacto"""
+        self.client.get(reverse('Contacto'))
+        response = self.client.post(reverse('Contacto'), {
+            'nombre': 'Cliente', 'email': 'cliente@example.com', 'mensaje': 'Hola', 'tipo': 'general',
+        }, follow=True)
+        self.assertEqual(response['X-Cache-Pagina'], 'HIT')
+        self.assertContains(response, "Gracias por contactarnos")
+        self.assertNotContains(self.client.get(reverse('Contacto')), "Gracias por contactarnos")
+    
+    def test_invalidacion_y_usuarios_con_sesion(self):
+        """Editar el catálogo invalida la página y con sesión no se usa la caché"""
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.propiedad.titulo = "Casa Página Renovada"
+            self.propiedad.save()
+        self.assertContains(self.client.get(self.url), "Casa Página Renovada")
+        
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+        self.client.force_login(admin)
+        self.assertFalse(self.client.get(self.url).has_header('X-Cache-Pagina'))
+
+
+class StaticPipelineTest(TestCase):
+    """
+    Tests del storage de estáticos: minificado, hash y compresión
+    """
+    
+    def test_minificadores(self):
+        """El CSS pierde comentarios y espacios; el JS conserva las líneas de código"""
+        from .storage import minificar_css, minificar_js
+        self.assertEqual(
+            minificar_css("/* titulo */\nh1 , h2 {\n  color: red;\n}\n.a > .b { margin: 0; }"),
+            "h1,h2{color: red}.a>.b{margin: 0}"
+        )
+        self.assertEqual(
+            minificar_js("// comentario\nfunction f() {\n    return 'http://x';\n}\n\n"),
+            "function f() {\nreturn 'http://x';\n}"
+        )
+    
+    def test_minificadores_respetan_literales(self):
+        """Cadenas, template literals y regex quedan intactos"""
+        from .storage import minificar_css, minificar_js
+        self.assertEqual(
+            minificar_css('a::after { content: "uno ,  dos /* no */"; }'),
+            'a::after{content: "uno ,  dos /* no */"}'
+        )
+        plantilla = "`\n    <p>\n    // no es comentario\n    </p>\n`"
+        self.assertEqual(
+            minificar_js(f"div.innerHTML = {plantilla};\n    // comentario\n    var r = /\\/\\/'/g; // fin\nvar d = a / b / c;"),
+            f"div.innerHTML = {plantilla};\nvar r = /\\/\\/'/g;\nvar d = a / b / c;"
+        )
+        self.assertEqual(minificar_js("function f(s) {\n  return /'x/.test(s);\n}"), "function f(s) {\nreturn /'x/.test(s);\n}")
+    
+    def test_collectstatic_minifica_con_hash_y_comprimidos(self):
+        """collectstatic deja los estáticos minificados con hash en el manifest y sus variantes .gz"""
+        import json
+        import os
+        import shutil
+        from django.core.management import call_command
+        from django.contrib.staticfiles import finders
+        destino = tempfile.mkdtemp()
+        fuentes = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, destino, True)
+        self.addCleanup(shutil.rmtree, fuentes, True)
+        # Solo los estáticos propios (y las imágenes que referencia el CSS),
+        # para no comprimir todo el vendor
+        for ruta in ('sistema_inmobiliaria/css', 'sistema_inmobiliaria/js', 'sistema_inmobiliaria/img'):
+            shutil.copytree(finders.find(ruta), os.path.join(fuentes, ruta))
+        with self.settings(
+            STATIC_ROOT=destino,
+            STATICFILES_DIRS=[fuentes],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STATICFILES_STORAGE='sistema_inmobiliaria.storage.MinificadoManifestStaticFilesStorage',
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        
+        with open(os.path.join(destino, 'staticfiles.json')) as manifest:
+            rutas = json.load(manifest)['paths']
+        base_css = rutas['sistema_inmobiliaria/css/base.css']
+        self.assertRegex(base_css, r'base\.[0-9a-f]{12}\.css$')
+        self.assertTrue(os.path.exists(os.path.join(destino, base_css + '.gz')))
+        with open(os.path.join(destino, base_css)) as archivo:
+            self.assertNotIn('\n  ', archivo.read())
+
+
+class CssCriticoTest(TestCase):
+    """
+    Tests del CSS crítico inline y de los estilos/scripts extraídos a estáticos
+    """
+    
+    def setUp(self):
+        """Configuración inicial para los tests"""
+        from django.core.cache import cache
+        cache.clear()
+    
+    def test_css_critico_solo_lo_visible(self):
+        """El CSS crítico del home lleva la navegación y el hero, no el footer ni los hover"""
+        from .critico import css_critico
+        css = css_critico('home')
+        self.assertIn('.navbar-modern{', css)
+        self.assertIn('.hero-section{', css)
+        self.assertNotIn('.footer-modern', css)
+        self.assertNotIn(':hover', css)
+        # Las url() relativas pasan a {% static %}
+        self.assertIn("url('{% static \"sistema_inmobiliaria/img/header.jpg\" %}')", css)
+    
+    def test_selectores_y_media(self):
+        """Se filtran selectores compuestos y reglas dentro de @media; los @keyframes sin uso se descartan"""
+        from .critico import filtrar_reglas
+        css = (
+            ".a .b { color: red; }\n.a .c { color: blue; }\n"
+            "@media (max-width: 768px) { .a { margin: 0; } .c { margin: 1px; } }\n"
+            "@keyframes aparecer { from { opacity: 0; } }\n"
+        )
+        resultado = filtrar_reglas(css, {'.a', '.b', 'div'})
+        self.assertIn('.a .b{ color: red; }', resultado)
+        self.assertNotIn('.a .c', resultado)
+        self.assertIn('@media (max-width: 768px){.a{ margin: 0; }}', resultado)
+        self.assertNotIn('keyframes', resultado)
+    
+    def test_archivos_generados_al_dia(self):
+        """Los templates critico/*.css coinciden con lo que genera manage.py css_critico"""
+        from .critico import DIRECTORIO_CRITICO, PAGINAS, css_critico
+        for pagina in PAGINAS:
+            generado = (DIRECTORIO_CRITICO / f'{pagina}.css').read_text(encoding='utf-8')
+            self.assertEqual(
+                generado.split('\n', 1)[1].strip(), css_critico(pagina),
+                f"critico/{pagina}.css desactualizado: correr manage.py css_critico"
+            )
+    
+    def test_paginas_sin_estilos_ni_scripts_inline(self):
+        """Las páginas solo llevan inline el CSS crítico; el resto son archivos estáticos"""
+        import re
+        for url, hoja in [
+            (reverse('Home'), None),
+            (reverse('Blog'), 'css/paginas/blog.css'),
+            (reverse('Propiedades'), 'css/paginas/propiedades.css'),
+        ]:
+            html = self.client.get(url).content.decode()
+            estilos = re.findall(r'<style>(.*?)</style>', html, re.DOTALL)
+            self.assertEqual(len(estilos), 1)
+            self.assertLess(len(estilos[0]), 4096)
+            self.assertNotIn('{%', estilos[0])
+            self.assertNotRegex(html, r'<script>')
+            self.assertIn('sistema_inmobiliaria/css/base.css', html)
+            self.assertIn('sistema_inmobiliaria/js/base.js', html)
+            if hoja:
+                self.assertIn(f'sistema_inmobiliaria/{hoja}', html)
+        self.assertIn(f'data-newsletter-url="{reverse("suscribir_newsletter")}"', html)
+
+
+class VendorPropioTest(TestCase):
+    """
+    Tests de las dependencias de front-end propias (manage.py construir_vendor)
+    """
+    
+    def setUp(self):
+        """Configuración inicial para los tests"""
+        from . import vendor
+        vendor._URLS_PROPIAS.clear()
+        self.addCleanup(vendor._URLS_PROPIAS.clear)
+    
+    def test_nombres_en_uso(self):
+        """Se juntan las clases de los templates y las que el JS agrega con classList"""
+        from .vendor import nombres_en_uso
+        nombres = nombres_en_uso()
+        self.assertIn('.navbar-modern', nombres)
+        self.assertIn('.fa-phone', nombres)
+        self.assertIn('.scrolled', nombres)
+        self.assertNotIn('.carousel', nombres)
+    
+    def test_purgar_bootstrap(self):
+        """Quedan las clases usadas (con sus :hover) y las que pone el JS de Bootstrap"""
+        from .vendor import purgar_bootstrap
+        css = (
+            '@charset "UTF-8";.btn{padding:1rem}.btn:hover{color:red}'
+            '.carousel{position:relative}.modal.show,.carousel.show{display:block}'
+        )
+        purgado = purgar_bootstrap(css, {'.btn', '.modal'})
+        self.assertIn('.btn{padding:1rem}', purgado)
+        self.assertIn('.btn:hover{color:red}', purgado)
+        self.assertIn('.modal.show{display:block}', purgado)
+        self.assertNotIn('carousel', purgado)
+    
+    def test_purgar_bootstrap_conserva_alertas_de_mensajes(self):
+        """Las alertas de los mensajes (alert-{{ message.tags }}) y del newsletter no se purgan"""
+        from django.contrib.messages import constants
+        from .vendor import purgar_bootstrap
+        css = (
+            '.alert-success{color:green}.alert-info{color:blue}.alert-warning{color:orange}'
+            '.alert-danger{color:red}.alert-light{color:gray}'
+        )
+        purgado = purgar_bootstrap(css, {'.alert'})
+        for clase in ('.alert-success', '.alert-info', '.alert-warning', '.alert-danger'):
+            self.assertIn(clase, purgado)
+        self.assertNotIn('.alert-light', purgado)
+        
+        with self.settings(MESSAGE_TAGS={constants.ERROR: 'light'}):
+            self.assertIn('.alert-light', purgar_bootstrap(css, {'.alert'}))
+    
+    def test_purgar_iconos(self):
+        """Quedan los íconos usados y las @font-face de sus familias, solo en woff2"""
+        from .vendor import purgar_iconos
+        css = (
+            '@font-face{font-family:"Font Awesome 6 Free";font-weight:900;'
+            'src:url(../webfonts/fa-solid-900.woff2) format("woff2"),url(../webfonts/fa-solid-900.ttf) format("truetype")}'
+            '@font-face{font-family:"FontAwesome";src:url(../webfonts/fa-v4compatibility.woff2) format("woff2")}'
+            '.fas{font-family:"Font Awesome 6 Free";font-weight:900}'
+            '.fa-phone:before{content:"\\f095"}.fa-car:before{content:"\\f1b9"}'
+        )
+        purgado, fuentes, glifos = purgar_iconos(css, {'.fas', '.fa-phone', 'i'})
+        self.assertIn('.fa-phone:before', purgado)
+        self.assertNotIn('fa-car', purgado)
+        self.assertIn('src:url(fuentes/fa-solid-900.woff2) format("woff2")', purgado)
+        self.assertNotIn('.ttf', purgado)
+        self.assertEqual(fuentes, ['../webfonts/fa-solid-900.woff2'])
+        self.assertEqual(glifos, {0xf095})
+    
+    def test_filtrar_fuentes(self):
+        """De Google Fonts queda solo el subconjunto latin, apuntando a copias locales"""
+        from .vendor import filtrar_fuentes
+        css = (
+            "/* latin-ext */\n@font-face {\n  font-family: 'Inter';\n  src: url(https://fonts.gstatic.com/s/inter/v13/ext.woff2) format('woff2');\n}\n"
+            "/* latin */\n@font-face {\n  font-family: 'Inter';\n  src: url(https://fonts.gstatic.com/s/inter/v13/latin.woff2) format('woff2');\n}\n"
+        )
+        filtrado, urls = filtrar_fuentes(css)
+        self.assertEqual(urls, ['https://fonts.gstatic.com/s/inter/v13/latin.woff2'])
+        self.assertIn('url(fuentes/latin.woff2)', filtrado)
+        self.assertNotIn('ext.woff2', filtrado)
+    
+    def test_url_vendor_usa_la_copia_propia_si_existe(self):
+        """Sin construir se usa el CDN; construido, el archivo estático propio"""
+        from unittest import mock
+        from . import vendor
+        self.assertEqual(vendor.url_vendor('bootstrap_css'), vendor.ARCHIVOS['bootstrap_css'][1])
+        with mock.patch.object(vendor.finders, 'find', return_value='/ruta/bootstrap.min.css'):
+            self.assertEqual(
+                vendor.url_vendor('bootstrap_css'),
+                '/static/sistema_inmobiliaria/vendor/propio/bootstrap.min.css'
+            )
+    
+    def test_url_vendor_no_recuerda_el_cdn(self):
+        """Un archivo que falta no queda fijado en el CDN: se usa apenas se construye"""
+        from unittest import mock
+        from . import vendor
+        with mock.patch.object(vendor.finders, 'find', return_value=None) as find:
+            vendor.url_vendor('bootstrap_css')
+            vendor.url_vendor('bootstrap_css')
+        self.assertEqual(find.call_count, 2)
+        with mock.patch.object(vendor.finders, 'find', return_value='/ruta/bootstrap.min.css'):
+            self.assertEqual(
+                vendor.url_vendor('bootstrap_css'),
+                '/static/sistema_inmobiliaria/vendor/propio/bootstrap.min.css'
+            )
+        with mock.patch.object(vendor.finders, 'find') as find:
+            vendor.url_vendor('bootstrap_css')
+        find.assert_not_called()
+
+
+class BenchmarkArranqueTest(TestCase):
+    """
+    Tests del comando benchmark_arranque y de los imports del arranque
+    """
+    
+    def test_importtime(self):
+        """Se interpretan las líneas de python -X importtime"""
+        from .management.commands.benchmark_arranque import _importtime
+        salida = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   _io\n"
+            "import time:      2500 |       4000 | django.db\n"
+        )
+        self.assertEqual(_importtime(salida), [('_io', 0.12, 0.12), ('django.db', 2.5, 4.0)])
+    
+    def test_arranque_no_carga_dependencias_pesadas(self):
+        """django.setup() y las URLs no importan reportlab ni urllib.request"""
+        from .management.commands.benchmark_arranque import medir_arranque
+        resultado = medir_arranque()
+        self.assertGreater(resultado['setup_ms'], 0)
+        self.assertIn('sistema_inmobiliaria.models', resultado['modulos'])
+        self.assertNotIn('reportlab', resultado['modulos'])
+        self.assertNotIn('urllib.request', resultado['modulos'])
+        self.assertTrue(any(nombre == 'django.apps' for nombre, _, _ in resultado['imports']))
+
+
+class VistasAsyncTest(TestCase):
+    """
+    Tests de las vistas async de formularios, servidas por la cadena ASGI
+    """
+    databases = {'default', 'leads'}
+    
+    def setUp(self):
+        """Crear una propiedad con su vendedor"""
+        from django.test import AsyncClient
+        self.async_client = AsyncClient()
+        self.vendedor = Vendedor.objects.create(
+            nombre="Async", apellido="Agente", telefono="1234567890", email="async@example.com"
+        )
+        self.propiedad = Propiedad.objects.create(
+            titulo="Casa Async",
+            precio=210000,
+            imagen="propiedades/anuncio4.jpg",
+            descripcion="Casa para testear las vistas async con una descripción suficiente",
+            habitaciones=3,
+            bano=2,
+            estacionamiento=1,
+            vendedor_id=self.vendedor
+        )
+    
+    async def test_contacto_propiedad_guarda_y_envia(self):
+        """La consulta se guarda y el email al agente sale sin bloquear la vista"""
+        from asgiref.sync import sync_to_async
+        from django.core import mail
+        from urllib.parse import urlencode
+        # urlencoded: el multipart del AsyncClient de Django 4.1 no informa el largo del cuerpo
+        response = await self.async_client.post(
+            reverse('contacto_propiedad', args=[self.propiedad.id]),
+            urlencode({'nombre': 'Cliente Async', 'email': 'cliente@example.com',
+                       'telefono': '1234567890', 'mensaje': 'Me interesa la propiedad, quisiera más datos.'}),
+            content_type='application/x-www-form-urlencoded',
+        )
+        self.assertRedirects(response, reverse('Propiedad', args=[self.propiedad.id]), fetch_redirect_response=False)
+        consulta = await Consulta.objects.aget(email='cliente@example.com')
+        self.assertEqual(consulta.propiedad_id, self.propiedad.id)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['async@example.com'])
+        self.assertIn('Casa Async', mail.outbox[0].subject)
+        self.assertEqual(await sync_to_async(Consulta.objects.count)(), 1)
+    
+    async def test_solicitar_visita_get_y_404(self):
+        """El formulario se renderiza con el agente y una propiedad inexistente da 404"""
+        response = await self.async_client.get(reverse('solicitar_visita', args=[self.propiedad.id]))
+        self.assertContains(response, 'Async Agente')
+        response = await self.async_client.get(reverse('solicitar_visita', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+    
+    async def test_suscribir_newsletter(self):
+        """Se crea el suscriptor con su token en un solo INSERT y se envía la confirmación"""
+        import json
+        from django.core import mail
+        from .models import SuscriptorNewsletter
+        url = reverse('suscribir_newsletter')
+        self.assertEqual((await self.async_client.get(url)).status_code, 405)
+        
+        response = await self.async_client.post(
+            url, json.dumps({'email': 'lector@example.com'}), content_type='application/json'
+        )
+        self.assertTrue(json.loads(response.content)['success'])
+        suscriptor = await SuscriptorNewsletter.objects.aget(email='lector@example.com')
+        self.assertTrue(suscriptor.token_confirmacion)
+        self.assertIn(suscriptor.token_confirmacion, mail.outbox[0].body)
+        
+        response = await self.async_client.post(
+            url, json.dumps({'email': 'lector@example.com'}), content_type='application/json'
+        )
+        self.assertFalse(json.loads(response.content)['success'])
+    
+    async def test_enviar_async_usa_aiosmtplib_con_smtp(self):
+        """Con el backend SMTP y aiosmtplib instalado, el envío es asíncrono"""
+        import sys
+        import types
+        from unittest import mock
+        from django.core.mail import EmailMessage
+        from .email_utils import enviar_async
+        aiosmtplib = types.ModuleType('aiosmtplib')
+        aiosmtplib.send = mock.AsyncMock()
+        msg = EmailMessage('Asunto', 'Cuerpo', 'desde@example.com', ['para@example.com'])
+        with mock.patch.dict(sys.modules, {'aiosmtplib': aiosmtplib}), self.settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='smtp.example.com', EMAIL_PORT='587',
+        ):
+            self.assertTrue(await enviar_async(msg))
+        _, kwargs = aiosmtplib.send.call_args
+        self.assertEqual(kwargs['hostname'], 'smtp.example.com')
+        self.assertEqual(kwargs['port'], 587)
+        self.assertEqual(kwargs['recipients'], ['para@example.com'])
+    
+    def test_cadena_de_middlewares_async(self):
+        """Los middlewares propios no obligan a correr la cadena ASGI en modo sync"""
+        import asyncio
+        from .middleware import EstaticosMiddleware, PaginaCompletaCacheMiddleware
+        
+        async def vista(request):
+            return None
+        
+        for clase in (EstaticosMiddleware, PaginaCompletaCacheMiddleware):
+            self.assertTrue(asyncio.iscoroutinefunction(clase(vista)))
+            self.assertFalse(asyncio.iscoroutinefunction(clase(lambda request: None)))
+
+
+class BusquedaBlogTest(TestCase):
+    """
+    Tests de la búsqueda de texto completo del blog (índice FTS5)
+    """
+    
+    def setUp(self):
+        """Entradas con el término en distintos campos"""
+        from datetime import timedelta
+        from django.core.cache import cache
+        from .models import Categoria, Entrada
+        cache.clear()
+        self.mercado = Categoria.objects.create(nombre="Mercado")
+        ahora = timezone.now()
+        self.en_titulo = Entrada.objects.create(
+            titulo="Hipotecas para tu primera casa", contenido="<p>Requisitos y plazos.</p>",
+            categoria=self.mercado, estado='publicado', fecha_publicacion=ahora - timedelta(days=3),
+        )
+        self.en_contenido = Entrada.objects.create(
+            titulo="Cómo elegir barrio", contenido="<p>Antes de pedir una <b>hipoteca</b>, mirá la zona.</p>",
+            estado='publicado', fecha_publicacion=ahora - timedelta(days=1),
+        )
+        self.acentos = Entrada.objects.create(
+            titulo="Tasación de departamentos", contenido="<p>Qué mira el tasador &amp; por qué.</p>",
+            categoria=self.mercado, estado='publicado', fecha_publicacion=ahora - timedelta(days=2),
+        )
+        Entrada.objects.create(
+            titulo="Hipotecas en borrador", contenido="<p>Sin publicar.</p>", estado='borrador',
+        )
+    
+    def _buscar(self, **parametros):
+        return self.client.get(reverse('Blog'), parametros)
+    
+    def test_ranking_por_relevancia(self):
+        """El título pesa más que el contenido y los borradores no aparecen"""
+        response = self._buscar(search='hipoteca')
+        self.assertEqual(response.context['orden_actual'], 'relevancia')
+        self.assertEqual(list(response.context['entradas']), [self.en_titulo, self.en_contenido])
+        self.assertEqual(response.context['total_entradas'], 2)
+    
+    def test_sin_acentos_y_prefijos(self):
+        """'tasacion' encuentra 'Tasación' y el texto sin HTML se indexa"""
+        response = self._buscar(search='tasacion')
+        self.assertEqual(list(response.context['entradas']), [self.acentos])
+        response = self._buscar(search='por que')
+        self.assertEqual(list(response.context['entradas']), [self.acentos])
+    
+    def test_fragmento_resaltado_y_escapado(self):
+        """El fragmento marca las coincidencias y escapa el resto del texto"""
+        response = self._buscar(search='tasador')
+        entrada = response.context['entradas'][0]
+        self.assertIn('<mark>tasador</mark> &amp; por', entrada.fragmento_html)
+        self.assertContains(response, '<mark>tasador</mark>')
+    
+    def test_filtros_en_la_misma_consulta(self):
+        """Categoría y orden se combinan con la búsqueda"""
+        response = self._buscar(search='hipoteca', categoria=self.mercado.slug)
+        self.assertEqual(list(response.context['entradas']), [self.en_titulo])
+        response = self._buscar(search='hipoteca', orden='reciente')
+        self.assertEqual(list(response.context['entradas']), [self.en_contenido, self.en_titulo])
+    
+    def test_consulta_sin_operadores(self):
+        """Comillas, asteriscos y operadores de FTS5 no rompen la búsqueda"""
+        from .busqueda import consulta_fts
+        self.assertEqual(consulta_fts('casa" OR *'), '"casa"* "OR"*')
+        response = self._buscar(search='"*(')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['entradas']), [])
+    
+    def test_indice_se_actualiza_al_guardar_y_borrar(self):
+        """Editar y borrar una entrada actualiza el índice"""
+        from .busqueda import reindexar_busqueda
+        self.en_contenido.contenido = "<p>Ahora habla de alquileres.</p>"
+        self.en_contenido.resumen = "Alquileres"
+        self.en_contenido.save()
+        self.assertEqual(list(self._buscar(search='hipoteca').context['entradas']), [self.en_titulo])
+        self.en_titulo.delete()
+        self.assertEqual(list(self._buscar(search='hipoteca').context['entradas']), [])
+        reindexar_busqueda()
+        self.assertEqual(list(self._buscar(search='alquileres').context['entradas']), [self.en_contenido])
+
+
+class ContenidoRenderizadoTest(TestCase):
+    """
+    Tests del procesamiento del cuerpo de las entradas al guardarlas
+    """
+    
+    def setUp(self):
+        """Entrada publicada con HTML a sanear"""
+        from django.core.cache import cache
+        from .models import Entrada
+        cache.clear()
+        self.entrada = Entrada.objects.create(
+            titulo="Guía de mudanza",
+            contenido=(
+                '<h2>Antes de empezar</h2><p onclick="robar()">Armá una lista '
+                '<script>alert(1)</script><img src="/media/blog/cajas.jpg">'
+                '<a href="javascript:alert(1)" target="_blank">cajas</a> &amp; etiquetas'
+                '<h2>Antes de empezar</h2><ul><li>uno<li>dos</ul>'
+            ),
+            estado='publicado',
+        )
+    
+    def test_html_saneado(self):
+        """Sin scripts, eventos ni URLs javascript:, y con las etiquetas cerradas"""
+        html = self.entrada.contenido_html
+        self.assertNotIn('script', html)
+        self.assertNotIn('onclick', html)
+        self.assertNotIn('javascript:', html)
+        self.assertIn('<a target="_blank" rel="noopener noreferrer">cajas</a>', html)
+        self.assertIn('</p><h2', html)
+        self.assertIn('<ul><li>uno</li><li>dos</li></ul>', html)
+    
+    def test_imagenes_y_anclas(self):
+        """Imágenes con carga diferida y títulos con id único y enlace de ancla"""
+        html = self.entrada.contenido_html
+        self.assertIn('<img src="/media/blog/cajas.jpg" alt="" loading="lazy" decoding="async">', html)
+        self.assertIn('<h2 id="antes-de-empezar">', html)
+        self.assertIn('<h2 id="antes-de-empezar-2">', html)
+        self.assertIn('href="#antes-de-empezar"', html)
+    
+    def test_texto_plano_y_lectura(self):
+        """Texto sin etiquetas, palabras, tiempo de lectura y resumen"""
+        self.assertEqual(
+            self.entrada.texto_plano,
+            "Antes de empezar\nArmá una lista cajas & etiquetas\nAntes de empezar\nuno\ndos",
+        )
+        self.assertEqual(self.entrada.palabras, 13)
+        self.assertEqual(self.entrada.tiempo_lectura, 1)
+        self.assertTrue(self.entrada.resumen.startswith("Antes de empezar Armá una lista"))
+        
+        self.entrada.contenido = "<p>" + "palabra " * 450 + "</p>"
+        self.entrada.save(update_fields=['contenido'])
+        self.entrada.refresh_from_db()
+        self.assertEqual(self.entrada.palabras, 450)
+        self.assertEqual(self.entrada.tiempo_lectura, 3)
+    
+    def test_solo_se_procesa_si_cambia(self):
+        """Guardar sin tocar el contenido no vuelve a procesarlo"""
+        from unittest import mock
+        from .models import Entrada
+        entrada = Entrada.objects.get(pk=self.entrada.pk)
+        with mock.patch('sistema_inmobiliaria.contenido.renderizar') as renderizar:
+            entrada.destacado = True
+            entrada.save()
+        renderizar.assert_not_called()
+    
+    def test_vistas_no_procesan_el_cuerpo(self):
+        """El detalle muestra el HTML guardado y el listado no carga el cuerpo"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        response = self.client.get(reverse('Entrada', args=[self.entrada.slug]))
+        self.assertContains(response, '<h2 id="antes-de-empezar">')
+        self.assertNotContains(response, 'robar()')
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('Blog'))
+        self.assertContains(response, 'Guía de mudanza')
+        for consulta in consultas.captured_queries:
+            if 'FROM "sistema_inmobiliaria_entrada"' in consulta['sql']:
+                self.assertNotIn('"contenido_html"', consulta['sql'])
+
+
+def _numpy_instalado():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class EntradasRelacionadasTest(TestCase):
+    """
+    Tests de las entradas relacionadas por contenido (TF-IDF precalculado)
+    """
+    
+    def setUp(self):
+        """Entradas de dos temas y de categorías cruzadas"""
+        from unittest import SkipTest
+        from django.core.cache import cache
+        from .models import Categoria, Entrada
+        if not _numpy_instalado():
+            raise SkipTest("numpy no está instalado")
+        cache.clear()
+        mercado = Categoria.objects.create(nombre="Mercado")
+        consejos = Categoria.objects.create(nombre="Consejos")
+        textos = {
+            'hipoteca': ("Hipotecas a tasa fija", "La hipoteca a tasa fija protege la cuota del crédito.", mercado),
+            'credito': ("Crédito hipotecario UVA", "Un crédito con hipoteca UVA ajusta la cuota y la tasa.", consejos),
+            'tasa': ("Cómo comparar la tasa", "Compará la tasa y la cuota de cada hipoteca y crédito.", consejos),
+            'jardin': ("Plantas para el jardín", "Regá las plantas del jardín y podá el césped en otoño.", mercado),
+            'cesped': ("Césped sano todo el año", "El césped del jardín necesita riego, plantas y sol.", consejos),
+        }
+        self.entradas = {
+            clave: Entrada.objects.create(
+                titulo=titulo, contenido=f"<p>{texto}</p>", categoria=categoria, estado='publicado',
+                fecha_publicacion=timezone.now() - timezone.timedelta(days=1),
+            )
+            for clave, (titulo, texto, categoria) in textos.items()
+        }
+    
+    def _relacionadas(self, clave):
+        from .models import EntradaRelacionada
+        return list(
+            EntradaRelacionada.objects.filter(entrada=self.entradas[clave])
+            .order_by('posicion').values_list('relacionada_id', flat=True)
+        )
+    
+    def test_vecinas_por_contenido(self):
+        """Las vecinas son las del mismo tema, sin importar la categoría"""
+        from django.core.management import call_command
+        call_command('calcular_relacionadas', stdout=io.StringIO())
+        hipotecas = {self.entradas[clave].pk for clave in ('hipoteca', 'credito', 'tasa')}
+        self.assertEqual(set(self._relacionadas('hipoteca')[:2]), hipotecas - {self.entradas['hipoteca'].pk})
+        self.assertEqual(self._relacionadas('jardin')[0], self.entradas['cesped'].pk)
+        self.assertNotIn(self.entradas['jardin'].pk, self._relacionadas('credito'))
+    
+    def test_detalle_una_consulta(self):
+        """El detalle lee las relacionadas con una sola consulta a la tabla precalculada"""
+        from django.core.management import call_command
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        call_command('calcular_relacionadas', stdout=io.StringIO())
+        entrada = self.entradas['credito']
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('Entrada', args=[entrada.slug]))
+        relacionadas = response.context['entradas_relacionadas']
+        self.assertEqual(
+            {e.pk for e in relacionadas[:2]},
+            {self.entradas['hipoteca'].pk, self.entradas['tasa'].pk},
+        )
+        sqls = [q['sql'] for q in consultas.captured_queries]
+        self.assertEqual(len([sql for sql in sqls if 'entradarelacionada' in sql]), 1)
+        # Ni la consulta por categoría de antes
+        filtro_categoria = f'"categoria_id" = {entrada.categoria_id} '
+        self.assertFalse([sql for sql in sqls if filtro_categoria in sql])
+    
+    def test_actualizacion_parcial(self):
+        """Editar o despublicar una entrada actualiza solo las filas afectadas"""
+        from django.core.management import call_command
+        from .relacionadas import recalcular_relacionadas
+        call_command('calcular_relacionadas', stdout=io.StringIO())
+        cesped = self.entradas['cesped']
+        with self.settings(BACKGROUND_TASKS_ASYNC=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                cesped.contenido = "<p>La hipoteca y el crédito a tasa fija bajan la cuota.</p>"
+                cesped.save()
+            self.assertIn(cesped.pk, self._relacionadas('hipoteca')[:3])
+            self.assertIn(self.entradas['hipoteca'].pk, self._relacionadas('cesped')[:3])
+            # Los vectores dispersos dan las mismas vecinas que la matriz completa
+            parciales = {clave: self._relacionadas(clave) for clave in self.entradas}
+            with self.captureOnCommitCallbacks(execute=True):
+                recalcular_relacionadas()
+            self.assertEqual({clave: self._relacionadas(clave) for clave in self.entradas}, parciales)
+            
+            with self.captureOnCommitCallbacks(execute=True):
+                cesped.estado = 'borrador'
+                cesped.save()
+        self.assertEqual(self._relacionadas('cesped'), [])
+        for clave in ('hipoteca', 'credito', 'tasa', 'jardin'):
+            self.assertNotIn(cesped.pk, self._relacionadas(clave))
+    
+    def test_editar_solo_el_titulo_recalcula(self):
+        """El título entra en el vector: cambiarlo solo también actualiza las vecinas"""
+        from django.core.management import call_command
+        call_command('calcular_relacionadas', stdout=io.StringIO())
+        jardin = self.entradas['jardin']
+        self.assertNotIn(jardin.pk, self._relacionadas('hipoteca')[:3])
+        with self.settings(BACKGROUND_TASKS_ASYNC=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                jardin.titulo = "Hipoteca, crédito, tasa y cuota fija"
+                jardin.save()
+        self.assertIn(jardin.pk, self._relacionadas('hipoteca')[:3])
+    
+    def test_acciones_del_admin_recalculan(self):
+        """Publicar y despublicar en lote desde el admin actualiza las relacionadas"""
+        from django.contrib import admin
+        from django.core.management import call_command
+        from .models import Entrada
+        tasa = self.entradas['tasa']
+        Entrada.objects.filter(pk=tasa.pk).update(estado='borrador')
+        call_command('calcular_relacionadas', stdout=io.StringIO())
+        self.assertEqual(self._relacionadas('tasa'), [])
+        modelo_admin = admin.site._registry[Entrada]
+        with self.settings(BACKGROUND_TASKS_ASYNC=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                modelo_admin._actualizar(Entrada.objects.filter(pk=tasa.pk), estado='publicado')
+            self.assertIn(self.entradas['hipoteca'].pk, self._relacionadas('tasa'))
+            self.assertIn(tasa.pk, self._relacionadas('hipoteca'))
+            
+            with self.captureOnCommitCallbacks(execute=True):
+                modelo_admin._actualizar(Entrada.objects.filter(pk=tasa.pk), estado='borrador')
+        self.assertEqual(self._relacionadas('tasa'), [])
+        self.assertNotIn(tasa.pk, self._relacionadas('hipoteca'))
+    
+    def test_actualizacion_parcial_sin_numpy(self):
+        """Guardar una entrada calcula sus relacionadas aunque numpy no esté instalado"""
+        import sys
+        from contextlib import redirect_stdout
+        from unittest import mock
+        from .relacionadas import recalcular_relacionadas
+        with mock.patch.dict(sys.modules, {'numpy': None}):
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(recalcular_relacionadas(), 0)
+            recalcular_relacionadas([self.entradas['jardin'].pk])
+        self.assertEqual(self._relacionadas('jardin')[0], self.entradas['cesped'].pk)
+    
+    def test_recalcular_invalida_paginas_del_blog(self):
+        """Reescribir las relacionadas cambia la versión de las páginas del blog"""
+        from .middleware import version_grupos
+        from .relacionadas import recalcular_relacionadas
+        antes = version_grupos('blog')
+        with self.captureOnCommitCallbacks(execute=True):
+            recalcular_relacionadas([self.entradas['jardin'].pk])
+        self.assertNotEqual(version_grupos('blog'), antes)
+    
+    def test_sin_calculo_usa_la_categoria(self):
+        """Sin la tabla calculada el detalle sigue mostrando relacionadas"""
+        response = self.client.get(reverse('Entrada', args=[self.entradas['jardin'].slug]))
+        self.assertEqual(len(response.context['entradas_relacionadas']), 3)
+        self.assertEqual(response.context['entradas_relacionadas'][0].categoria, self.entradas['jardin'].categoria)
+
+
+class SindicacionTest(TestCase):
+    """
+    Tests del sitemap y de los feeds RSS/Atom
+    """
+    
+    def setUp(self):
+        """Limpiar la caché y crear una propiedad y entradas publicadas y en borrador"""
+        from django.core.cache import cache
+        from .models import Entrada
+        cache.clear()
+        self.vendedor = Vendedor.objects.create(
+            nombre="Sitemap", apellido="Test", telefono="1234567890", email="sitemap@example.com"
+        )
+        self.propiedad = Propiedad.objects.create(
+            titulo="Casa Sitemap", precio=120000, imagen="propiedades/anuncio3.jpg",
+            descripcion="Casa para el sitemap & los feeds", habitaciones=3, bano=2,
+            estacionamiento=1, vendedor_id=self.vendedor,
+        )
+        self.entrada = Entrada.objects.create(
+            titulo="Entrada del feed", contenido="<p>Texto.</p>", resumen="Resumen del feed",
+            estado='publicado', fecha_publicacion=timezone.now() - timezone.timedelta(hours=1),
+        )
+        self.borrador = Entrada.objects.create(titulo="Borrador oculto", contenido="<p>No.</p>")
+    
+    def _contenido(self, response):
+        if response.streaming:
+            return b''.join(response.streaming_content).decode()
+        return response.content.decode()
+    
+    def test_indice_y_shards(self):
+        """El índice lista los shards y cada shard sus URLs, sin borradores"""
+        indice = self._contenido(self.client.get(reverse('sitemap')))
+        for seccion in ('paginas', 'propiedades', 'blog'):
+            self.assertIn(f'http://testserver/sitemap-{seccion}-0.xml', indice)
+        
+        propiedades = self._contenido(self.client.get(reverse('sitemap_seccion', args=['propiedades', 0])))
+        self.assertIn(f'<loc>http://testserver/propiedad/{self.propiedad.pk}/</loc>', propiedades)
+        self.assertIn('<lastmod>', propiedades)
+        
+        blog = self._contenido(self.client.get(reverse('sitemap_seccion', args=['blog', 0])))
+        self.assertIn(f'/blog/{self.entrada.slug}/', blog)
+        self.assertNotIn(self.borrador.slug, blog)
+        
+        paginas = self._contenido(self.client.get(reverse('sitemap_seccion', args=['paginas', 0])))
+        self.assertIn('<loc>http://testserver/nosotros</loc>', paginas)
+        self.assertEqual(self.client.get('/sitemap-otra-0.xml').status_code, 404)
+    
+    def test_shards_por_rango_de_ids(self):
+        """Cada shard lee solo su rango de ids"""
+        from unittest import mock
+        from . import sindicacion
+        with mock.patch.object(sindicacion, 'URLS_POR_SHARD', 1):
+            indice = self._contenido(self.client.get(reverse('sitemap')))
+            numero = self.entrada.pk - 1
+            self.assertIn(f'sitemap-blog-{numero}.xml', indice)
+            self.assertNotIn(f'sitemap-blog-{self.borrador.pk - 1}.xml', indice)
+            shard = self._contenido(self.client.get(reverse('sitemap_seccion', args=['blog', numero])))
+        self.assertEqual(shard.count('<url>'), 1)
+    
+    def test_streaming_cacheado_e_invalidado(self):
+        """La primera respuesta es streaming, la segunda sale de la caché y editar la invalida"""
+        url = reverse('sitemap_seccion', args=['propiedades', 0])
+        primera = self.client.get(url)
+        self.assertTrue(primera.streaming)
+        contenido = self._contenido(primera)
+        segunda = self.client.get(url)
+        self.assertFalse(segunda.streaming)
+        self.assertEqual(segunda.content.decode(), contenido)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.propiedad.save()
+        self.assertTrue(self.client.get(url).streaming)
+    
+    def test_feeds(self):
+        """Feeds RSS y Atom del blog y de las propiedades nuevas"""
+        rss = self.client.get(reverse('feed_blog', args=['rss']))
+        self.assertEqual(rss['Content-Type'], 'application/rss+xml; charset=utf-8')
+        contenido = self._contenido(rss)
+        self.assertIn('<title>Entrada del feed</title>', contenido)
+        self.assertIn('Resumen del feed', contenido)
+        self.assertNotIn('Borrador oculto', contenido)
+        
+        atom = self._contenido(self.client.get(reverse('feed_propiedades', args=['atom'])))
+        self.assertIn('xmlns="http://www.w3.org/2005/Atom"', atom)
+        self.assertIn('Casa Sitemap', atom)
+        # La descripción es texto: se escapa como HTML dentro del XML
+        self.assertIn('&amp;amp; los feeds', atom)
+        self.assertEqual(self.client.get('/blog/feed/json.xml').status_code, 404)
+    
+    def test_robots_apunta_al_sitemap(self):
+        """robots.txt indica dónde está el sitemap"""
+        response = self.client.get('/robots.txt')
+        self.assertContains(response, 'Sitemap: http://testserver/sitemap.xml')
+
+
+
+class SindicacionAsgiTest(TransactionTestCase):
+    """
+    Sitemap y feeds servidos por la aplicación ASGI. Cada request corre la
+    vista en su propio hilo, con otra conexión: los datos tienen que estar
+    confirmados (TransactionTestCase)
+    """
+    
+    def setUp(self):
+        """Limpiar la caché y crear una propiedad y una entrada publicada"""
+        from django.core.cache import cache
+        from .models import Entrada
+        cache.clear()
+        self.vendedor = Vendedor.objects.create(
+            nombre="Asgi", apellido="Sitemap", telefono="1234567890", email="asgi@example.com"
+        )
+        self.propiedad = Propiedad.objects.create(
+            titulo="Casa Sitemap", precio=120000, imagen="propiedades/anuncio3.jpg",
+            descripcion="Casa para el sitemap por ASGI", habitaciones=3, bano=2,
+            estacionamiento=1, vendedor_id=self.vendedor,
+        )
+        self.entrada = Entrada.objects.create(
+            titulo="Entrada del feed", contenido="<p>Texto.</p>", resumen="Resumen del feed",
+            estado='publicado', fecha_publicacion=timezone.now() - timezone.timedelta(days=1),
+        )
+    
+    async def _get_asgi(self, ruta):
+        """GET por la aplicación ASGI del proyecto; devuelve status y cuerpo"""
+        from asgiref.testing import ApplicationCommunicator
+        from django.core import signals
+        from django.db import close_old_connections
+        from proyecto_finalMVC.asgi import application
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': ruta, 'raw_path': ruta.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver')], 'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+        }
+        # Como el cliente de tests: sin cerrar la conexión de la transacción del test
+        signals.request_started.disconnect(close_old_connections)
+        signals.request_finished.disconnect(close_old_connections)
+        try:
+            comunicador = ApplicationCommunicator(application, scope)
+            await comunicador.send_input({'type': 'http.request', 'body': b'', 'more_body': False})
+            inicio = await comunicador.receive_output(5)
+            cuerpo = b''
+            while True:
+                mensaje = await comunicador.receive_output(5)
+                cuerpo += mensaje.get('body', b'')
+                if not mensaje.get('more_body'):
+                    break
+            await comunicador.wait(5)
+        finally:
+            signals.request_started.connect(close_old_connections)
+            signals.request_finished.connect(close_old_connections)
+        return inicio['status'], cuerpo.decode()
+    
+    async def test_streaming_bajo_asgi(self):
+        """Índice, shards y feeds se envían por ASGI sin tocar el ORM desde el event loop"""
+        status, indice = await self._get_asgi(reverse('sitemap'))
+
+        self.assertEqual(status, 200)
+        self.assertIn('http://testserver/sitemap-blog-0.xml', indice)
+        
+        status, blog = await self._get_asgi(reverse('sitemap_seccion', args=['blog', 0]))
+        self.assertEqual(status, 200)
+        self.assertIn(f'/blog/{self.entrada.slug}/', blog)
+        
+        status, propiedades = await self._get_asgi(reverse('sitemap_seccion', args=['propiedades', 0]))
+        self.assertIn(f'/propiedad/{self.propiedad.pk}/', propiedades)
+        
+        status, rss = await self._get_asgi(reverse('feed_blog', args=['rss']))
+        self.assertEqual(status, 200)
+        self.assertIn('<title>Entrada del feed</title>', rss)
+        status, atom = await self._get_asgi(reverse('feed_propiedades', args=['atom']))
+        self.assertEqual(status, 200)
+        self.assertIn('Casa Sitemap', atom)
+
+
+class ContadorVistasTest(TestCase):
+    """
+    Tests de los contadores de visitas en memoria y del orden por populares
+    """
+    
+    def setUp(self):
+        """Vaciar el buffer y crear propiedades y entradas publicadas"""
+        from django.core.cache import cache
+        from .contador_vistas import volcar_vistas
+        from .models import Entrada
+        cache.clear()
+        # Visitas de otros tests, sobre filas que ya no existen
+        volcar_vistas()
+        vendedor = Vendedor.objects.create(
+            nombre="Vistas", apellido="Test", telefono="1234567890", email="vistas@example.com"
+        )
+        self.propiedades = [
+            Propiedad.objects.create(
+                titulo=f"Casa Vistas {i}", precio=100000 + i, imagen="propiedades/anuncio1.jpg",
+                descripcion="Casa para probar los contadores de visitas del catálogo", habitaciones=2,
+                bano=1, estacionamiento=1, vendedor_id=vendedor,
+            )
+            for i in range(3)
+        ]
+        self.entradas = [
+            Entrada.objects.create(
+                titulo=f"Entrada vistas {i}", contenido="<p>Texto.</p>", estado='publicado',
+                fecha_publicacion=timezone.now() - timezone.timedelta(days=i + 1),
+            )
+            for i in range(3)
+        ]
+    
+    def test_visitas_se_vuelcan_en_lote(self):
+        """Las visitas quedan en memoria y se escriben con un UPDATE por cantidad distinta"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .contador_vistas import volcar_vistas
+        primera, segunda, tercera = self.propiedades
+        actualizado = primera.actualizado
+        for propiedad in (primera, primera, segunda, tercera):
+            self.assertEqual(self.client.get(reverse('Propiedad', args=[propiedad.pk])).status_code, 200)
+        primera.refresh_from_db()
+        self.assertEqual(primera.vistas, 0)
+        
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(volcar_vistas(), 4)
+        self.assertEqual(len([q for q in consultas.captured_queries if q['sql'].startswith('UPDATE')]), 2)
+        self.assertEqual(
+            [p.vistas for p in Propiedad.objects.filter(pk__in=[p.pk for p in self.propiedades]).order_by('pk')],
+            [2, 1, 1],
+        )
+        primera.refresh_from_db()
+        self.assertEqual(primera.actualizado, actualizado)
+        self.assertEqual(volcar_vistas(), 0)
+    
+    def test_cuenta_hits_de_cache_y_304_pero_no_404(self):
+        """Se cuentan las páginas servidas desde la caché y los 304; los 404 no"""
+        from .contador_vistas import volcar_vistas
+        from .models import Entrada
+        entrada = self.entradas[0]
+        url = reverse('Entrada', args=[entrada.slug])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.settings(PAGINA_CACHE_TIMEOUT=300):
+            self.client.get(url)
+            self.assertEqual(self.client.get(url)['X-Cache-Pagina'], 'HIT')
+        self.assertEqual(self.client.get(reverse('Entrada', args=['no-existe'])).status_code, 404)
+        volcar_vistas()
+        self.assertEqual(Entrada.objects.get(pk=entrada.pk).vistas, 4)
+    
+    def test_orden_populares(self):
+        """Blog y propiedades ordenan por las visitas volcadas"""
+        from .contador_vistas import registrar_vista, volcar_vistas
+        from .models import Entrada
+        for visitas, (propiedad, entrada) in zip((1, 5, 3), zip(self.propiedades, self.entradas)):
+            for _ in range(visitas):
+                registrar_vista(Propiedad, 'pk', propiedad.pk)
+                registrar_vista(Entrada, 'slug', entrada.slug)
+        volcar_vistas()
+        
+        response = self.client.get(reverse('Propiedades'), {'orden': 'populares'})
+        self.assertEqual(
+            [p.titulo for p in response.context['propiedades']], ["Casa Vistas 1", "Casa Vistas 2", "Casa Vistas 0"]
+        )
+        response = self.client.get(reverse('Blog'), {'orden': 'populares'})
+        self.assertEqual(
+            [e.titulo for e in response.context['entradas']], ["Entrada vistas 1", "Entrada vistas 2", "Entrada vistas 0"]
+        )
@@ -0,0 +1,58 @@
+"""
+Seguimiento de cambios en campos de modelos sin consultas adicionales.
+"""
+
+
+class FieldTrackerMixin:
+    """
+    Mixin para modelos que necesitan conocer el valor anterior de algunos campos.
+
+    Guarda una copia de ``tracked_fields`` cuando la instancia se carga desde la
+    base de datos (``from_db``) y la renueva después de cada ``save``. Así los
+    signals pueden consultar ``previous()`` y ``has_changed()`` sin volver a
+    leer la fila.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._guardar_valores_originales()
+        return instance
+
+    def _guardar_valores_originales(self, campos=None):
+        if campos is None:
+            self._valores_originales = {}
+            campos = self.tracked_fields
+        elif not hasattr(self, '_valores_originales'):
+            self._valores_originales = {}
+        for campo in campos:
+            # Los campos diferidos (.only()/.defer()) no se conocen todavía
+            if campo in self.tracked_fields and campo in self.__dict__:
+                self._valores_originales[campo] = self.__dict__[campo]
+
+    def previous(self, campo):
+        """
+        Valor del campo tal como estaba en la base de datos (None si la
+        instancia es nueva o el campo no se cargó).
+        """
+        return getattr(self, '_valores_originales', {}).get(campo)
+
+    def has_changed(self, campo):
+        """
+        Indica si el campo cambió respecto del valor cargado desde la base de datos
+        """
+        originales = getattr(self, '_valores_originales', {})
+        if self._state.adding or campo not in originales:
+            return campo in self.__dict__
+        return originales[campo] != self.__dict__.get(campo)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Los signals post_save ya vieron los valores anteriores; ahora
+        # la copia pasa a reflejar lo que quedó guardado.
+        self._guardar_valores_originales(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._guardar_valores_originales(fields)
@@ -1,7 +1,7 @@
 from django.urls import path
 from django.conf.urls.static import static
 from django.conf import settings
-from sistema_inmobiliaria import views
+from sistema_inmobiliaria import sindicacion, views
 
 urlpatterns = [
     path('', views.home, name="Home"),
@@ -19,4 +19,11 @@ urlpatterns = [
     path('newsletter/suscribir/', views.suscribir_newsletter, name="suscribir_newsletter"),
     path('newsletter/confirmar/<str:token>/', views.confirmar_newsletter, name="confirmar_newsletter"),
     path('newsletter/', views.newsletter_completo, name="newsletter_completo"),
+    
+    # Sitemap y feeds para buscadores y lectores (ver sindicacion.py)
+    path('robots.txt', sindicacion.robots_txt, name="robots_txt"),
+    path('sitemap.xml', sindicacion.sitemap_indice, name="sitemap"),
+    path('sitemap-<str:seccion>-<int:numero>.xml', sindicacion.sitemap_seccion, name="sitemap_seccion"),
+    path('blog/feed/<str:formato>.xml', sindicacion.feed_blog, name="feed_blog"),
+    path('propiedades/feed/<str:formato>.xml', sindicacion.feed_propiedades, name="feed_propiedades"),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -0,0 +1,227 @@
+"""
+Dependencias de front-end servidas desde el propio sitio.
+
+Bootstrap, Font Awesome y las fuentes de Google se bajaban en cada primera
+visita de tres CDN distintos (tres handshakes DNS/TLS más). El comando
+construir_vendor los descarga una vez, en las versiones fijadas acá, y deja
+en static/sistema_inmobiliaria/vendor/propio/:
+
+- bootstrap.min.css: solo las reglas cuyas clases aparecen en templates/ y
+  en nuestro JS (más las que agrega el JS de Bootstrap, ver CLASES_BOOTSTRAP_JS,
+  y las alertas que se arman en tiempo de ejecución, ver clases_alertas).
+- bootstrap.bundle.min.js: el bundle tal cual.
+- iconos.min.css: solo los íconos usados, con las fuentes recortadas a esos
+  glifos si está instalado ``fonttools`` (si no, las fuentes completas).
+- fuentes.css: Inter y Playfair Display, solo el subconjunto latin.
+
+El deploy lo corre antes de collectstatic (bin/post_compile), que les pone
+hash y las comprime como al resto de los estáticos. Mientras un archivo no
+esté construido, {% url_vendor %} sigue apuntando al CDN.
+"""
+import io
+import posixpath
+import re
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+
+from django.contrib.messages.utils import get_level_tags
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+from .critico import filtrar_reglas, nombres_usados
+from .storage import minificar_css
+
+
+BOOTSTRAP = 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/'
+FONT_AWESOME = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/'
+GOOGLE_FONTS = (
+    'https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700'
+    '&family=Playfair+Display:wght@400;500;600;700&display=swap'
+)
+
+RUTA_VENDOR = 'sistema_inmobiliaria/vendor/propio'
+DIRECTORIO_APP = Path(__file__).resolve().parent
+DIRECTORIO_VENDOR = DIRECTORIO_APP / 'static' / RUTA_VENDOR
+
+# nombre -> (archivo propio, URL del CDN)
+ARCHIVOS = {
+    'bootstrap_css': (f'{RUTA_VENDOR}/bootstrap.min.css', BOOTSTRAP + 'css/bootstrap.min.css'),
+    'bootstrap_js': (f'{RUTA_VENDOR}/bootstrap.bundle.min.js', BOOTSTRAP + 'js/bootstrap.bundle.min.js'),
+    'iconos_css': (f'{RUTA_VENDOR}/iconos.min.css', FONT_AWESOME + 'css/all.min.css'),
+    'fuentes_css': (f'{RUTA_VENDOR}/fuentes.css', GOOGLE_FONTS),
+}
+
+# Clases que el JS de Bootstrap pone y saca en tiempo de ejecución y que
+# por eso no aparecen en los templates
+CLASES_BOOTSTRAP_JS = {
+    '.active', '.collapse', '.collapsed', '.collapsing', '.disabled', '.fade',
+    '.hiding', '.is-invalid', '.is-valid', '.modal-backdrop', '.modal-open',
+    '.modal-static', '.show', '.showing', '.was-validated',
+}
+
+# Alertas que base.js arma con alert-${tipo} (newsletter)
+CLASES_ALERTAS_JS = {'.alert-success', '.alert-danger'}
+
+# Subconjuntos de Google Fonts que se conservan (el español entra en latin)
+SUBCONJUNTOS_FUENTES = {'latin'}
+
+# Google entrega woff2 solo a navegadores que lo anuncian
+_AGENTE = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+_RE_CLASSLIST = re.compile(r'''classList\.(?:add|remove|toggle|contains)\(([^)]*)\)''')
+_RE_CADENA = re.compile(r'''['"]([\w -]+)['"]''')
+_RE_FONT_FACE = re.compile(r'@font-face\s*{[^}]*}')
+_RE_FONT_FACE_SUBCONJUNTO = re.compile(r'/\*\s*([\w-]+)\s*\*/\s*(@font-face\s*{[^}]*})')
+_RE_FAMILIA = re.compile(r'''font-family:\s*['"]?([^;'"}]+)''')
+_RE_URL = re.compile(r'''url\(\s*['"]?([^'")]+)['"]?\s*\)''')
+_RE_GLIFO = re.compile(r'''content:\s*["']\\([0-9a-fA-F]{3,6})["']''')
+
+
+def descargar(url):
+    # urllib.request arrastra http.client y ssl: solo lo necesita el comando,
+    # no cada proceso que carga las etiquetas de template
+    import urllib.request
+    peticion = urllib.request.Request(url, headers={'User-Agent': _AGENTE})
+    with urllib.request.urlopen(peticion, timeout=30) as respuesta:
+        return respuesta.read()
+
+
+def nombres_en_uso():
+    """
+    Etiquetas, clases e ids de todos los templates y de nuestro JS (incluidas
+    las clases que el JS maneja con classList)
+    """
+    nombres = set()
+    for template in (DIRECTORIO_APP / 'templates').rglob('*.html'):
+        nombres |= nombres_usados(template.read_text(encoding='utf-8'))
+    for script in (DIRECTORIO_APP / 'static' / 'sistema_inmobiliaria' / 'js').rglob('*.js'):
+        codigo = script.read_text(encoding='utf-8')
+        nombres |= nombres_usados(codigo)
+        for argumentos in _RE_CLASSLIST.findall(codigo):
+            for cadena in _RE_CADENA.findall(argumentos):
+                nombres.update('.' + clase for clase in cadena.split())
+    return nombres
+
+
+def clases_alertas():
+    """
+    Clases alert-* que no aparecen literales en templates ni JS:
+    _mensajes.html usa alert-{{ message.tags }} (una por nivel de mensaje,
+    con MESSAGE_TAGS si está configurado) y base.js las de CLASES_ALERTAS_JS
+    """
+    return {f'.alert-{etiqueta}' for etiqueta in get_level_tags().values()} | CLASES_ALERTAS_JS
+
+
+def purgar_bootstrap(css, nombres):
+    return minificar_css(filtrar_reglas(css, nombres | CLASES_BOOTSTRAP_JS | clases_alertas(), interactivas=True))
+
+
+def purgar_iconos(css, nombres):
+    """
+    Deja los íconos usados y las @font-face de las familias que siguen
+    referenciadas, solo en woff2 y apuntando a fuentes/. Devuelve el CSS, los
+    archivos de fuente que hay que bajar (relativos a la hoja original) y los
+    glifos usados
+    """
+    reglas = filtrar_reglas(_RE_FONT_FACE.sub('', css), nombres, interactivas=True)
+    fuentes = []
+    caras = []
+    for cara in _RE_FONT_FACE.findall(css):
+        familia = _RE_FAMILIA.search(cara)
+        if familia is None or familia.group(1).strip() not in reglas:
+            continue
+        woff2 = [url for url in _RE_URL.findall(cara) if url.endswith('.woff2')]
+        if not woff2:
+            continue
+        fuentes.append(woff2[0])
+        cara = re.sub(
+            r'src:[^;}]*',
+            f'src:url(fuentes/{posixpath.basename(woff2[0])}) format("woff2")',
+            cara,
+        )
+        caras.append(cara)
+    glifos = {int(codigo, 16) for codigo in _RE_GLIFO.findall(reglas)}
+    return minificar_css('\n'.join(caras + [reglas])), fuentes, glifos
+
+
+def filtrar_fuentes(css):
+    """
+    Deja las @font-face de Google Fonts de SUBCONJUNTOS_FUENTES, con la URL
+    local. Devuelve el CSS y las URL remotas de los woff2
+    """
+    caras = []
+    urls = []
+    for subconjunto, cara in _RE_FONT_FACE_SUBCONJUNTO.findall(css):
+        if subconjunto not in SUBCONJUNTOS_FUENTES:
+            continue
+        url = _RE_URL.search(cara).group(1)
+        if url not in urls:
+            urls.append(url)
+        caras.append(cara.replace(url, f'fuentes/{posixpath.basename(urlparse(url).path)}'))
+    return minificar_css('\n'.join(caras)), urls
+
+
+def recortar_fuente(datos, glifos):
+    """
+    Recorta un woff2 a los glifos dados. Sin fonttools (dependencia
+    opcional) devuelve la fuente completa
+    """
+    try:
+        from fontTools import subset
+        from fontTools.ttLib import TTFont
+    except ImportError:
+        return datos
+    fuente = TTFont(io.BytesIO(datos))
+    opciones = subset.Options()
+    opciones.flavor = 'woff2'
+    opciones.layout_features = ['*']
+    recortador = subset.Subsetter(opciones)
+    recortador.populate(unicodes=glifos)
+    recortador.subset(fuente)
+    salida = io.BytesIO()
+    fuente.save(salida)
+    return salida.getvalue()
+
+
+def construir():
+    """
+    Descarga y purga las dependencias; devuelve {ruta relativa a
+    DIRECTORIO_VENDOR: contenido}
+    """
+    nombres = nombres_en_uso()
+    archivos = {}
+
+    bootstrap = descargar(ARCHIVOS['bootstrap_css'][1]).decode('utf-8')
+    archivos['bootstrap.min.css'] = purgar_bootstrap(bootstrap, nombres).encode('utf-8')
+    archivos['bootstrap.bundle.min.js'] = descargar(ARCHIVOS['bootstrap_js'][1])
+
+    url_iconos = ARCHIVOS['iconos_css'][1]
+    iconos, fuentes, glifos = purgar_iconos(descargar(url_iconos).decode('utf-8'), nombres)
+    archivos['iconos.min.css'] = iconos.encode('utf-8')
+    for fuente in fuentes:
+        datos = descargar(urljoin(url_iconos, fuente))
+        archivos[f'fuentes/{posixpath.basename(fuente)}'] = recortar_fuente(datos, glifos)
+
+    fuentes_css, urls = filtrar_fuentes(descargar(GOOGLE_FONTS).decode('utf-8'))
+    archivos['fuentes.css'] = fuentes_css.encode('utf-8')
+    for url in urls:
+        archivos[f'fuentes/{posixpath.basename(urlparse(url).path)}'] = descargar(url)
+    return archivos
+
+
+# nombre -> URL del archivo propio. Solo se guardan los que existen: si no,
+# un render anterior a construir_vendor dejaría el CDN hasta reiniciar
+_URLS_PROPIAS = {}
+
+
+def url_vendor(nombre):
+    """
+    Ruta del archivo propio si ya se construyó; si no, la URL del CDN
+    """
+    url = _URLS_PROPIAS.get(nombre)
+    if url is None:
+        ruta, cdn = ARCHIVOS[nombre]
+        if not finders.find(ruta):
+            return cdn
+        url = _URLS_PROPIAS[nombre] = static(ruta)
+    return url
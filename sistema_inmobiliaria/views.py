@@ -2,21 +2,80 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse
 from .models import Propiedad, Vendedor, Entrada, Categoria, Consulta, SolicitudVisita, SuscriptorNewsletter
 from .forms import ConsultaForm, ContactoPropiedadForm, SolicitudVisitaForm, ContactoGeneralForm, NewsletterForm, NewsletterSimpleForm
-from .email_utils import enviar_email_contacto_propiedad, enviar_email_solicitud_visita, enviar_email_contacto_general, enviar_confirmacion_newsletter
+from .email_utils import (
+    enviar_async, enviar_email_contacto_general, enviar_confirmacion_newsletter, mensaje_confirmacion_newsletter,
+    mensaje_contacto_propiedad, mensaje_solicitud_visita, url_confirmacion_newsletter,
+)
+from .services import registrar_contacto
+from .blog import PaginadorConTotal, contar_entradas, sidebar_blog
+from .busqueda import buscar_entradas, fragmento_html
+from .relacionadas import entradas_relacionadas as entradas_relacionadas_por_contenido
+from .middleware import cache_pagina, condicional, contar_vistas, fecha_version
 from django.conf import settings
-from django.core.mail import send_mail
-from django.db.models import Q
-from django.core.paginator import Paginator
+from django.db.models import Max, Q
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.contrib import messages
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+import hashlib
 import json
+import random
+import uuid
+
+from asgiref.sync import sync_to_async
 
 # Create your views here.
 
+
+# ============ VALIDADORES PARA GET CONDICIONAL ============
+#
+# Las páginas de detalle responden 304 si la copia del cliente sigue vigente.
+# Los validadores salen de una sola consulta liviana (solo las fechas de
+# actualización) que se guarda en el request, así ETag y Last-Modified no
+# consultan dos veces y el template no se renderiza. La página también
+# muestra datos que cambian sin tocar esas fechas (sidebar, relacionadas):
+# cuenta además la última invalidación del grupo de la página.
+
+def _validador(request, clave, consulta, grupo):
+    cache = request.__dict__.setdefault('_validadores', {})
+    if clave not in cache:
+        fechas = [fecha for fecha in (consulta() or ()) if fecha]
+        # Sin fila (404) no hay validadores
+        cache[clave] = max(fechas + [fecha_version(grupo)]) if fechas else None
+    return cache[clave]
+
+
+def _etag(request, clave, ultima_modificacion):
+    if ultima_modificacion is None:
+        return None
+    # Los formularios de la página llevan el token CSRF: si cambia la cookie
+    # la copia del cliente ya no sirve
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    valor = f"{clave}:{ultima_modificacion.isoformat()}:{csrf}"
+    return hashlib.md5(valor.encode()).hexdigest()
+
+
+def _modificacion_propiedad(request, id):
+    return _validador(request, ('propiedad', id), lambda: Propiedad.objects.filter(id=id).values_list(
+        'actualizado', 'vendedor_id__actualizado'
+    ).first(), 'catalogo')
+
+
+def _etag_propiedad(request, id):
+    return _etag(request, f"propiedad:{id}", _modificacion_propiedad(request, id))
+
+
+def _modificacion_entrada(request, slug):
+    return _validador(request, ('entrada', slug), lambda: Entrada.publicadas().filter(slug=slug).values_list(
+        'fecha_actualizacion'
+    ).first(), 'blog')
+
+
+def _etag_entrada(request, slug):
+    return _etag(request, f"entrada:{slug}", _modificacion_entrada(request, slug))
+
+@cache_pagina('catalogo')
 def home(request):
 
     propiedades = Propiedad.objects.all()
@@ -26,31 +85,30 @@ def login(request):
 
     return render(request, 'sistema_inmobiliaria/login.html')
 
+@cache_pagina('blog')
 def blog(request):
     from datetime import datetime, timedelta
     
     # Obtener solo entradas publicadas
-    entradas_list = Entrada.publicadas().select_related('categoria')
+    entradas_list = Entrada.publicadas().select_related('categoria').defer(*Entrada.CAMPOS_CUERPO)
     
     # Filtrar por categoría si se especifica
     categoria_slug = request.GET.get('categoria')
     categoria_obj = None
+    # Categorías, destacadas y autores salen del sidebar cacheado (ver blog.py)
+    sidebar = sidebar_blog()
     if categoria_slug:
-        categoria_obj = Categoria.objects.filter(slug=categoria_slug).first()
+        categoria_obj = next((c for c in sidebar['categorias'] if c.slug == categoria_slug), None)
         entradas_list = entradas_list.filter(categoria__slug=categoria_slug)
     
-    # Búsqueda por término
+    # Búsqueda por término: índice FTS5 con ranking bm25 (ver busqueda.py)
     search = request.GET.get('search')
     if search:
-        entradas_list = entradas_list.filter(
-            Q(titulo__icontains=search) | 
-            Q(contenido__icontains=search) |
-            Q(resumen__icontains=search) |
-            Q(autor__icontains=search)
-        )
+        entradas_list = buscar_entradas(entradas_list, search)
     
     # Filtro por fecha
     fecha_filtro = request.GET.get('fecha')
+    fecha_inicio = None
     if fecha_filtro:
         hoy = datetime.now().date()
         if fecha_filtro == 'ultima_semana':
@@ -69,8 +127,10 @@ def blog(request):
         entradas_list = entradas_list.filter(destacado=True)
     
     # Ordenamiento
-    orden = request.GET.get('orden', 'reciente')
-    if orden == 'reciente':
+    orden = request.GET.get('orden', 'relevancia' if search else 'reciente')
+    if orden == 'relevancia' and search:
+        entradas_list = entradas_list.order_by('relevancia', '-fecha_publicacion')
+    elif orden == 'reciente':
         entradas_list = entradas_list.order_by('-fecha_publicacion')
     elif orden == 'antiguo':
         entradas_list = entradas_list.order_by('fecha_publicacion')
@@ -78,295 +138,91 @@ def blog(request):
         entradas_list = entradas_list.order_by('titulo')
     elif orden == 'lectura':
         entradas_list = entradas_list.order_by('tiempo_lectura')
+    elif orden == 'populares':
+        entradas_list = entradas_list.order_by('-vistas', '-fecha_publicacion')
+    
+    # Total para la paginación: sin búsqueda sale de ContadorEntradas; con
+    # búsqueda (o una categoría inexistente) un único COUNT compartido
+    if search or (categoria_slug and categoria_obj is None):
+        total_entradas = entradas_list.count()
+    else:
+        total_entradas = contar_entradas(
+            categoria=categoria_obj, desde=fecha_inicio, destacadas=solo_destacadas == 'si'
+        )
     
     # Paginación
-    paginator = Paginator(entradas_list, 6)  # 6 entradas por página
+    paginator = PaginadorConTotal(entradas_list, 6, total_entradas)  # 6 entradas por página
     page_number = request.GET.get('page')
     entradas = paginator.get_page(page_number)
-    
-    # Obtener categorías para el filtro
-    categorias = Categoria.objects.all()
-    
-    # Entradas destacadas para el sidebar
-    entradas_destacadas = Entrada.destacadas()[:3]
-    
-    # Obtener autores únicos para el filtro
-    autores = Entrada.publicadas().values_list('autor', flat=True).distinct().order_by('autor')
+    if search:
+        for entrada in entradas:
+            entrada.fragmento_html = fragmento_html(entrada.fragmento)
     
     context = {
         'entradas': entradas,
-        'categorias': categorias,
-        'entradas_destacadas': entradas_destacadas,
-        'autores': autores,
+        'categorias': sidebar['categorias'],
+        'entradas_destacadas': sidebar['entradas_destacadas'],
+        'autores': sidebar['autores'],
         'categoria_actual': categoria_slug,
         'categoria_obj': categoria_obj,
         'search_query': search,
         'fecha_filtro': fecha_filtro,
         'solo_destacadas': solo_destacadas,
         'orden_actual': orden,
-        'total_entradas': entradas_list.count(),
+        'total_entradas': total_entradas,
     }
     
     return render(request, 'sistema_inmobiliaria/blog.html', context)
 
-def contacto(request):
+@cache_pagina()
+async def contacto(request):
     if request.method == "POST":
+        es_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
         try:
-            print("=== DEBUG: Formulario de contacto recibido ===")
-            
-            # Obtener datos del formulario (simplificado sin preferencias)
-            nombre = request.POST.get("nombre", "")
-            email_cliente = request.POST.get("email", "")
-            mensaje = request.POST.get("mensaje", "")
-            tipo = request.POST.get("tipo", "")
-            precio = request.POST.get("precio", "")
-            telefono = request.POST.get("telefono", "")
-            propiedad_id = request.POST.get("propiedad_id", "")
-            
-            # Datos específicos para solicitudes de visita
-            fecha_visita = request.POST.get("fecha_visita", "")
-            hora_visita = request.POST.get("hora_visita", "")
-            
-            print(f"Datos: {nombre}, {email_cliente}, {tipo}, {precio}, {telefono}, propiedad_id: {propiedad_id}")
-            if tipo == "Visita":
-                print(f"Solicitud de visita - Fecha: {fecha_visita}, Hora: {hora_visita}")
-            
-            # Obtener información de la propiedad si se proporciona ID
-            propiedad_info = ""
-            if propiedad_id:
-                try:
-                    propiedad = Propiedad.objects.get(id=propiedad_id)
-                    propiedad_info = f"""
-
-=== INFORMACIÓN DE LA PROPIEDAD ===
-Propiedad: {propiedad.titulo}
-Precio: ${propiedad.precio:,.0f}
-Habitaciones: {propiedad.habitaciones}
-Baños: {propiedad.bano}
-Estacionamiento: {propiedad.estacionamiento}
-Vendedor: {propiedad.vendedor_id.nombre if propiedad.vendedor_id else 'No asignado'} {propiedad.vendedor_id.apellido if propiedad.vendedor_id else ''}
-URL: {request.build_absolute_uri(reverse('Propiedad', args=[propiedad.id]))}
-"""
-                    print(f"Propiedad encontrada: {propiedad.titulo}")
-                except Propiedad.DoesNotExist:
-                    print(f"Propiedad con ID {propiedad_id} no encontrada")
-                    propiedad_info = f"""
-
-=== INFORMACIÓN DE LA PROPIEDAD ===
-Propiedad ID: {propiedad_id} (Propiedad no encontrada)
-"""
-            
-            # Guardar la consulta en el modelo unificado Consulta
-            try:
-                propiedad_obj = None
-                if propiedad_id:
-                    try:
-                        propiedad_obj = Propiedad.objects.get(id=propiedad_id)
-                    except Propiedad.DoesNotExist:
-                        print(f"Propiedad con ID {propiedad_id} no encontrada")
-                
-                # Determinar origen y tipo de consulta
-                origen = 'propiedad' if propiedad_obj else 'general'
-                tipo_consulta = tipo.lower() if tipo else 'general'
-                
-                # Mapear tipos de consulta
-                tipo_mapping = {
-                    'compra': 'compra',
-                    'venta': 'venta', 
-                    'alquiler': 'alquiler',
-                    'visita': 'informacion',  # Las visitas son solicitudes de información
-                    'general': 'general'
-                }
-                tipo_final = tipo_mapping.get(tipo_consulta, 'general')
-                
-                # Crear la consulta unificada
-                consulta = Consulta.objects.create(
-                    nombre=nombre,
-                    email=email_cliente,
-                    telefono=telefono,
-                    mensaje=mensaje,
-                    origen=origen,
-                    tipo=tipo_final,
-                    propiedad=propiedad_obj,
-                    presupuesto=precio if precio else '',
-                    # Guardar información del agente si es una consulta de propiedad
-                    notas_internas=f"Agente: {propiedad_obj.vendedor_id.nombre} ({propiedad_obj.vendedor_id.email})" if propiedad_obj and propiedad_obj.vendedor_id else ''
-                )
-                
-                print(f"Consulta guardada con ID: {consulta.id} - Origen: {origen}, Tipo: {tipo_final}")
-                
-            except Exception as e:
-                print(f"Error guardando consulta: {e}")
-                import traceback
-                traceback.print_exc()
-            
-            # Si es una solicitud de visita, también guardarla en SolicitudVisita
-            if tipo == "Visita" and propiedad_id and fecha_visita and hora_visita:
-                try:
-                    from datetime import datetime
-                    propiedad_obj = Propiedad.objects.get(id=propiedad_id)
-                    
-                    # Convertir fecha y hora a los formatos correctos
-                    fecha_obj = datetime.strptime(fecha_visita, '%Y-%m-%d').date()
-                    hora_obj = datetime.strptime(hora_visita, '%H:%M').time()
-                    
-                    # Crear la solicitud de visita
-                    solicitud_visita = SolicitudVisita.objects.create(
-                        propiedad=propiedad_obj,
-                        nombre=nombre,
-                        email=email_cliente,
-                        telefono=telefono,
-                        fecha_preferida=fecha_obj,
-                        hora_preferida=hora_obj,
-                        mensaje=mensaje,
-                        estado='pendiente'
-                    )
-                    
-                    print(f"Solicitud de visita guardada con ID: {solicitud_visita.id}")
-                    
-                    # Enviar email específico para solicitud de visita
-                    from .email_utils import enviar_email_solicitud_visita
-                    email_enviado = enviar_email_solicitud_visita(solicitud_visita)
-                    print(f"Email de solicitud de visita enviado: {email_enviado}")
-                    
-                    # Marcar que ya se envió un email específico
-                    if email_enviado:
-                        email_ya_enviado = True
-                    
-                except Exception as e:
-                    print(f"Error guardando solicitud de visita: {e}")
-                    import traceback
-                    traceback.print_exc()
-            
-            # Crear mensaje completo con teléfono y propiedad
-            mensaje_completo = f"""NUEVA CONSULTA DE CONTACTO
-            
-Nombre: {nombre}
-Email: {email_cliente}
-Teléfono: {telefono}
-Tipo de operación: {tipo}
-Presupuesto: ${precio}{propiedad_info}
-
-Mensaje:
-{mensaje}"""
-            
-            # Variable para controlar si ya se envió un email específico
-            email_ya_enviado = False
-            
-            # Verificar configuración de email
-            print(f"EMAIL_HOST_USER: {settings.EMAIL_HOST_USER}")
-            print(f"EMAIL_HOST_PASSWORD configurado: {'Sí' if settings.EMAIL_HOST_PASSWORD else 'No'}")
-            
-            # Enviar email específico según el tipo de consulta (solo si no se envió ya uno)
-            if not email_ya_enviado:
-                try:
-                    print("Enviando email específico...")
-                    email_enviado = False
-                    
-                    # Si es una consulta de propiedad (no visita), usar email específico
-                    if propiedad_id and tipo != "Visita":
-                        try:
-                            propiedad_obj = Propiedad.objects.get(id=propiedad_id)
-                            # Crear objeto temporal para el email (compatible con el template)
-                            class ContactoTemp:
-                                def __init__(self, nombre, email, telefono, mensaje, propiedad):
-                                    self.nombre = nombre
-                                    self.email = email
-                                    self.telefono = telefono
-                                    self.mensaje = mensaje
-                                    self.propiedad = propiedad
-                            
-                            contacto_temp = ContactoTemp(nombre, email_cliente, telefono, mensaje, propiedad_obj)
-                            from .email_utils import enviar_email_contacto_propiedad
-                            email_enviado = enviar_email_contacto_propiedad(contacto_temp)
-                            print(f"Email de contacto de propiedad enviado: {email_enviado}")
-                        except Propiedad.DoesNotExist:
-                            print(f"Propiedad con ID {propiedad_id} no encontrada para email")
-                    
-                    # Si es una consulta general, usar email general
-                    elif not propiedad_id or tipo != "Visita":
-                        # Crear objeto temporal para el email general
-                        class ContactoGeneralTemp:
-                            def __init__(self, nombre, email, telefono, asunto, mensaje):
-                                self.nombre = nombre
-                                self.email = email
-                                self.telefono = telefono
-                                self.asunto = asunto or "Consulta general"
-                                self.mensaje = mensaje
-                        
-                        contacto_temp = ContactoGeneralTemp(nombre, email_cliente, telefono, tipo or "Consulta general", mensaje)
-                        from .email_utils import enviar_email_contacto_general
-                        email_enviado = enviar_email_contacto_general(contacto_temp)
-                        print(f"Email de contacto general enviado: {email_enviado}")
-                    
-                    # Fallback al email genérico si los específicos fallan
-                    if not email_enviado:
-                        print("Usando email genérico como fallback...")
-                        subject = f"Consulta de {nombre}"
-                        from_email = settings.EMAIL_HOST_USER
-                        recipient_list = ["alerepettosac@gmail.com"]
-                        
-                        send_mail(subject, mensaje_completo, from_email, recipient_list)
-                        email_enviado = True
-                    
-                    print(f"Email enviado exitosamente: {email_enviado}")
-                    
-                except Exception as e:
-                    print(f"Error enviando email: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    email_enviado = False
-            
-            # Respuesta al usuario (tanto para emails específicos como para visitas)
-            try:
-                # Si es una petición AJAX (desde el modal), devolver JSON
-                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    if email_ya_enviado or email_enviado:
-                        return JsonResponse({'success': True, 'message': '¡Gracias por contactarnos! Hemos recibido tu mensaje y nos pondremos en contacto contigo en breve.'})
-                    else:
-                        return JsonResponse({'success': False, 'message': 'Hubo un problema enviando el email. Por favor intenta nuevamente.'}, status=500)
-                
-                # Para requests normales (no AJAX)
-                if email_ya_enviado or email_enviado:
-                    messages.success(request, '¡Gracias por contactarnos! Hemos recibido tu mensaje y nos pondremos en contacto contigo en breve.')
-                else:
-                    messages.error(request, 'Hubo un problema enviando el email. Por favor intenta nuevamente.')
-                return redirect('Contacto')
-                
-            except Exception as e:
-                print(f"Error en respuesta: {e}")
-                # Si es una petición AJAX, devolver error JSON
-                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    return JsonResponse({'success': False, 'message': 'Hubo un problema procesando tu solicitud.'}, status=500)
-                
-                messages.error(request, 'Hubo un problema enviando el email. Por favor intenta nuevamente.')
-            
+            # La lógica de registro y envío de emails vive en services.py.
+            # Las transacciones de Django son sincrónicas: se corre en un
+            # hilo, y los emails igual salen de la cola en segundo plano
+            await sync_to_async(registrar_contacto)(
+                request.POST,
+                propiedad_url=lambda pk: request.build_absolute_uri(reverse('Propiedad', args=[pk])),
+            )
         except Exception as e:
             print(f"Error general en contacto: {e}")
-            import traceback
-            traceback.print_exc()
             
             # Si es una petición AJAX, devolver error JSON
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            if es_ajax:
                 return JsonResponse({'success': False, 'message': 'Hubo un error procesando tu mensaje. Por favor intenta nuevamente.'}, status=500)
             
             messages.error(request, 'Hubo un error procesando tu mensaje. Por favor intenta nuevamente.')
+            return await _arender(request, 'sistema_inmobiliaria/contacto.html')
+        
+        # Si es una petición AJAX (desde el modal), devolver JSON
+        if es_ajax:
+            return JsonResponse({'success': True, 'message': '¡Gracias por contactarnos! Hemos recibido tu mensaje y nos pondremos en contacto contigo en breve.'})
+        
+        messages.success(request, '¡Gracias por contactarnos! Hemos recibido tu mensaje y nos pondremos en contacto contigo en breve.')
+        return redirect('Contacto')
     
-    return render(request, 'sistema_inmobiliaria/contacto.html')
+    return await _arender(request, 'sistema_inmobiliaria/contacto.html')
 
+@contar_vistas(Entrada, 'slug')
+@cache_pagina('blog')
+@condicional(etag_func=_etag_entrada, last_modified_func=_modificacion_entrada)
 def entrada(request, slug):
     # Obtener la entrada por slug, solo si está publicada
     entrada = get_object_or_404(
-        Entrada.publicadas().select_related('categoria'), 
+        Entrada.publicadas().select_related('categoria').defer('contenido', 'texto_plano'), 
         slug=slug
     )
     
-    # Obtener entradas relacionadas (misma categoría, excluyendo la actual)
-    entradas_relacionadas = []
-    if entrada.categoria:
+    # Relacionadas por contenido, precalculadas (ver relacionadas.py)
+    entradas_relacionadas = entradas_relacionadas_por_contenido(entrada)
+    
+    # Sin cálculo todavía: misma categoría, excluyendo la actual
+    if not entradas_relacionadas and entrada.categoria:
         entradas_relacionadas = Entrada.publicadas().filter(
             categoria=entrada.categoria
-        ).exclude(id=entrada.id)[:3]
+        ).exclude(id=entrada.id).defer(*Entrada.CAMPOS_CUERPO)[:3]
     
     # Si no hay suficientes entradas relacionadas, completar con otras entradas
     if len(entradas_relacionadas) < 3:
@@ -374,38 +230,66 @@ def entrada(request, slug):
             id=entrada.id
         ).exclude(
             id__in=[e.id for e in entradas_relacionadas]
-        )[:3 - len(entradas_relacionadas)]
+        ).defer(*Entrada.CAMPOS_CUERPO)[:3 - len(entradas_relacionadas)]
         entradas_relacionadas = list(entradas_relacionadas) + list(otras_entradas)
     
-    # Obtener todas las categorías con conteo de entradas para el sidebar
-    from django.db.models import Count, Q
-    categorias_con_conteo = Categoria.objects.annotate(
-        entradas_count=Count('entrada', filter=Q(entrada__estado='publicado'))
-    ).filter(entradas_count__gt=0)
-    
     context = {
         'entrada': entrada,
         'entradas_relacionadas': entradas_relacionadas,
-        'categorias_con_conteo': categorias_con_conteo,
+        # Categorías con conteo desde el sidebar cacheado (ver blog.py)
+        'categorias_con_conteo': sidebar_blog()['categorias_con_conteo'],
     }
     
     return render(request, 'sistema_inmobiliaria/entrada.html', context)
 
 
+@cache_pagina()
 def nosotros(request):
 
     return render(request, 'sistema_inmobiliaria/nosotros.html')
 
+def _propiedades_al_azar(excluir_id, cantidad=3):
+    """
+    ``cantidad`` propiedades al azar sin ORDER BY RANDOM() (que lee y ordena
+    la tabla completa) ni leer todos los ids: las siguientes por clave
+    primaria a partir de un id al azar, volviendo al principio si no alcanzan
+    """
+    maximo = Propiedad.objects.aggregate(maximo=Max('id'))['maximo']
+    if maximo is None:
+        return []
+    desde = random.randint(1, maximo)
+    otras = Propiedad.objects.exclude(id=excluir_id).order_by('id')
+    elegidas = list(otras.filter(id__gte=desde)[:cantidad])
+    if len(elegidas) < cantidad:
+        elegidas += otras.filter(id__lt=desde)[:cantidad - len(elegidas)]
+    random.shuffle(elegidas)
+    return elegidas
+
+@contar_vistas(Propiedad, 'pk', 'id')
+@cache_pagina('catalogo')
+# Los formularios de la página llevan el token CSRF, que solo cubre el ETag:
+# sin Last-Modified, un If-Modified-Since solo nunca responde 304
+@condicional(etag_func=_etag_propiedad)
 def propiedad(request, id):
     propiedad = get_object_or_404(Propiedad, id=id)
-    propiedades_relacionadas = Propiedad.objects.exclude(id=id).order_by('?')[:3]
     
     context = {
         'propiedad': propiedad,
-        'propiedades_relacionadas': propiedades_relacionadas
+        'propiedades_relacionadas': _propiedades_al_azar(excluir_id=propiedad.id),
     }
     return render(request, 'sistema_inmobiliaria/propiedad.html', context)
 
+# orden (parámetro GET) -> order_by del listado de propiedades
+ORDENES_PROPIEDADES = {
+    'precio_asc': ('precio', 'pk'),
+    'precio_desc': ('-precio', 'pk'),
+    'recientes': ('-creado', '-pk'),
+    'antiguos': ('creado', 'pk'),
+    # Visitas ya volcadas (ver contador_vistas.py)
+    'populares': ('-vistas', '-pk'),
+}
+
+@cache_pagina('catalogo')
 def propiedades(request):
     propiedades = Propiedad.objects.all()
     
@@ -438,6 +322,10 @@ def propiedades(request):
     if estacionamiento:
         propiedades = propiedades.filter(estacionamiento__gte=estacionamiento)
     
+    orden = request.GET.get('orden')
+    if orden in ORDENES_PROPIEDADES:
+        propiedades = propiedades.order_by(*ORDENES_PROPIEDADES[orden])
+    
     context = {
         'propiedades': propiedades,
         'search': search or '',
@@ -446,6 +334,7 @@ def propiedades(request):
         'habitaciones': habitaciones or '',
         'banos': banos or '',
         'estacionamiento': estacionamiento or '',
+        'orden_actual': orden or '',
         'total_propiedades': propiedades.count()
     }
     
@@ -454,73 +343,75 @@ def propiedades(request):
 
 # ============ NUEVAS VISTAS PARA CONTACTO Y NEWSLETTER ============
 
-def contacto_propiedad(request, propiedad_id):
+async def _arender(request, template_name, context=None):
+    """
+    render() desde una vista async: el template puede leer la sesión
+    (mensajes, usuario), que solo tiene API sincrónica
+    """
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def _apropiedad_o_404(propiedad_id):
+    """
+    La propiedad con su vendedor ya cargado: en una vista async no se puede
+    resolver la FK de forma perezosa (templates de la página y del email)
+    """
+    try:
+        return await Propiedad.objects.select_related('vendedor_id').aget(id=propiedad_id)
+    except Propiedad.DoesNotExist:
+        raise Http404("No existe la propiedad")
+
+
+async def contacto_propiedad(request, propiedad_id):
     """
     Vista para manejar el formulario de contacto desde una propiedad específica
     """
-    print(f"=== DEBUG: contacto_propiedad llamada - Propiedad ID: {propiedad_id} ===")
-    print(f"Método: {request.method}")
-    
-    propiedad = get_object_or_404(Propiedad, id=propiedad_id)
+    propiedad = await _apropiedad_o_404(propiedad_id)
     
     if request.method == 'POST':
-        print(f"POST data: {dict(request.POST)}")
         form = ContactoPropiedadForm(request.POST)
-        print(f"Formulario válido: {form.is_valid()}")
-        
-        if form.is_valid():
-            print("Formulario válido - guardando contacto")
+        if await sync_to_async(form.is_valid)():
             contacto = form.save(commit=False)
             contacto.propiedad = propiedad
-            contacto.save()
-            print(f"Contacto guardado con ID: {contacto.id}")
+            await sync_to_async(contacto.save)()
             
-            # Enviar email al agente
-            try:
-                print("Intentando enviar email al agente...")
-                if enviar_email_contacto_propiedad(contacto):
-                    print("Email enviado exitosamente")
-                    messages.success(request, 
-                        f'Tu consulta ha sido enviada al agente. Te contactaremos pronto.')
-                else:
-                    print("Error enviando email")
-                    messages.warning(request, 
-                        'Tu consulta fue guardada pero hubo un problema enviando el email. Te contactaremos pronto.')
-            except Exception as e:
-                print(f"Excepción enviando email: {e}")
+            # Enviar email al agente, sin ocupar el worker mientras responde el SMTP
+            msg = mensaje_contacto_propiedad(contacto)
+            if msg is not None and await enviar_async(msg):
+                messages.success(request, 
+                    'Tu consulta ha sido enviada al agente. Te contactaremos pronto.')
+            else:
                 messages.warning(request, 
                     'Tu consulta fue guardada pero hubo un problema enviando el email. Te contactaremos pronto.')
             
             return redirect('Propiedad', id=propiedad_id)
-        else:
-            print(f"Errores del formulario: {form.errors}")
     else:
-        print("Método GET - creando formulario vacío")
         form = ContactoPropiedadForm()
     
-    return render(request, 'sistema_inmobiliaria/contacto_propiedad.html', {
+    return await _arender(request, 'sistema_inmobiliaria/contacto_propiedad.html', {
         'form': form,
         'propiedad': propiedad
     })
 
 
-def solicitar_visita(request, propiedad_id):
+async def solicitar_visita(request, propiedad_id):
     """
     Vista para manejar el formulario de solicitud de visita
     """
-    propiedad = get_object_or_404(Propiedad, id=propiedad_id)
+    propiedad = await _apropiedad_o_404(propiedad_id)
     
     if request.method == 'POST':
         form = SolicitudVisitaForm(request.POST)
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             solicitud = form.save(commit=False)
             solicitud.propiedad = propiedad
-            solicitud.save()
+            await sync_to_async(solicitud.save)()
             
             # Enviar email al agente
-            if enviar_email_solicitud_visita(solicitud):
+            msg = mensaje_solicitud_visita(solicitud)
+            if msg is not None and await enviar_async(msg):
                 messages.success(request, 
-                    f'Tu solicitud de visita ha sido enviada al agente. Te contactaremos para confirmar.')
+                    'Tu solicitud de visita ha sido enviada al agente. Te contactaremos para confirmar.')
             else:
                 messages.warning(request, 
                     'Tu solicitud fue guardada pero hubo un problema enviando el email. Te contactaremos pronto.')
@@ -529,7 +420,7 @@ def solicitar_visita(request, propiedad_id):
     else:
         form = SolicitudVisitaForm()
     
-    return render(request, 'sistema_inmobiliaria/solicitar_visita.html', {
+    return await _arender(request, 'sistema_inmobiliaria/solicitar_visita.html', {
         'form': form,
         'propiedad': propiedad
     })
@@ -561,11 +452,14 @@ def contacto_general(request):
     })
 
 
-@require_POST
-def suscribir_newsletter(request):
+async def suscribir_newsletter(request):
     """
     Vista AJAX para suscripción rápida al newsletter
     """
+    # require_POST (Django 4.1) no sabe envolver vistas async
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    
     try:
         data = json.loads(request.body)
         email = data.get('email')
@@ -574,17 +468,22 @@ def suscribir_newsletter(request):
             return JsonResponse({'success': False, 'message': 'Email requerido'})
         
         # Verificar si ya existe
-        if SuscriptorNewsletter.objects.filter(email=email, activo=True).exists():
+        if await SuscriptorNewsletter.objects.filter(email=email, activo=True).aexists():
             return JsonResponse({
                 'success': False, 
                 'message': 'Este email ya está suscrito a nuestro newsletter'
             })
         
-        # Crear suscriptor
-        suscriptor = SuscriptorNewsletter.objects.create(email=email)
+        # Crear suscriptor, con el token de confirmación en el mismo INSERT
+        suscriptor = await SuscriptorNewsletter.objects.acreate(
+            email=email, token_confirmacion=str(uuid.uuid4())
+        )
         
         # Enviar email de confirmación
-        if enviar_confirmacion_newsletter(suscriptor, request):
+        msg = mensaje_confirmacion_newsletter(
+            suscriptor, url_confirmacion_newsletter(request, suscriptor.token_confirmacion)
+        )
+        if await enviar_async(msg):
             return JsonResponse({
                 'success': True, 
                 'message': 'Te hemos enviado un email de confirmación. Revisa tu bandeja de entrada.'